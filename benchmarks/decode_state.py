@@ -0,0 +1,71 @@
+"""
+Micro-benchmark of TEAL key-value state decoding, as done for every vault of a full vault scan.
+
+    PYTHONPATH=. python benchmarks/decode_state.py [n_states]
+"""
+import random
+import sys
+import time
+from base64 import b64decode, b64encode
+from deridex.decoder import StateDecoder
+from deridex.perpetuals.v1.config import LOCAL_STATE_KEYS
+
+
+def format_state_before(state):
+    """format_state as it was before the schema decoder"""
+    formatted_state = {}
+    for item in state:
+        key = item["key"]
+        value = item["value"]
+        try:
+            formatted_key = b64decode(key).decode("utf-8")
+        except:
+            formatted_key = b64decode(key)
+        if value["type"] == 1:
+            # byte string
+            try:
+                formatted_state[formatted_key] = b64decode(value["bytes"]).decode("utf-8")
+            except:
+                formatted_state[formatted_key] = value["bytes"]
+        else:
+            # integer
+            formatted_state[formatted_key] = value["uint"]
+    return formatted_state
+
+
+def vault_states(n):
+    rng = random.Random(0)
+    return [
+        [
+            {"key": b64encode(key.encode()).decode(), "value": {"type": 2, "bytes": "", "uint": rng.randrange(10 ** 12)}}
+            for key in LOCAL_STATE_KEYS
+        ]
+        for _ in range(n)
+    ]
+
+
+def bench(name, fn, states, repeat=5):
+    best = min(_time(fn, states) for _ in range(repeat))
+    print(f"{name:<28} {len(states) / best:>14,.0f} states/s")
+
+
+def _time(fn, states):
+    start = time.perf_counter()
+    fn(states)
+    return time.perf_counter() - start
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    states = vault_states(n)
+    decoder = StateDecoder(LOCAL_STATE_KEYS)
+    assert all(decoder.decode(state) == format_state_before(state) for state in states[:1000])
+
+    bench("format_state (before)", lambda states: [format_state_before(state) for state in states], states)
+    bench("StateDecoder.decode", lambda states: [decoder.decode(state) for state in states], states)
+    bench("StateDecoder.decode_tuple", lambda states: [decoder.decode_tuple(state) for state in states], states)
+    bench("StateDecoder.decode_columns", decoder.decode_columns, states)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+In-process stand-in for an algod node and an indexer, serving responses shaped like the real ones for a perpetual
+market, an option pool and a set of vaults, with a configurable latency per request.
+"""
+import base64
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from algosdk import account, encoding
+from deridex.registry import get_option_contracts, get_perpetual_contracts
+
+NETWORK_ROUND = 25_000_000
+GENESIS_HASH = "SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI="
+
+
+def teal_key_value(state):
+    """Returns a state dict in the indexer key-value list form"""
+    items = []
+    for key, value in state.items():
+        if isinstance(value, int):
+            items.append({"key": base64.b64encode(key.encode()).decode(),
+                          "value": {"type": 2, "bytes": "", "uint": value}})
+        else:
+            items.append({"key": base64.b64encode(key.encode()).decode(),
+                          "value": {"type": 1, "bytes": base64.b64encode(value).decode(), "uint": 0}})
+    return items
+
+
+class FakeNetwork:
+    """
+    Chain state served by :class:`FakeServer`: global states of the perpetual, option and their dependent apps, and
+    local states of n_vaults perpetual vaults plus one user account holding a perpetual and an option position.
+    """
+
+    def __init__(self, n_vaults=1000, seed=0):
+        rng = random.Random(seed)
+        self.round = NETWORK_ROUND
+        self.perpetual_app_id = get_perpetual_contracts("mainnet")["ALGO/STBL2"]["appID"]
+        self.option_app_ids = {symbol: info["appId"] for symbol, info in get_option_contracts("testnet").items()}
+        self.option_asset_ids = {symbol: info["collateralAssetId"]
+                                 for symbol, info in get_option_contracts("testnet").items()}
+        self.user_private_key, self.user_address = account.generate_account()
+        _, self.user_vault = account.generate_account()
+
+        a1, a2, a2u = 900_000_001, 900_000_002, 31_566_704
+        self.global_states = {
+            self.perpetual_app_id: {
+                "a1": a1, "a1u": 900_000_003, "a2": a2, "a2u": a2u, "a1mk": 900_000_101, "a2mk": 900_000_102,
+                "amm": 900_000_103, "oracle": 900_000_104, "manager": 900_000_105, "af_manager": 900_000_106,
+                "interface": 900_000_107, "lp_manager": 900_000_108, "ml": 500,
+                "ta1b": 10 ** 12, "ta1bs": 10 ** 12, "ta2b": 10 ** 12, "ta2bs": 10 ** 12,
+            },
+            900_000_101: {"baer": 1_020_000_000},
+            900_000_102: {"baer": 1_010_000_000},
+            900_000_103: {"b1": 5 * 10 ** 12, "b2": 15 * 10 ** 11, "sfp": 3000},
+            900_000_104: {"latest_price": 300_000},
+            900_000_200: {"dummy": 900_000_201, "oracle": 900_000_104, "pstd": 40_000, "nstd": 45_000},
+        }
+        for symbol, app_id in self.option_app_ids.items():
+            self.global_states[app_id] = {
+                "data": 900_000_200, "cid": self.option_asset_ids[symbol], "token": 900_000_300,
+                "contract_scale": 1_000_000, "executor_fee": 1_000, "protocol_fee": 2_000, "locked": 0,
+                "treasury": self.user_address.encode(),
+            }
+
+        # (address, app id) to local state
+        self.local_states = {}
+        for _ in range(n_vaults):
+            _, address = account.generate_account()
+            self.local_states[(address, self.perpetual_app_id)] = {
+                "pa": rng.choice((a1, a2, 1)), "ps": rng.randrange(10 ** 6, 10 ** 9),
+                "a1bs": rng.randrange(10 ** 5, 10 ** 8), "a2bs": rng.randrange(10 ** 5, 10 ** 8),
+            }
+        position = {"pa": a1, "ps": 10 ** 8, "a1bs": 0, "a2bs": 2 * 10 ** 7}
+        self.local_states[(self.user_address, self.perpetual_app_id)] = position
+        self.local_states[(self.user_vault, self.perpetual_app_id)] = position
+        # Non utf-8 first byte keeps the vault address base64 encoded by format_state
+        self.local_states[(self.user_address, 900_000_105)] = {
+            "v": b"\xff" + encoding.decode_address(self.user_vault)[1:]
+        }
+        for app_id in self.option_app_ids.values():
+            self.local_states[(self.user_address, app_id)] = {"created": 1, "size": 10 ** 6}
+        self.vault_addresses = sorted(
+            address for (address, app_id) in self.local_states if app_id == self.perpetual_app_id
+        )
+
+    def apps_local_state(self, address, app_id=None):
+        return [
+            {"id": local_app_id, "key-value": teal_key_value(state)}
+            for (local_address, local_app_id), state in self.local_states.items()
+            if local_address == address and (app_id is None or local_app_id == app_id)
+        ]
+
+    def handle(self, method, path, query, body):
+        """Returns (status, response dict) of a request"""
+        m = re.fullmatch(r"/v2/applications/(\d+)", path)
+        if m:
+            app_id = int(m.group(1))
+            if app_id not in self.global_states:
+                return 404, {"message": "no application found"}
+            return 200, {
+                "application": {"id": app_id, "params": {"global-state": teal_key_value(self.global_states[app_id])}},
+                "current-round": int(query.get("round", self.round)),
+            }
+        if path == "/v2/accounts":
+            app_id = int(query["application-id"])
+            limit = int(query.get("limit", 100))
+            addresses = [address for address in self.vault_addresses if (address, app_id) in self.local_states]
+            start = int(query.get("next", 0))
+            page = addresses[start:start + limit]
+            return 200, {
+                "accounts": [{"address": address, "apps-local-state": self.apps_local_state(address, app_id)}
+                             for address in page],
+                "current-round": self.round,
+                "next-token": str(start + limit) if page else None,
+            }
+        m = re.fullmatch(r"/v2/accounts/(\w+)/apps-local-state", path)
+        if m:
+            states = self.apps_local_state(m.group(1), int(query["application-id"]))
+            return 200, {"apps-local-states": states or None, "current-round": self.round}
+        m = re.fullmatch(r"/v2/accounts/(\w+)", path)
+        if m:
+            return 200, {
+                "account": {"address": m.group(1), "apps-local-state": self.apps_local_state(m.group(1)),
+                            "assets": [{"asset-id": asset_id, "amount": 10 ** 12}
+                                       for asset_id in set(self.option_asset_ids.values())]},
+                "current-round": self.round,
+            }
+        m = re.fullmatch(r"/v2/assets/(\d+)", path)
+        if m:
+            return 200, {"asset": {"index": int(m.group(1)), "params": {"unit-name": "TNR"}},
+                         "current-round": self.round}
+        if path == "/v2/transactions" and method == "GET":
+            return 200, {"transactions": [], "current-round": self.round}
+        if path == "/v2/transactions/params":
+            return 200, {"consensus-version": "v1", "fee": 0, "genesis-hash": GENESIS_HASH,
+                         "genesis-id": "mainnet-v1.0", "last-round": self.round, "min-fee": 1000}
+        if path == "/v2/transactions" and method == "POST":
+            return 200, {"txId": "FAKE"}
+        if path == "/v2/status" or path.startswith("/v2/status/wait-for-block-after/"):
+            return 200, {"last-round": self.round}
+        if path.startswith("/v2/transactions/pending/"):
+            return 200, {"confirmed-round": self.round, "pool-error": ""}
+        return 404, {"message": f"unknown endpoint {method} {path}"}
+
+
+class FakeServer:
+    """
+    HTTP server answering algod and indexer requests from a :class:`FakeNetwork` on a local port, after sleeping
+    latency seconds per request. Counts requests per endpoint.
+    """
+
+    def __init__(self, network, latency=0.0):
+        self.network = network
+        self.latency = latency
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _respond(self):
+                url = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                endpoint = re.sub(r"/[A-Z2-7]{58}|/\d+", "/{}", url.path)
+                with server._lock:
+                    server.calls[f"{self.command} {endpoint}"] += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                status, response = server.network.handle(self.command, url.path, query, body)
+                data = json.dumps(response).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = _respond
+            do_POST = _respond
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def total_calls(self):
+        with self._lock:
+            return sum(self.calls.values())
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls.clear()
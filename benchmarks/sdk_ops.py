@@ -0,0 +1,111 @@
+"""
+Benchmarks the network calls and wall time of SDK operations against a local stand-in algod and indexer.
+
+    PYTHONPATH=.:benchmarks python benchmarks/sdk_ops.py [--latency-ms 20] [--iterations 20] [--vaults 1000]
+    PYTHONPATH=.:benchmarks python benchmarks/sdk_ops.py --only Perpetual.get_position --only Perpetual.quote
+
+For every operation prints the requests issued per call, p50/p99 latency and throughput, followed by the requests
+per endpoint.
+"""
+import argparse
+import statistics
+import time
+from algosdk import mnemonic
+from deridex.options.v1.client import Client as OptionsClient
+from deridex.options.v1.config import OptionType
+from deridex.options.v1.option import Option
+from deridex.perpetuals.v1.account import Account
+from deridex.perpetuals.v1.config import SIDE
+from deridex.perpetuals.v1.perpetual import Perpetual
+from deridex.transport import AlgodClient, IndexerClient
+from fake_network import FakeNetwork, FakeServer
+
+
+def operations(algod, indexer, network):
+    """Returns dict of name to (setup, operation), setup returns the argument passed to operation"""
+    account_obj = Account(mnemonic.from_private_key(network.user_private_key))
+
+    def perpetual():
+        return Perpetual(algod, indexer, "mainnet", network.perpetual_app_id, "ALGO/STBL2")
+
+    def perpetual_with_vault():
+        perp = perpetual()
+        perp.update_local_state(account_obj)
+        return perp
+
+    def option():
+        return Option(algod, indexer, "testnet", OptionType.CALL, "ALGO", "TNR")
+
+    return {
+        "Perpetual.__init__": (lambda: None, lambda _: perpetual()),
+        "Perpetual.get_position": (perpetual, lambda perp: perp.get_position(network.user_vault)),
+        "Perpetual.quote": (perpetual, lambda perp: perp.quote(SIDE.LONG, 100, 5)),
+        "Perpetual.buy": (perpetual_with_vault,
+                          lambda perp: perp.buy(perp.quote(SIDE.LONG, 100, 5), account_obj)),
+        "Perpetual.close": (perpetual_with_vault, lambda perp: perp.close(account_obj)),
+        "Perpetual.get_vault_accounts": (perpetual, lambda perp: perp.get_vault_accounts()),
+        "Option.__init__": (lambda: None, lambda _: option()),
+        "Option.create": (option, lambda opt: opt.create(network.user_address, 10 ** 6, 7, 10 ** 9)),
+        "options Client.get_positions": (
+            lambda: OptionsClient(algod, indexer, network.user_address, "testnet"),
+            lambda client: client.get_positions()
+        ),
+    }
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(q * (len(samples) - 1))))]
+
+
+def bench(server, setup, operation, iterations):
+    arg = setup()
+    operation(arg)  # warm up
+    server.reset_calls()
+    samples = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t = time.perf_counter()
+        operation(arg)
+        samples.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    return {
+        "calls": server.total_calls() / iterations,
+        "p50": statistics.median(samples) * 1e3,
+        "p99": percentile(samples, 0.99) * 1e3,
+        "throughput": iterations / elapsed,
+        "endpoints": {endpoint: count / iterations for endpoint, count in server.calls.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=20, help="latency added to every request")
+    parser.add_argument("--iterations", type=int, default=20, help="timed calls per operation")
+    parser.add_argument("--vaults", type=int, default=1000, help="number of perpetual vaults")
+    parser.add_argument("--only", action="append", help="operation to run, may be repeated")
+    args = parser.parse_args()
+
+    network = FakeNetwork(n_vaults=args.vaults)
+    with FakeServer(network, latency=args.latency_ms / 1e3) as server:
+        algod = AlgodClient("", server.url)
+        indexer = IndexerClient("", server.url)
+        results = {}
+        for name, (setup, operation) in operations(algod, indexer, network).items():
+            if args.only and name not in args.only:
+                continue
+            results[name] = bench(server, setup, operation, args.iterations)
+
+    print(f"latency {args.latency_ms:g} ms, {args.iterations} iterations, {args.vaults} vaults\n")
+    print(f"{'operation':<32} {'calls/op':>9} {'p50 ms':>9} {'p99 ms':>9} {'ops/s':>9}")
+    for name, result in results.items():
+        print(f"{name:<32} {result['calls']:>9.1f} {result['p50']:>9.2f} {result['p99']:>9.2f} "
+              f"{result['throughput']:>9.1f}")
+    print()
+    for name, result in results.items():
+        endpoints = ", ".join(f"{endpoint} x{count:g}" for endpoint, count in sorted(result["endpoints"].items()))
+        print(f"{name:<32} {endpoints}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark of signing many transaction groups, one at a time with TransactionGroup.sign_with_private_key versus
+GroupSigner with an increasing number of worker processes.
+
+    PYTHONPATH=. python benchmarks/sign_groups.py [--groups 2000] [--max-workers 8]
+
+Groups are shaped like liquidation groups: a payment and three application calls with arguments, accounts and
+foreign apps and assets.
+"""
+import argparse
+import os
+import time
+from algosdk import account
+from algosdk.future.transaction import ApplicationNoOpTxn, PaymentTxn, SuggestedParams
+from deridex.signing import GroupSigner
+from deridex.utils import TransactionGroup
+
+GENESIS_HASH = "SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI="
+
+
+def make_groups(n_groups, private_key):
+    address = account.address_from_private_key(private_key)
+    params = SuggestedParams(4000, 25_000_000, 25_001_000, GENESIS_HASH, "mainnet-v1.0", flat_fee=True)
+    groups = []
+    for i in range(n_groups):
+        _, target = account.generate_account()
+        transactions = [PaymentTxn(address, params, target, 100_000 + i)]
+        for method in (b"liquidate", b"repay", b"settle"):
+            transactions.append(ApplicationNoOpTxn(address, params, 994412935, [method, i.to_bytes(8, "big")],
+                                                   [target], [900_000_101, 900_000_102, 900_000_104],
+                                                   [900_000_001, 31_566_704]))
+        groups.append(TransactionGroup(transactions))
+    return groups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, default=2000, help="number of groups to sign")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count(), help="largest worker count to run")
+    args = parser.parse_args()
+
+    private_key, _ = account.generate_account()
+    groups = make_groups(args.groups, private_key)
+
+    start = time.perf_counter()
+    for group in groups:
+        group.sign_with_private_key(private_key)
+    elapsed = time.perf_counter() - start
+    expected = [[stxn.signature for stxn in group.signed_transactions] for group in groups]
+    print(f"{args.groups} groups of {len(groups[0].transactions)} transactions, {os.cpu_count()} CPUs\n")
+    print(f"{'signer':<32} {'groups/s':>10} {'speedup':>8}")
+    print(f"{'sign_with_private_key':<32} {args.groups / elapsed:>10.0f} {1:>8.2f}")
+    baseline = elapsed
+
+    workers = 1
+    while workers <= args.max_workers:
+        with GroupSigner([private_key], max_workers=workers) as signer:
+            # Start the workers outside of the timed run
+            signer.sign(groups[:workers * signer.chunk_size])
+            start = time.perf_counter()
+            signer.sign(groups)
+            elapsed = time.perf_counter() - start
+        assert [[stxn.signature for stxn in group.signed_transactions] for group in groups] == expected
+        print(f"{f'GroupSigner max_workers={workers}':<32} {args.groups / elapsed:>10.0f} {baseline / elapsed:>8.2f}")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+import asyncio
+import base64
+import json
+import time
+from algosdk import constants, encoding, error
+from algosdk.future.transaction import SuggestedParams, Transaction
+from .cache import StateCache
+from .metrics import metrics as default_metrics, request_app_id
+from .params import SuggestedParamsProvider
+from .singleflight import AsyncSingleFlight
+from .transport import build_path, error_message
+from .utils import format_state
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class AsyncTransport:
+    """Pooled keep-alive HTTP transport shared by :class:`AsyncAlgodClient` and :class:`AsyncIndexerClient`"""
+
+    def __init__(self, pool_size=100, pool_size_per_host=0, timeout=30):
+        """Constructor method for :class:`AsyncTransport` class
+        :param pool_size: maximum number of open connections
+        :type pool_size: int, optional
+        :param pool_size_per_host: maximum number of open connections per host, 0 for no limit
+        :type pool_size_per_host: int, optional
+        :param timeout: total timeout of a request in seconds
+        :type timeout: float, optional
+        """
+        if aiohttp is None:
+            raise ImportError("The asyncio client requires aiohttp, install it with `pip install deridex-py-sdk[async]`")
+        self.pool_size = pool_size
+        self.pool_size_per_host = pool_size_per_host
+        self.timeout = timeout
+        self._session = None
+
+    def _get_session(self):
+        # The session must be created from within the running event loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, limit_per_host=self.pool_size_per_host)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def request(self, method, url, headers=None, data=None):
+        """Sends a request over a pooled connection
+        :param method: request method
+        :type method: str
+        :param url: full url of the request
+        :type url: str
+        :param headers: request headers
+        :type headers: dict, optional
+        :param data: request body
+        :type data: bytes, optional
+        :return: tuple of status code and response body
+        :rtype: tuple
+        """
+        async with self._get_session().request(method, url, headers=headers, data=data) as resp:
+            return resp.status, await resp.read()
+
+    async def close(self):
+        """Closes every pooled connection"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+# Concurrent identical application and account reads share one indexer request
+_STATE_READS = AsyncSingleFlight("state_reads")
+
+
+async def _send(transport, service, address, method, requrl, params, data, headers, metrics):
+    path, path_with_query = build_path(requrl, params)
+    start = time.perf_counter()
+    status = None
+    body = b""
+    try:
+        status, body = await transport.request(method, address + path_with_query, headers=headers, data=data)
+    finally:
+        metrics.record_request(service, method, path, request_app_id(path, params), time.perf_counter() - start,
+                               len(data) if data else 0, len(body), status)
+    return status, body
+
+
+class AsyncAlgodClient:
+    """Asyncio counterpart of :class:`AlgodClient` covering the endpoints used by the SDK"""
+
+    def __init__(self, algod_token, algod_address, headers=None, transport=None, metrics=None):
+        """Constructor method for :class:`AsyncAlgodClient` class
+        :param algod_token: algod API token
+        :type algod_token: str
+        :param algod_address: algod address
+        :type algod_address: str
+        :param headers: extra header name/value for all requests
+        :type headers: dict, optional
+        :param transport: transport to send requests over, one is created if not specified
+        :type transport: :class:`AsyncTransport`, optional
+        :param metrics: registry requests are recorded in, the SDK registry if not specified
+        :type metrics: :class:`Metrics`, optional
+        """
+        self.algod_token = algod_token
+        self.algod_address = algod_address
+        self.headers = headers
+        self.transport = transport if transport is not None else AsyncTransport()
+        self.metrics = metrics if metrics is not None else default_metrics
+
+    async def algod_request(self, method, requrl, params=None, data=None, headers=None, response_format="json"):
+        header = {"User-Agent": "py-algorand-sdk"}
+        if self.headers:
+            header.update(self.headers)
+        if headers:
+            header.update(headers)
+        if requrl not in constants.no_auth:
+            header.update({constants.algod_auth_header: self.algod_token})
+
+        status, body = await _send(self.transport, "algod", self.algod_address, method, requrl, params, data, header,
+                                   self.metrics)
+        if status >= 400:
+            raise error.AlgodHTTPError(error_message(body), status)
+        if response_format == "json":
+            try:
+                return json.loads(body)
+            except ValueError as e:
+                raise error.AlgodResponseError("Failed to parse JSON response from algod") from e
+        return body
+
+    async def status(self):
+        return await self.algod_request("GET", "/status")
+
+    async def status_after_block(self, block_num):
+        return await self.algod_request("GET", "/status/wait-for-block-after/" + str(block_num))
+
+    async def pending_transaction_info(self, transaction_id):
+        return await self.algod_request("GET", "/transactions/pending/" + transaction_id, params={"format": "json"})
+
+    async def suggested_params(self):
+        res = await self.algod_request("GET", "/transactions/params")
+        return SuggestedParams(
+            res["fee"],
+            res["last-round"],
+            res["last-round"] + 1000,
+            res["genesis-hash"],
+            res["genesis-id"],
+            False,
+            res["consensus-version"],
+            res["min-fee"],
+        )
+
+    async def send_raw_transaction(self, txn):
+        return (await self.algod_request("POST", "/transactions", data=txn,
+                                         headers={"Content-Type": "application/x-binary"}))["txId"]
+
+    async def send_transactions(self, txns):
+        serialized = []
+        for txn in txns:
+            assert not isinstance(txn, Transaction), "Attempt to send UNSIGNED transaction {}".format(txn)
+            serialized.append(base64.b64decode(encoding.msgpack_encode(txn)))
+        return await self.send_raw_transaction(b"".join(serialized))
+
+
+class AsyncIndexerClient:
+    """Asyncio counterpart of :class:`IndexerClient` covering the endpoints used by the SDK"""
+
+    def __init__(self, indexer_token, indexer_address, headers=None, transport=None, metrics=None):
+        """Constructor method for :class:`AsyncIndexerClient` class
+        :param indexer_token: indexer API token
+        :type indexer_token: str
+        :param indexer_address: indexer address
+        :type indexer_address: str
+        :param headers: extra header name/value for all requests
+        :type headers: dict, optional
+        :param transport: transport to send requests over, one is created if not specified
+        :type transport: :class:`AsyncTransport`, optional
+        :param metrics: registry requests are recorded in, the SDK registry if not specified
+        :type metrics: :class:`Metrics`, optional
+        """
+        self.indexer_token = indexer_token
+        self.indexer_address = indexer_address
+        self.headers = headers
+        self.transport = transport if transport is not None else AsyncTransport()
+        self.metrics = metrics if metrics is not None else default_metrics
+
+    async def indexer_request(self, method, requrl, params=None, data=None, headers=None):
+        header = {"User-Agent": "py-algorand-sdk"}
+        if self.headers:
+            header.update(self.headers)
+        if headers:
+            header.update(headers)
+        if requrl not in constants.no_auth and self.indexer_token:
+            header.update({constants.indexer_auth_header: self.indexer_token})
+
+        status, body = await _send(self.transport, "indexer", self.indexer_address, method, requrl, params, data,
+                                   header, self.metrics)
+        if status >= 400:
+            raise error.IndexerHTTPError(error_message(body))
+        return json.loads(body)
+
+    async def applications(self, application_id, round_num=None):
+        query = {"round": round_num} if round_num else {}
+        return await self.indexer_request("GET", "/applications/" + str(application_id), query)
+
+    async def account_info(self, address, round_num=None):
+        query = {"round": round_num} if round_num else {}
+        return await self.indexer_request("GET", "/accounts/" + address, query)
+
+    async def accounts(self, application_id=None, next_page=None, limit=None):
+        query = {}
+        if application_id:
+            query["application-id"] = application_id
+        if next_page:
+            query["next"] = next_page
+        if limit:
+            query["limit"] = limit
+        return await self.indexer_request("GET", "/accounts", query)
+
+    async def lookup_account_application_local_state(self, address, application_id=None):
+        query = {"application-id": application_id} if application_id else {}
+        return await self.indexer_request("GET", "/accounts/" + address + "/apps-local-state", query)
+
+    async def asset_info(self, asset_id):
+        return await self.indexer_request("GET", "/assets/" + str(asset_id))
+
+
+async def read_global_state_with_round(indexer_client, app_id, block=None):
+    """Returns dict of global state for application with the given app_id along with the round it was read at
+    :param indexer_client: async indexer client
+    :type indexer_client: :class:`AsyncIndexerClient`
+    :param app_id: id of the application
+    :type app_id: int
+    :param block: block at which to query historical data
+    :type block: int, optional
+    :return: tuple of global state dict and the round the state is current to, block if specified
+    :rtype: tuple
+    """
+    try:
+        response = await _STATE_READS.do((indexer_client, "application", app_id, block),
+                                         indexer_client.applications, app_id, round_num=block)
+    except error.IndexerHTTPError:
+        raise Exception("Application does not exist.")
+    application_info = response.get("application", {})
+    state_round = block if block is not None else response.get("current-round")
+    return format_state(application_info["params"]["global-state"]), state_round
+
+
+async def read_global_state(indexer_client, app_id, block=None):
+    """Returns dict of global state for application with the given app_id
+    :param indexer_client: async indexer client
+    :type indexer_client: :class:`AsyncIndexerClient`
+    :param app_id: id of the application
+    :type app_id: int
+    :param block: block at which to query historical data
+    :type block: int, optional
+    :return: dict of global state for application with id app_id
+    :rtype: dict
+    """
+    return (await read_global_state_with_round(indexer_client, app_id, block))[0]
+
+
+async def read_local_state(indexer_client, address, app_id, block=None):
+    """Returns dict of local state for address for application with id app_id
+    :param indexer_client: async indexer client
+    :type indexer_client: :class:`AsyncIndexerClient`
+    :param address: address of account for which to get state
+    :type address: string
+    :param app_id: id of the application
+    :type app_id: int
+    :param block: block at which to get the historical local state
+    :type block: int, optional
+    :return: dict of local state of address for application with id app_id
+    :rtype: dict
+    """
+    try:
+        results = (await _STATE_READS.do((indexer_client, "account", address, block), indexer_client.account_info,
+                                         address, round_num=block)).get("account", {})
+    except error.IndexerHTTPError:
+        raise Exception("Account does not exist.")
+
+    for local_state in results.get('apps-local-state', []):
+        if local_state['id'] == app_id:
+            if 'key-value' not in local_state:
+                return {}
+            return format_state(local_state['key-value'])
+    return {}
+
+
+async def wait_for_confirmation(client, txid):
+    """Waits for a transaction with id txid to complete. Returns dict with transaction information
+    after completion.
+    :param client: async algod client
+    :type client: :class:`AsyncAlgodClient`
+    :param txid: id of the sent transaction
+    :type txid: string
+    :return: dict of transaction information
+    :rtype: dict
+    """
+    last_round = (await client.status()).get('last-round')
+    txinfo = await client.pending_transaction_info(txid)
+    while not (txinfo.get('confirmed-round') and txinfo.get('confirmed-round') > 0):
+        last_round += 1
+        await client.status_after_block(last_round)
+        txinfo = await client.pending_transaction_info(txid)
+    txinfo['txid'] = txid
+    return txinfo
+
+
+async def submit(algod, signed_transactions, wait=False):
+    """Submits signed transactions to the network
+    :param algod: async algod client
+    :type algod: :class:`AsyncAlgodClient`
+    :param signed_transactions: list of signed transactions of one group
+    :type signed_transactions: list
+    :param wait: wait for txn to complete, defaults to False
+    :type wait: boolean, optional
+    :return: dict of transaction id
+    :rtype: dict
+    """
+    try:
+        txid = await algod.send_transactions(signed_transactions)
+    except error.AlgodHTTPError as e:
+        raise Exception(str(e))
+    if wait:
+        return await wait_for_confirmation(algod, txid)
+    return {'txid': txid}
+
+
+class AsyncStateCache(StateCache):
+    """:class:`StateCache` reading through an :class:`AsyncIndexerClient`"""
+
+    async def get_global_state(self, app_id, block=None, max_staleness=None):
+        cached = self._lookup(app_id, block, max_staleness)
+        if cached is not None:
+            return cached
+        state, state_round = await read_global_state_with_round(self.indexer_client, app_id, block)
+        return self._store(app_id, block, state, state_round)
+
+    async def get_local_state(self, address, app_id, block=None):
+        if block is None:
+            return await read_local_state(self.indexer_client, address, app_id)
+        key = (app_id, address, block)
+        with self._lock:
+            state = self._local_entries.get(key)
+        if state is None:
+            state = await read_local_state(self.indexer_client, address, app_id, block)
+            with self._lock:
+                self._local_entries[key] = state
+        return state
+
+    async def snapshot(self, app_ids, block=None, max_staleness=None, base=None):
+        names = list(app_ids)
+        cached = [self._lookup(app_ids[name], block, max_staleness) for name in names]
+        if all(result is not None for result in cached):
+            results = cached
+        else:
+            results = list(await asyncio.gather(
+                *(self.get_global_state(app_ids[name], block, max_staleness) for name in names)
+            ))
+        snapshot_round, lagging = self._lagging(names, results, block, base)
+        if lagging:
+            pinned = await asyncio.gather(
+                *(read_global_state_with_round(self.indexer_client, app_ids[names[i]], snapshot_round) for i in lagging)
+            )
+            for i, result in zip(lagging, pinned):
+                results[i] = result
+        return self._build_snapshot(names, results, block, base)
+
+
+class AsyncSuggestedParamsProvider(SuggestedParamsProvider):
+    """:class:`SuggestedParamsProvider` fetching through an :class:`AsyncAlgodClient`. Call :meth:`update` before
+    building transactions, :meth:`get` only reads the cache."""
+
+    async def update(self):
+        """Fetches new suggested params if the cached ones are stale"""
+        if self.is_stale():
+            await self.refresh()
+
+    async def refresh(self):
+        """Fetches new suggested params from algod"""
+        self._set(await self.algod_client.suggested_params())
+
+    def get(self, fee=1000):
+        with self._lock:
+            params = self._params
+        if params is None:
+            raise Exception("Suggested params have not been fetched, await update() first.")
+        return self._with_fee(params, fee)
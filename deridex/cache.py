@@ -0,0 +1,246 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Mapping
+from types import MappingProxyType
+from .utils import read_global_state_with_round, read_local_state
+
+# Seconds between Algorand rounds, latest states are reused within the round they were read at by default
+ROUND_TIME = 2.8
+
+
+class GlobalStateSnapshot(Mapping):
+    """Immutable set of application global states, keyed by name (e.g. "self", "amm", "oracle")"""
+
+    def __init__(self, states, round):
+        """Constructor method for :class:`GlobalStateSnapshot` class
+        :param states: dict of name to global state dict
+        :type states: dict
+        :param round: oldest confirmed round the states were read at
+        :type round: int
+        """
+        self._states = {
+            name: state if isinstance(state, MappingProxyType) else MappingProxyType(dict(state))
+            for name, state in states.items()
+        }
+        self.round = round
+
+    def __getitem__(self, name):
+        return self._states[name]
+
+    def __iter__(self):
+        return iter(self._states)
+
+    def __len__(self):
+        return len(self._states)
+
+    def __repr__(self):
+        return f"GlobalStateSnapshot(round={self.round}, states={list(self._states)})"
+
+
+class StateCache:
+    """
+    Cache of application global states keyed by app id and round. Latest states are reused only while they are of
+    the latest round read through the cache, for up to max_staleness seconds after that round was first seen: the
+    cache cannot tell when the chain moves on without reading, so a reused state may lag the chain by up to
+    max_staleness. Snapshots hold states of a single round, states of another round are read again at the round of
+    the snapshot. Historical states (read at an explicit block) are cached indefinitely, as are historical local
+    states. Latest states are also recorded to store, once per round, when one is given.
+    """
+
+    def __init__(self, indexer_client, max_staleness=ROUND_TIME, max_workers=8, store=None):
+        """Constructor method for :class:`StateCache` class
+        :param indexer_client: indexer client
+        :type indexer_client: :class:`IndexerClient`
+        :param max_staleness: seconds after the round of a latest state was first seen that the state is reused for,
+            one round by default, 0 disables reuse
+        :type max_staleness: float, optional
+        :param max_workers: number of global state reads issued concurrently by snapshot
+        :type max_workers: int, optional
+        :param store: persistent store recording latest states
+        :type store: :class:`SnapshotStore`, optional
+        """
+        self.indexer_client = indexer_client
+        self.max_staleness = max_staleness
+        self.max_workers = max_workers
+        self.store = store
+        self._entries = {}
+        self._local_entries = {}
+        self._stored_rounds = {}
+        # Latest round read through the cache and when it was first seen
+        self._latest_round = None
+        self._latest_round_seen_at = None
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def get_global_state(self, app_id, block=None, max_staleness=None):
+        """Returns global state of app_id, reading it from the indexer only if the cached state is too old
+        :param app_id: id of the application
+        :type app_id: int
+        :param block: block at which to query historical data
+        :type block: int, optional
+        :param max_staleness: override of the cache max_staleness for this read
+        :type max_staleness: float, optional
+        :return: tuple of read-only global state and the round it was read at
+        :rtype: tuple
+        """
+        cached = self._lookup(app_id, block, max_staleness)
+        if cached is not None:
+            return cached
+        state, state_round = read_global_state_with_round(self.indexer_client, app_id, block)
+        return self._store(app_id, block, state, state_round)
+
+    def _lookup(self, app_id, block, max_staleness):
+        if max_staleness is None:
+            max_staleness = self.max_staleness
+        with self._lock:
+            entry = self._entries.get((app_id, block))
+            if entry is None:
+                return None
+            state, state_round, fetched_at = entry
+            if block is not None:
+                return state, state_round
+            if state_round is None:
+                # Round unknown, reused for max_staleness seconds after the read
+                return (state, state_round) if time.monotonic() - fetched_at < max_staleness else None
+            # Never reused once a later round has been read
+            if state_round == self._latest_round and time.monotonic() - self._latest_round_seen_at < max_staleness:
+                return state, state_round
+        return None
+
+    def _store(self, app_id, block, state, state_round):
+        state = MappingProxyType(state)
+        persist = False
+        with self._lock:
+            current = self._entries.get((app_id, block))
+            # Never replace a newer read with an older one
+            if current is None or current[1] is None or state_round is None or current[1] <= state_round:
+                self._entries[(app_id, block)] = (state, state_round, time.monotonic())
+            if block is None and state_round is not None and (self._latest_round is None or
+                                                              state_round > self._latest_round):
+                self._latest_round = state_round
+                self._latest_round_seen_at = time.monotonic()
+            if self.store is not None and block is None and state_round is not None:
+                # Recorded once per round, reads within a round would commit the same state again
+                persist = state_round > self._stored_rounds.get(app_id, -1)
+                if persist:
+                    self._stored_rounds[app_id] = state_round
+        if persist:
+            self.store.save_global_state(app_id, state, state_round)
+        return state, state_round
+
+    def get_stored_global_state(self, app_id):
+        """Returns the global state of app_id recorded by a previous process, without reading the indexer
+        :param app_id: id of the application
+        :type app_id: int
+        :return: tuple of global state and the round it was read at, None if there is no store or no record
+        :rtype: tuple
+        """
+        if self.store is None:
+            return None
+        return self.store.load_global_state(app_id)
+
+    def snapshot(self, app_ids, block=None, max_staleness=None, base=None):
+        """Returns a snapshot of the global states of several applications
+        :param app_ids: dict of name to app id
+        :type app_ids: dict
+        :param block: block at which to query historical data
+        :type block: int, optional
+        :param max_staleness: override of the cache max_staleness for this read
+        :type max_staleness: float, optional
+        :param base: snapshot of already read states to extend
+        :type base: :class:`GlobalStateSnapshot`, optional
+        :return: snapshot of the global states keyed by name
+        :rtype: :class:`GlobalStateSnapshot`
+        """
+        names = list(app_ids)
+        cached = [self._lookup(app_ids[name], block, max_staleness) for name in names]
+        if all(result is not None for result in cached):
+            results = cached
+        else:
+            results = self._map(lambda name: self.get_global_state(app_ids[name], block, max_staleness), names)
+        snapshot_round, lagging = self._lagging(names, results, block, base)
+        if lagging:
+            # Read at the snapshot round without caching, historical entries would pile up every round
+            pinned = self._map(lambda i: read_global_state_with_round(self.indexer_client, app_ids[names[i]],
+                                                                      snapshot_round), lagging)
+            for i, result in zip(lagging, pinned):
+                results[i] = result
+        return self._build_snapshot(names, results, block, base)
+
+    def _map(self, fn, items):
+        if len(items) > 1 and self.max_workers > 1:
+            # Independent reads are issued concurrently
+            return list(self._get_executor().map(fn, items))
+        return [fn(item) for item in items]
+
+    @staticmethod
+    def _lagging(names, results, block, base):
+        # Returns the round of a latest snapshot and the indexes of the states of another round
+        if block is not None:
+            return block, []
+        rounds = [state_round for _, state_round in results if state_round is not None]
+        if base is not None and base.round is not None:
+            snapshot_round = base.round
+        elif rounds:
+            snapshot_round = max(rounds)
+        else:
+            return None, []
+        return snapshot_round, [i for i, (_, state_round) in enumerate(results)
+                                if state_round is not None and state_round != snapshot_round]
+
+    def get_local_state(self, address, app_id, block=None):
+        """Returns local state of address for app_id. Historical local states are read from the indexer once,
+        latest local states are always read.
+        :param address: address of account for which to get state
+        :type address: str
+        :param app_id: id of the application
+        :type app_id: int
+        :param block: block at which to get the historical local state
+        :type block: int, optional
+        :return: dict of local state of address for application with id app_id
+        :rtype: dict
+        """
+        if block is None:
+            return read_local_state(self.indexer_client, address, app_id)
+        key = (app_id, address, block)
+        with self._lock:
+            state = self._local_entries.get(key)
+        if state is None:
+            state = read_local_state(self.indexer_client, address, app_id, block)
+            with self._lock:
+                self._local_entries[key] = state
+        return state
+
+    @staticmethod
+    def _build_snapshot(names, results, block, base):
+        states = dict(base) if base is not None else {}
+        rounds = [base.round] if base is not None and base.round is not None else []
+        for name, (state, state_round) in zip(names, results):
+            states[name] = state
+            if state_round is not None:
+                rounds.append(state_round)
+        return GlobalStateSnapshot(states, min(rounds) if rounds else block)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="deridex-state")
+            return self._executor
+
+    def invalidate(self, app_id=None):
+        """Drops cached latest states, for app_id only if specified
+        :param app_id: id of the application
+        :type app_id: int, optional
+        """
+        with self._lock:
+            for key in list(self._entries):
+                if key[1] is None and (app_id is None or key[0] == app_id):
+                    del self._entries[key]
+
+    def clear(self):
+        """Drops all cached states, including historical ones"""
+        with self._lock:
+            self._entries.clear()
+            self._local_entries.clear()
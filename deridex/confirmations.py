@@ -0,0 +1,220 @@
+import base64
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+import msgpack
+from algosdk import constants, encoding
+from algosdk.error import AlgodHTTPError
+
+_TRACKERS = weakref.WeakKeyDictionary()
+_TRACKERS_LOCK = threading.Lock()
+
+
+def block_txids(block):
+    """Returns the ids of the transactions of a block
+    :param block: block as returned by the algod block_info endpoint with response_format="msgpack"
+    :type block: bytes
+    :return: list of transaction ids
+    :rtype: list
+    """
+    header = msgpack.unpackb(block, raw=False, strict_map_key=False)["block"]
+    txids = []
+    for stxn in header.get("txns") or []:
+        txn = dict(stxn["txn"])
+        # Transactions are stored without the genesis id and hash, which are part of their id
+        if stxn.get("hgi"):
+            txn["gen"] = header["gen"]
+        txn["gh"] = header["gh"]
+        to_sign = constants.txid_prefix + msgpack.packb(dict(sorted(txn.items())), use_bin_type=True)
+        txids.append(base64.b32encode(encoding.checksum(to_sign)).decode().strip("="))
+    return txids
+
+
+class ConfirmationTracker:
+    """
+    Waits for any number of transactions by following the chain: each new block is fetched once and resolves the
+    futures of the tracked transactions it contains. A transaction still missing once its last valid round has
+    passed, or after its timeout, fails. Algod errors are retried and only delay the transactions. The follower
+    thread runs only while transactions are tracked.
+    """
+
+    def __init__(self, algod_client, timeout=None, retry_interval=0.5, max_retry_interval=10):
+        """Constructor method for :class:`ConfirmationTracker` class
+        :param algod_client: algod client
+        :type algod_client: :class:`AlgodClient`
+        :param timeout: default seconds to wait for a transaction, no limit if not specified
+        :type timeout: float, optional
+        :param retry_interval: seconds before following blocks again after an algod error, doubled on every
+            consecutive error
+        :type retry_interval: float, optional
+        :param max_retry_interval: longest wait between retries
+        :type max_retry_interval: float, optional
+        """
+        self.algod_client = algod_client
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.error = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def track(self, txid, last_valid=None, timeout=None):
+        """Returns a future resolved with the transaction information of txid once it is confirmed. Track a
+        transaction right before sending it, and :meth:`discard` it if sending fails. Blocks confirmed before
+        tracking started are not searched, a transaction confirmed in one is only found once it expires.
+        :param txid: id of the sent transaction
+        :type txid: str
+        :param last_valid: last valid round of the transaction, the future fails once it has passed
+        :type last_valid: int, optional
+        :param timeout: seconds to wait for the transaction, the tracker timeout if not specified
+        :type timeout: float, optional
+        :rtype: :class:`concurrent.futures.Future`
+        """
+        if timeout is None:
+            timeout = self.timeout
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._lock:
+            if txid in self._pending:
+                return self._pending[txid][0]
+            future = Future()
+            self._pending[txid] = (future, last_valid, deadline)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._follow, name="deridex-confirmations", daemon=True)
+                self._thread.start()
+        return future
+
+    def wait(self, txid, last_valid=None, timeout=None):
+        """Waits for a transaction with id txid to be confirmed. Returns dict with transaction information
+        after completion.
+        :param txid: id of the sent transaction
+        :type txid: str
+        :param last_valid: last valid round of the transaction
+        :type last_valid: int, optional
+        :param timeout: seconds to wait for the transaction, the tracker timeout if not specified
+        :type timeout: float, optional
+        :return: dict of transaction information
+        :rtype: dict
+        """
+        return self.track(txid, last_valid, timeout).result()
+
+    def discard(self, txid):
+        """Stops tracking txid, e.g. after it failed to be sent. Its future is cancelled.
+        :param txid: id of the transaction
+        :type txid: str
+        """
+        with self._lock:
+            entry = self._pending.pop(txid, None)
+        if entry is not None:
+            entry[0].cancel()
+
+    def pending(self):
+        """Returns the number of transactions waited for
+        :rtype: int
+        """
+        with self._lock:
+            return len(self._pending)
+
+    def _follow(self):
+        last_round = next_round = None
+        failures = 0
+        while True:
+            try:
+                if last_round is None:
+                    last_round = next_round = self.algod_client.status()["last-round"]
+                elif next_round > last_round:
+                    last_round = self.algod_client.status_after_block(last_round)["last-round"]
+                while next_round <= last_round:
+                    self._check_block(next_round)
+                    next_round += 1
+                if not self._expire(last_round):
+                    return
+                failures = 0
+                self.error = None
+            except Exception as e:
+                # Blocks are checked in order, the failed one is fetched again
+                self.error = e
+                time.sleep(min(self.retry_interval * 2 ** failures, self.max_retry_interval))
+                failures += 1
+                if not self._expire(None):
+                    return
+
+    def _check_block(self, round):
+        txids = block_txids(self.algod_client.block_info(round_num=round, response_format="msgpack"))
+        with self._lock:
+            confirmed = [(txid, self._pending.pop(txid)[0]) for txid in txids if txid in self._pending]
+        for txid, future in confirmed:
+            future.set_result(self._transaction_info(txid, round))
+
+    def _transaction_info(self, txid, round):
+        try:
+            txinfo = self.algod_client.pending_transaction_info(txid)
+        except Exception:
+            # No longer held by the node, or unreachable, the transaction is confirmed all the same
+            txinfo = {}
+        txinfo.setdefault("confirmed-round", round)
+        txinfo["txid"] = txid
+        return txinfo
+
+    def _expire(self, last_round):
+        # Fails transactions that can no longer be confirmed, returns whether any transaction is still tracked.
+        # Without last_round, after an algod error, only timeouts are checked.
+        now = time.monotonic()
+        expired = []
+        timed_out = []
+        with self._lock:
+            for txid, (future, last_valid, deadline) in self._pending.items():
+                if last_round is not None and last_valid is not None and last_round >= last_valid:
+                    expired.append((txid, future, last_valid))
+                elif deadline is not None and now >= deadline:
+                    timed_out.append((txid, future))
+        for txid, future, last_valid in expired:
+            # Confirmed in a block checked before it was tracked
+            txinfo = self._confirmed_transaction_info(txid)
+            if txinfo is not None:
+                self._resolve(txid, future, txinfo)
+            else:
+                self._resolve(txid, future, exception=Exception(f"Transaction {txid} expired at round {last_valid}."))
+        for txid, future in timed_out:
+            self._resolve(txid, future, exception=Exception(f"Transaction {txid} not confirmed after timeout."))
+        with self._lock:
+            running = bool(self._pending)
+            if not running:
+                self._thread = None
+        return running
+
+    def _confirmed_transaction_info(self, txid):
+        try:
+            txinfo = self.algod_client.pending_transaction_info(txid)
+        except AlgodHTTPError:
+            return None
+        if not txinfo.get("confirmed-round"):
+            return None
+        txinfo["txid"] = txid
+        return txinfo
+
+    def _resolve(self, txid, future, result=None, exception=None):
+        with self._lock:
+            if self._pending.get(txid, (None,))[0] is not future:
+                # Discarded meanwhile
+                return
+            del self._pending[txid]
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+
+def get_confirmation_tracker(algod_client):
+    """Returns the tracker shared by every wait for transactions sent through algod_client
+    :param algod_client: algod client
+    :type algod_client: :class:`AlgodClient`
+    :rtype: :class:`ConfirmationTracker`
+    """
+    with _TRACKERS_LOCK:
+        tracker = _TRACKERS.get(algod_client)
+        if tracker is None:
+            # A proxy, a strong reference would keep the client alive as long as the registry
+            tracker = _TRACKERS[algod_client] = ConfirmationTracker(weakref.proxy(algod_client))
+        return tracker
@@ -0,0 +1,110 @@
+import numpy as np
+from base64 import b64decode, b64encode
+
+
+def decode_key(key):
+    """Returns a base64 TEAL state key decoded to a utf-8 string, or to bytes if it is not valid utf-8
+    :param key: base64 encoded key
+    :type key: str
+    :return: decoded key
+    :rtype: str or bytes
+    """
+    key = b64decode(key)
+    try:
+        return key.decode("utf-8")
+    except UnicodeDecodeError:
+        return key
+
+
+def decode_bytes(value):
+    """Returns a base64 TEAL byte string value decoded to a utf-8 string, or the base64 value if it is not valid utf-8
+    :param value: base64 encoded value
+    :type value: str
+    :return: decoded value
+    :rtype: str
+    """
+    try:
+        return b64decode(value).decode("utf-8")
+    except UnicodeDecodeError:
+        return value
+
+
+class StateDecoder:
+    """
+    Decoder of TEAL key-value state lists as returned by the indexer, producing the same dicts as
+    :func:`format_state`. Keys of the schema are mapped from their raw base64 form through a lookup table built once,
+    other keys are decoded the first time they are seen and added to the table.
+    """
+
+    def __init__(self, keys=(), max_keys=1024):
+        """Constructor method for :class:`StateDecoder` class
+        :param keys: known state keys of the app, in the order used by :meth:`decode_tuple` and :meth:`decode_columns`
+        :type keys: tuple, optional
+        :param max_keys: maximum number of keys kept in the lookup table
+        :type max_keys: int, optional
+        """
+        self.keys = tuple(keys)
+        self.max_keys = max(max_keys, len(self.keys))
+        self._key_table = {b64encode(key.encode("utf-8")).decode(): key for key in self.keys}
+        self._column_table = {raw_key: i for i, raw_key in enumerate(self._key_table)}
+
+    def _lookup_key(self, raw_key):
+        key = self._key_table.get(raw_key)
+        if key is None:
+            key = decode_key(raw_key)
+            if len(self._key_table) < self.max_keys:
+                self._key_table[raw_key] = key
+        return key
+
+    def decode(self, state):
+        """Returns a state list decoded to a dict
+        :param state: list of key-value entries returned by the indexer
+        :type state: list
+        :return: dict of state with keys + values formatted from bytes to utf-8 strings
+        :rtype: dict
+        """
+        key_table = self._key_table
+        decoded = {}
+        for item in state:
+            key = key_table.get(item["key"])
+            if key is None:
+                key = self._lookup_key(item["key"])
+            value = item["value"]
+            decoded[key] = value["uint"] if value["type"] == 2 else decode_bytes(value["bytes"])
+        return decoded
+
+    def decode_tuple(self, state, default=0):
+        """Returns the schema keys of a state list as a tuple
+        :param state: list of key-value entries returned by the indexer
+        :type state: list
+        :param default: value of keys missing from the state
+        :type default: any, optional
+        :return: tuple of values in schema key order
+        :rtype: tuple
+        """
+        column_table = self._column_table
+        values = [default] * len(self.keys)
+        for item in state:
+            i = column_table.get(item["key"])
+            if i is not None:
+                value = item["value"]
+                values[i] = value["uint"] if value["type"] == 2 else decode_bytes(value["bytes"])
+        return tuple(values)
+
+    def decode_columns(self, states, dtype=np.float64):
+        """Returns the integer schema keys of many state lists as columnar numpy arrays
+        :param states: list of state lists returned by the indexer
+        :type states: list
+        :param dtype: dtype of the arrays
+        :type dtype: numpy dtype, optional
+        :return: dict of key to array with one value per state, 0 where the key is missing
+        :rtype: dict
+        """
+        column_table = self._column_table
+        columns = [[0] * len(states) for _ in self.keys]
+        for j, state in enumerate(states):
+            for item in state:
+                i = column_table.get(item["key"])
+                if i is not None:
+                    columns[i][j] = item["value"]["uint"]
+        return {key: np.array(column, dtype=dtype) for key, column in zip(self.keys, columns)}
@@ -0,0 +1,280 @@
+import functools
+import inspect
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_ENDPOINT_IDS = re.compile(r"/(\d+|[A-Z2-7]{52}|[A-Z2-7]{58})(?=/|$)")
+_APPLICATION_PATH = re.compile(r"/applications/(\d+)")
+
+
+def endpoint_template(path):
+    """Returns a request path with app ids, asset ids, rounds, addresses and transaction ids replaced by {}
+    :param path: request path without the query string
+    :type path: str
+    :return: endpoint template, e.g. /v2/applications/{}
+    :rtype: str
+    """
+    return _ENDPOINT_IDS.sub("/{}", path)
+
+
+def request_app_id(path, params=None):
+    """Returns the application a request reads, from its path or its application-id parameter
+    :param path: request path without the query string
+    :type path: str
+    :param params: request query parameters
+    :type params: dict, optional
+    :return: application id, None if the request is not about a single application
+    :rtype: int
+    """
+    m = _APPLICATION_PATH.search(path)
+    if m:
+        return int(m.group(1))
+    if params and params.get("application-id") is not None:
+        return int(params["application-id"])
+    return None
+
+
+class Histogram:
+    """Cumulative histogram of observed values"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """Constructor method for :class:`Histogram` class
+        :param buckets: sorted upper bounds of the buckets, an implicit +Inf bucket is added
+        :type buckets: tuple, optional
+        """
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.bucket_counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self):
+        cumulative = []
+        total = 0
+        for count in self.bucket_counts:
+            total += count
+            cumulative.append(total)
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(zip(self.buckets + (float("inf"),), cumulative)),
+        }
+
+
+class Metrics:
+    """
+    Registry of SDK metrics. Records every algod and indexer request made through the SDK clients and the duration
+    of high-level operations, as counters and histograms labelled by service, endpoint and operation. Listeners are
+    called with a dict describing every request and operation as it completes.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self._counters = {}
+        self._histograms = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback):
+        """Registers a callback called with a dict for every recorded request or operation
+        :param callback: callable taking one dict
+        :type callback: callable
+        """
+        with self._lock:
+            self._listeners = self._listeners + [callback]
+
+    def remove_listener(self, callback):
+        """Unregisters a callback added with :meth:`add_listener`
+        :param callback: the callback
+        :type callback: callable
+        """
+        with self._lock:
+            self._listeners = [listener for listener in self._listeners if listener is not callback]
+
+    def inc(self, name, value=1, **labels):
+        """Increments a counter
+        :param name: counter name
+        :type name: str
+        :param value: amount to add
+        :type value: float, optional
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """Records a value in a histogram
+        :param name: histogram name
+        :type name: str
+        :param value: observed value
+        :type value: float
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def _emit(self, event):
+        for listener in self._listeners:
+            listener(event)
+
+    def record_request(self, service, method, path, app_id, latency, request_size, response_size, status):
+        """Records an outbound request
+        :param service: "algod" or "indexer"
+        :type service: str
+        :param method: request method
+        :type method: str
+        :param path: request path without the query string
+        :type path: str
+        :param app_id: application the request reads, None if not about a single application
+        :type app_id: int
+        :param latency: seconds from sending the request to receiving the whole response
+        :type latency: float
+        :param request_size: request body size in bytes
+        :type request_size: int
+        :param response_size: response body size in bytes
+        :type response_size: int
+        :param status: response status code, None if no response was received
+        :type status: int
+        """
+        if not self.enabled:
+            return
+        endpoint = f"{method} {endpoint_template(path)}"
+        self.inc("requests_total", service=service, endpoint=endpoint, status=str(status))
+        self.inc("request_bytes_total", request_size, service=service, endpoint=endpoint)
+        self.inc("response_bytes_total", response_size, service=service, endpoint=endpoint)
+        self.observe("request_seconds", latency, service=service, endpoint=endpoint)
+        if app_id is not None:
+            self.inc("app_requests_total", service=service, app_id=str(app_id))
+        if self._listeners:
+            self._emit({
+                "type": "request", "service": service, "endpoint": endpoint, "path": path, "app_id": app_id,
+                "latency": latency, "request_size": request_size, "response_size": response_size, "status": status,
+            })
+
+    def record_operation(self, operation, duration, error=None):
+        """Records a high-level SDK operation
+        :param operation: operation name, e.g. "Perpetual.quote"
+        :type operation: str
+        :param duration: seconds the operation took
+        :type duration: float
+        :param error: exception raised by the operation
+        :type error: Exception, optional
+        """
+        if not self.enabled:
+            return
+        status = "ok" if error is None else "error"
+        self.inc("operations_total", operation=operation, status=status)
+        self.observe("operation_seconds", duration, operation=operation)
+        if self._listeners:
+            self._emit({"type": "operation", "operation": operation, "duration": duration, "error": error})
+
+    @contextmanager
+    def timer(self, operation):
+        """Context manager recording the duration of the block it wraps as an operation
+        :param operation: operation name
+        :type operation: str
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.record_operation(operation, time.perf_counter() - start, e)
+            raise
+        self.record_operation(operation, time.perf_counter() - start)
+
+    def counters(self):
+        """Returns the counters
+        :return: dict of (name, labels) to value, labels being a tuple of (label, value) pairs
+        :rtype: dict
+        """
+        with self._lock:
+            return dict(self._counters)
+
+    def histograms(self):
+        """Returns the histograms
+        :return: dict of (name, labels) to dict with "count", "sum" and cumulative "buckets"
+        :rtype: dict
+        """
+        with self._lock:
+            return {key: histogram.to_dict() for key, histogram in self._histograms.items()}
+
+    def to_prometheus(self, prefix="deridex_"):
+        """Returns the metrics in the Prometheus text exposition format
+        :param prefix: prefix of every metric name
+        :type prefix: str, optional
+        :rtype: str
+        """
+        def format_labels(labels, extra=()):
+            labels = tuple(labels) + tuple(extra)
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+        lines = []
+        previous = None
+        for (name, labels), value in sorted(self.counters().items()):
+            if name != previous:
+                lines.append(f"# TYPE {prefix}{name} counter")
+                previous = name
+            lines.append(f"{prefix}{name}{format_labels(labels)} {value}")
+        for (name, labels), histogram in sorted(self.histograms().items()):
+            if name != previous:
+                lines.append(f"# TYPE {prefix}{name} histogram")
+                previous = name
+            for bound, count in histogram["buckets"].items():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{prefix}{name}_bucket{format_labels(labels, (('le', le),))} {count}")
+            lines.append(f"{prefix}{name}_count{format_labels(labels)} {histogram['count']}")
+            lines.append(f"{prefix}{name}_sum{format_labels(labels)} {histogram['sum']}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Drops every recorded value"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+# Registry of the SDK. Operations decorated with timed are always recorded here, requests are recorded here unless
+# their client is given its own registry. Setting metrics.enabled to False turns recording off.
+metrics = Metrics()
+
+
+def timed(operation):
+    """Decorator recording every call of a function as an operation in the SDK :data:`metrics` registry
+    :param operation: operation name, e.g. "Perpetual.quote"
+    :type operation: str
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not metrics.enabled:
+                    return await func(*args, **kwargs)
+                with metrics.timer(operation):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            with metrics.timer(operation):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
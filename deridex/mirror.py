@@ -0,0 +1,337 @@
+import threading
+from base64 import b64encode
+from types import MappingProxyType
+import msgpack
+from algosdk import encoding
+from algosdk.error import AlgodHTTPError
+from .cache import StateCache, ROUND_TIME
+from .metrics import metrics
+from .utils import format_state
+
+# ValueDelta actions
+SET_BYTES = 1
+SET_UINT = 2
+DELETE = 3
+
+# Application call OnCompletion values
+OPT_IN = 1
+CLOSE_OUT = 2
+CLEAR_STATE = 3
+DELETE_APPLICATION = 5
+
+
+def _raw(value):
+    # Go strings holding arbitrary bytes are decoded with surrogateescape, undo it
+    return value.encode("utf-8", "surrogateescape") if isinstance(value, str) else value
+
+
+def _format_key(key):
+    key = _raw(key)
+    try:
+        return key.decode("utf-8")
+    except UnicodeDecodeError:
+        return key
+
+
+def _format_value(value_delta):
+    if value_delta.get("at") == SET_UINT:
+        return value_delta.get("ui", 0)
+    value = _raw(value_delta.get("bs", b""))
+    try:
+        return value.decode("utf-8")
+    except UnicodeDecodeError:
+        return b64encode(value).decode()
+
+
+def _apply(changes, state_delta):
+    for key, value_delta in state_delta.items():
+        changes[_format_key(key)] = None if value_delta.get("at") == DELETE else _format_value(value_delta)
+
+
+class StateMirror(StateCache):
+    """
+    :class:`StateCache` keeping the global states of a watched set of apps, and the local states read for them,
+    current to the latest round by following blocks from algod and applying their state deltas, instead of polling
+    the indexer. Latest reads of watched apps are served from memory; historical reads and reads of other apps go
+    to the indexer as with :class:`StateCache`. Pass it as the state_cache of a :class:`Perpetual` or
+    :class:`Option`.
+
+    Subscribers are called from the follower thread after every block changing a watched state.
+    """
+
+    def __init__(self, algod_client, indexer_client, app_ids=(), max_staleness=ROUND_TIME, max_workers=8, store=None,
+                 retry_interval=1.0):
+        """Constructor method for :class:`StateMirror` class
+        :param algod_client: algod client blocks and initial states are read from
+        :type algod_client: :class:`AlgodClient`
+        :param indexer_client: indexer client reads of apps that are not watched go to
+        :type indexer_client: :class:`IndexerClient`
+        :param app_ids: ids of the apps to watch
+        :type app_ids: iterable, optional
+        :param max_staleness: seconds a latest read of an app that is not watched is reused for within its round
+        :type max_staleness: float, optional
+        :param max_workers: number of global state reads issued concurrently by snapshot
+        :type max_workers: int, optional
+        :param store: persistent store recording latest indexer reads
+        :type store: :class:`SnapshotStore`, optional
+        :param retry_interval: seconds before following blocks again after an algod error
+        :type retry_interval: float, optional
+        """
+        super().__init__(indexer_client, max_staleness, max_workers, store)
+        self.algod_client = algod_client
+        self.retry_interval = retry_interval
+        self.round = None
+        self.error = None
+        self._globals = {}
+        self._locals = {}
+        self._subscribers = []
+        self._local_subscribers = []
+        self._thread = None
+        self._stop = threading.Event()
+        self.watch(app_ids)
+
+    def watch(self, app_ids):
+        """Starts mirroring the global states of apps, reading their current state from algod
+        :param app_ids: ids of the apps
+        :type app_ids: iterable
+        """
+        for app_id in app_ids:
+            if app_id not in self._globals:
+                self._seed(self._globals, app_id, lambda: self._read_global_state(app_id))
+
+    def watched(self):
+        """Returns the ids of the watched apps
+        :rtype: list
+        """
+        with self._lock:
+            return list(self._globals)
+
+    def _read_global_state(self, app_id):
+        application = self.algod_client.application_info(app_id)
+        return format_state(application["params"].get("global-state", []))
+
+    def _read_local_state(self, address, app_id):
+        try:
+            info = self.algod_client.account_application_info(address, app_id)
+        except AlgodHTTPError:
+            # Not opted in
+            return {}
+        return format_state(info.get("app-local-state", {}).get("key-value", []))
+
+    def _seed(self, states, key, read):
+        # A block applied while the state was read may have been missed, read again until none was
+        while True:
+            with self._lock:
+                round = self.round
+            state = MappingProxyType(read())
+            with self._lock:
+                if self.round == round:
+                    return states.setdefault(key, state)
+
+    def start(self):
+        """Starts following blocks from the current round"""
+        if self._thread is not None:
+            return
+        round = self.algod_client.status()["last-round"]
+        with self._lock:
+            self.round = round
+            app_ids = list(self._globals)
+            addresses = list(self._locals)
+        # States read before the round was known may be older than it
+        global_states = {app_id: MappingProxyType(self._read_global_state(app_id)) for app_id in app_ids}
+        local_states = {key: MappingProxyType(self._read_local_state(*key)) for key in addresses}
+        with self._lock:
+            self._globals.update(global_states)
+            self._locals.update(local_states)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._follow, name="deridex-mirror", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=True):
+        """Stops following blocks, the mirror keeps the states of the last applied round
+        :param wait: wait for the follower thread to exit, which may take until the next block
+        :type wait: bool, optional
+        """
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if wait and thread is not None:
+            thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop(wait=False)
+
+    def _follow(self):
+        while not self._stop.is_set():
+            try:
+                last_round = self.algod_client.status_after_block(self.round)["last-round"]
+                for round in range(self.round + 1, last_round + 1):
+                    if self._stop.is_set():
+                        return
+                    self.apply_block(round, self.algod_client.block_info(round_num=round, response_format="msgpack"))
+                self.error = None
+            except Exception as e:
+                # Blocks are applied in order, the failed one is fetched again
+                self.error = e
+                self._stop.wait(self.retry_interval)
+
+    def apply_block(self, round, block):
+        """Applies the state deltas of a block to the mirrored states and notifies subscribers
+        :param round: round of the block
+        :type round: int
+        :param block: block as returned by the algod block_info endpoint with response_format="msgpack"
+        :type block: bytes
+        """
+        block = msgpack.unpackb(block, raw=False, strict_map_key=False, unicode_errors="surrogateescape")
+        with self._lock:
+            watched = set(self._globals)
+        global_changes = {}
+        local_changes = {}
+        for stxn in block["block"].get("txns") or []:
+            self._collect(stxn, watched, global_changes, local_changes)
+
+        changed_globals = {}
+        changed_locals = {}
+        with self._lock:
+            for app_id, changes in global_changes.items():
+                if changes is None:
+                    self._globals[app_id] = MappingProxyType({})
+                    changed_globals[app_id] = {}
+                    continue
+                state = dict(self._globals[app_id])
+                for key, value in changes.items():
+                    if value is None:
+                        state.pop(key, None)
+                    else:
+                        state[key] = value
+                self._globals[app_id] = MappingProxyType(state)
+                changed_globals[app_id] = changes
+            for (address, app_id), (reset, changes) in local_changes.items():
+                if not reset and (address, app_id) not in self._locals:
+                    # Local states are mirrored once read, or from the opt in
+                    continue
+                state = {} if reset else dict(self._locals[(address, app_id)])
+                for key, value in changes.items():
+                    if value is None:
+                        state.pop(key, None)
+                    else:
+                        state[key] = value
+                self._locals[(address, app_id)] = MappingProxyType(state)
+                changed_locals[(address, app_id)] = changes
+            self.round = round
+        metrics.inc("mirror_blocks_total")
+        self._notify(round, changed_globals, changed_locals)
+
+    def _collect(self, stxn, watched, global_changes, local_changes):
+        txn = stxn.get("txn", {})
+        eval_delta = stxn.get("dt") or {}
+        app_id = txn.get("apid") or stxn.get("apid")
+        if app_id in watched:
+            on_complete = txn.get("apan", 0)
+            sender = encoding.encode_address(txn["snd"])
+            if on_complete == OPT_IN:
+                local_changes[(sender, app_id)] = (True, {})
+            if on_complete == DELETE_APPLICATION:
+                global_changes[app_id] = None
+            elif eval_delta.get("gd"):
+                _apply(global_changes.setdefault(app_id, {}), eval_delta["gd"])
+
+            accounts = [sender] + [encoding.encode_address(account) for account in txn.get("apat") or []]
+            accounts += [encoding.encode_address(account) for account in eval_delta.get("sa") or []]
+            for index, state_delta in (eval_delta.get("ld") or {}).items():
+                _, changes = local_changes.setdefault((accounts[index], app_id), (False, {}))
+                _apply(changes, state_delta)
+            if on_complete in (CLOSE_OUT, CLEAR_STATE):
+                local_changes[(sender, app_id)] = (True, {})
+        for inner in eval_delta.get("itx") or []:
+            self._collect(inner, watched, global_changes, local_changes)
+
+    def subscribe(self, callback, app_id=None, key=None):
+        """Registers a callback called as callback(app_id, changes, round) when the global state of a watched app
+        changes, changes being a dict of key to new value, None for deleted keys
+        :param callback: the callback
+        :type callback: callable
+        :param app_id: only call it for this app
+        :type app_id: int, optional
+        :param key: only call it when this key changes, e.g. "latest_price"
+        :type key: str, optional
+        """
+        with self._lock:
+            self._subscribers = self._subscribers + [(callback, app_id, key)]
+
+    def subscribe_local(self, callback, app_id=None):
+        """Registers a callback called as callback(app_id, address, changes, round) when a mirrored local state
+        changes
+        :param callback: the callback
+        :type callback: callable
+        :param app_id: only call it for this app
+        :type app_id: int, optional
+        """
+        with self._lock:
+            self._local_subscribers = self._local_subscribers + [(callback, app_id)]
+
+    def unsubscribe(self, callback):
+        """Unregisters a callback added with :meth:`subscribe` or :meth:`subscribe_local`
+        :param callback: the callback
+        :type callback: callable
+        """
+        with self._lock:
+            self._subscribers = [entry for entry in self._subscribers if entry[0] is not callback]
+            self._local_subscribers = [entry for entry in self._local_subscribers if entry[0] is not callback]
+
+    def _notify(self, round, changed_globals, changed_locals):
+        for app_id, changes in changed_globals.items():
+            for callback, subscribed_app_id, key in self._subscribers:
+                if subscribed_app_id not in (None, app_id) or (key is not None and key not in changes):
+                    continue
+                try:
+                    callback(app_id, changes, round)
+                except Exception as e:
+                    # A failing subscriber must not stop the mirror
+                    self.error = e
+        for (address, app_id), changes in changed_locals.items():
+            for callback, subscribed_app_id in self._local_subscribers:
+                if subscribed_app_id not in (None, app_id):
+                    continue
+                try:
+                    callback(app_id, address, changes, round)
+                except Exception as e:
+                    self.error = e
+
+    def _lookup(self, app_id, block, max_staleness):
+        if block is None:
+            with self._lock:
+                state = self._globals.get(app_id)
+                if state is not None:
+                    return state, self.round
+        return super()._lookup(app_id, block, max_staleness)
+
+    def get_global_state(self, app_id, block=None, max_staleness=None):
+        cached = self._lookup(app_id, block, max_staleness)
+        if cached is not None:
+            return cached
+        return super().get_global_state(app_id, block, max_staleness)
+
+    def get_local_state(self, address, app_id, block=None):
+        """Returns local state of address for app_id, from the mirror for the latest state of a watched app. The
+        local state is read from algod the first time and mirrored from then on.
+        :param address: address of account for which to get state
+        :type address: str
+        :param app_id: id of the application
+        :type app_id: int
+        :param block: block at which to get the historical local state
+        :type block: int, optional
+        :return: dict of local state of address for application with id app_id
+        :rtype: dict
+        """
+        if block is not None or app_id not in self._globals:
+            return super().get_local_state(address, app_id, block)
+        key = (address, app_id)
+        with self._lock:
+            state = self._locals.get(key)
+        if state is None:
+            state = self._seed(self._locals, key, lambda: self._read_local_state(address, app_id))
+        return dict(state)
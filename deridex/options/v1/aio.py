@@ -0,0 +1,132 @@
+import asyncio
+from .option import Option
+from ...aio import AsyncStateCache, AsyncSuggestedParamsProvider
+from ...cache import ROUND_TIME
+from ...metrics import timed
+
+
+class AsyncOption(Option):
+    def __init__(self, algod_client, indexer_client, network, option_type, underlying_asset, collateral_asset,
+                 max_staleness=ROUND_TIME, state_cache=None, params_provider=None):
+        """Asyncio counterpart of :class:`Option`. Every method reading from the network is a coroutine, instances
+        are created with :meth:`AsyncOption.load`.
+        :param algod_client: a class:`AsyncAlgodClient` for interacting with the network
+        :type algod_client: class:`AsyncAlgodClient`
+        :param indexer_client: a class:`AsyncIndexerClient` for interacting with the network
+        :type indexer_client: class:`AsyncIndexerClient`
+        :param option_type: a class:`OptionType` object for the type of option (e.g. call or put)
+        :type option_type: class:`OptionType`
+        :param underlying_asset: asset that the option is tracked against
+        :type underlying_asset: str
+        :param collateral_asset: asset used as pool collateral for the option
+        :type collateral_asset: str
+        :param network: what network to connect to
+        :type network: str
+        :param max_staleness: seconds a global state read is reused for within its round, 0 always re-reads
+        :type max_staleness: float
+        :param state_cache: a class:`AsyncStateCache` to share with other objects, one is created if not specified
+        :type state_cache: class:`AsyncStateCache`
+        :param params_provider: a class:`AsyncSuggestedParamsProvider` to share with other objects, one is created if
+            not specified
+        :type params_provider: class:`AsyncSuggestedParamsProvider`
+        """
+        if state_cache is None:
+            state_cache = AsyncStateCache(indexer_client, max_staleness)
+        if params_provider is None:
+            params_provider = AsyncSuggestedParamsProvider(algod_client)
+        self._setup(algod_client, indexer_client, network, option_type, underlying_asset, collateral_asset,
+                    max_staleness, state_cache, params_provider)
+
+    @classmethod
+    async def load(cls, algod_client, indexer_client, network, option_type, underlying_asset, collateral_asset,
+                   max_staleness=ROUND_TIME, state_cache=None, params_provider=None):
+        """Creates an :class:`AsyncOption` and loads its global state
+        :return: the loaded option
+        :rtype: class:`AsyncOption`
+        """
+        option = cls(algod_client, indexer_client, network, option_type, underlying_asset, collateral_asset,
+                     max_staleness, state_cache, params_provider)
+        await option.update_global_state()
+        return option
+
+    def __repr__(self):
+        return f"AsyncOption('{self.symbol}')"
+
+    def __str__(self):
+        return f"AsyncOption('{self.symbol}')"
+
+    @timed("AsyncOption.update_global_state")
+    async def update_global_state(self, force=False):
+        max_staleness = 0 if force else None
+        if self.dependent_app_ids is not None:
+            snapshot = await self.state_cache.snapshot({"option": self.appId, **self.dependent_app_ids}, self.block,
+                                                       max_staleness)
+            if (snapshot["option"]["data"] == self.dependent_app_ids["data"]
+                    and snapshot["data"]["oracle"] == self.dependent_app_ids["oracle"]):
+                self.global_states = snapshot
+                return
+
+        snapshot = await self.state_cache.snapshot({"option": self.appId}, self.block, max_staleness)
+        snapshot = await self.state_cache.snapshot({"data": snapshot["option"]["data"]}, self.block, max_staleness,
+                                                   base=snapshot)
+        self.global_states = await self.state_cache.snapshot({"oracle": snapshot["data"]["oracle"]}, self.block,
+                                                             max_staleness, base=snapshot)
+        self.dependent_app_ids = {
+            "data": self.global_states["option"]["data"],
+            "oracle": self.global_states["data"]["oracle"],
+        }
+
+    @timed("AsyncOption.update_local_state")
+    async def update_local_state(self, address):
+        self.local_state = await self.state_cache.get_local_state(address, self.appId, self.block)
+
+    async def update_suggested_params(self):
+        """Fetches the suggested params used by the transactions built next if the cached ones are stale
+        """
+        await self.params_provider.update()
+
+    @timed("AsyncOption.get_open_contracts")
+    async def get_open_contracts(self):
+        accounts = (await self.indexer.accounts(application_id=self.appId))["accounts"]
+        return self._open_contracts(accounts)
+
+    @timed("AsyncOption.opt_in")
+    async def opt_in(self, address):
+        local_state, _ = await asyncio.gather(
+            self.indexer.lookup_account_application_local_state(address, application_id=self.appId),
+            self.update_suggested_params(),
+        )
+        if local_state["apps-local-states"] is None:
+            return self._build_opt_in(address)
+        else:
+            return None
+
+    @timed("AsyncOption.quote")
+    async def quote(self, size, length):
+        await self.update_global_state()
+        return self._quote(size, length)
+
+    @timed("AsyncOption.available_collateral")
+    async def available_collateral(self):
+        assets = (await self.indexer.account_info(self.appAddr))["account"]["assets"]
+        return self._available_collateral(assets)
+
+    @timed("AsyncOption.create")
+    async def create(self, address, size, length, payment, atomic_group=None):
+        _, optin_tx = await asyncio.gather(self.update_global_state(), self.opt_in(address))
+        return self._build_create(address, size, length, payment, optin_tx, atomic_group)
+
+    @timed("AsyncOption.execute")
+    async def execute(self, address, target, atomic_group=None):
+        await asyncio.gather(self.update_global_state(), self.update_suggested_params())
+        return self._build_execute(address, target, atomic_group)
+
+    @timed("AsyncOption.mint")
+    async def mint(self, address, collateral_to, atomic_group=None):
+        await asyncio.gather(self.update_global_state(), self.update_suggested_params())
+        return self._build_mint(address, collateral_to, atomic_group)
+
+    @timed("AsyncOption.burn")
+    async def burn(self, address, pool_to, atomic_group=None):
+        await asyncio.gather(self.update_global_state(), self.update_suggested_params())
+        return self._build_burn(address, pool_to, atomic_group)
@@ -1,18 +1,14 @@
-import os
-import json
-from algosdk.v2client.algod import AlgodClient
-from algosdk.v2client.indexer import IndexerClient
-
 from .config import OptionType
 from .option import Option
-
-# contracts abspath
-my_path = os.path.abspath(os.path.dirname(__file__))
-OPTIONS_CONTRACTS_FPATH = os.path.join(my_path, "contracts.json")
+from ...cache import StateCache, ROUND_TIME
+from ...params import SuggestedParamsProvider
+from ...registry import get_option_contracts
+from ...transport import AlgodClient, IndexerClient, PooledTransport
 
 
 class Client:
-    def __init__(self, algod_client: AlgodClient, indexer_client: IndexerClient, address: str, network: str):
+    def __init__(self, algod_client: AlgodClient, indexer_client: IndexerClient, address: str, network: str,
+                 store=None):
         """Constructor method for generic client
 
         :param algod_client: a class:`AlgodClient` for interacting with the network
@@ -23,21 +19,22 @@ class Client:
         :type address: str
         :param network: what network to connect to
         :type network: str
+        :param store: persistent store global states are recorded to and warm-started from
+        :type store: class:`SnapshotStore`
         """
         self.address = address
         self.algod = algod_client
         self.indexer = indexer_client
         self.network = network
+        self.store = store
+        self.params_provider = SuggestedParamsProvider(algod_client)
 
     def get_default_params(self):
         """Initializes the transactions parameters for the client.
         """
-        params = self.algod.suggested_params()
-        params.flat_fee = True
-        params.fee = 1000
-        return params
+        return self.params_provider.get(1000)
 
-    def get_option(self, option_type, underlying_asset, collateral_asset):
+    def get_option(self, option_type, underlying_asset, collateral_asset, max_staleness=ROUND_TIME):
         """ Returns option object for the underlying_asset and collateral_asset pair
         :param option_type: a class:`OptionType` object for the type of option (e.g. call or put)
         :type option_type: class:`OptionType`
@@ -45,15 +42,19 @@ class Client:
         :type underlying_asset: str
         :param collateral_asset: asset used as pool collateral for the option
         :type collateral_asset: str
+        :param max_staleness: seconds a global state read is reused for within its round, 0 always re-reads
+        :type max_staleness: float
         :return: a class:`Option` object for the option_type, underlying_asset and collateral_asset
         :rtype: class:`Option`
         """
-        return Option(self.algod, self.indexer, self.network, option_type, underlying_asset, collateral_asset)
+        return Option(self.algod, self.indexer, self.network, option_type, underlying_asset, collateral_asset,
+                      max_staleness=max_staleness,
+                      state_cache=StateCache(self.indexer, max_staleness, store=self.store),
+                      params_provider=self.params_provider)
 
     def get_positions(self):
         # Pull contract info
-        with open(OPTIONS_CONTRACTS_FPATH, 'r') as contracts_file:
-            json_file = json.load(contracts_file)[self.network]['contracts']
+        json_file = get_option_contracts(self.network)
 
         # Iterate through known contracts and initialize option objects
         options = []
@@ -85,21 +86,25 @@ class Client:
 
 
 class TestnetClient(Client):
-    def __init__(self, algod_client=None, indexer_client=None, address=None):
+    def __init__(self, algod_client=None, indexer_client=None, address=None, store=None, pool_size=10):
+        transport = PooledTransport(pool_size)
         if algod_client is None:
-            algod_client = AlgodClient("", "https://node.testnet.algoexplorerapi.io", headers={"User-Agent": "algosdk"})
+            algod_client = AlgodClient("", "https://node.testnet.algoexplorerapi.io", headers={"User-Agent": "algosdk"},
+                                       transport=transport)
         if indexer_client is None:
             indexer_client = IndexerClient("", "https://algoindexer.testnet.algoexplorerapi.io",
-                                           headers={"User-Agent": "algosdk"})
-        super().__init__(algod_client, indexer_client, address, network="testnet")
+                                           headers={"User-Agent": "algosdk"}, transport=transport)
+        super().__init__(algod_client, indexer_client, address, network="testnet", store=store)
 
 
 class MainnetClient(Client):
-    def __init__(self, algod_client=None, indexer_client=None, address=None):
+    def __init__(self, algod_client=None, indexer_client=None, address=None, store=None, pool_size=10):
+        transport = PooledTransport(pool_size)
         if algod_client is None:
-            algod_client = AlgodClient("", "https://node.algoexplorerapi.io", headers={"User-Agent": "algosdk"})
+            algod_client = AlgodClient("", "https://node.algoexplorerapi.io", headers={"User-Agent": "algosdk"},
+                                       transport=transport)
         if indexer_client is None:
             indexer_client = IndexerClient("", "https://algoindexer.algoexplorerapi.io",
-                                           headers={"User-Agent": "algosdk"})
-        super().__init__(algod_client, indexer_client, address, network="mainnet")
+                                           headers={"User-Agent": "algosdk"}, transport=transport)
+        super().__init__(algod_client, indexer_client, address, network="mainnet", store=store)
 
@@ -1,14 +1,19 @@
+import copy
 import math
 from algosdk.future.transaction import ApplicationNoOpTxn, AssetTransferTxn, ApplicationOptInTxn
 from algosdk import encoding, logic
 
 from .config import OptionType
 from .contract_strings import OptionStrings, DataStrings
-from ...utils import read_global_state, read_local_state, get_option_app_id, format_state
+from ...utils import get_option_app_id, format_state
+from ...cache import StateCache, ROUND_TIME
+from ...params import SuggestedParamsProvider
+from ...metrics import timed
 
 
 class Option:
-    def __init__(self, algod_client, indexer_client, network, option_type, underlying_asset, collateral_asset):
+    def __init__(self, algod_client, indexer_client, network, option_type, underlying_asset, collateral_asset,
+                 max_staleness=ROUND_TIME, state_cache=None, params_provider=None):
         """Contructor class for option pools
         :param algod_client: a class:`AlgodClient` for interacting with the network
         :type algod_client: class:`AlgodClient`
@@ -22,7 +27,20 @@ class Option:
         :type collateral_asset: str
         :param network: what network to connect to
         :type network: str
+        :param max_staleness: seconds a global state read is reused for within its round, 0 always re-reads
+        :type max_staleness: float
+        :param state_cache: a class:`StateCache` to share with other objects, one is created if not specified
+        :type state_cache: class:`StateCache`
+        :param params_provider: a class:`SuggestedParamsProvider` to share with other objects, one is created if not
+            specified
+        :type params_provider: class:`SuggestedParamsProvider`
         """
+        self._setup(algod_client, indexer_client, network, option_type, underlying_asset, collateral_asset,
+                    max_staleness, state_cache, params_provider)
+        self.update_global_state()
+
+    def _setup(self, algod_client, indexer_client, network, option_type, underlying_asset, collateral_asset,
+               max_staleness, state_cache, params_provider):
         self.algod = algod_client
         self.indexer = indexer_client
         self.network = network
@@ -43,40 +61,84 @@ class Option:
         self.appId = get_option_app_id(self.network, self.symbol)
         self.appAddr = logic.get_application_address(self.appId)
 
-        option_global_state = read_global_state(self.indexer, self.appId)
-        data_global_state = read_global_state(self.indexer, option_global_state['data'])
-        oracle_global_state = read_global_state(self.indexer, data_global_state['oracle'])
-
-        self.global_states = {
-            "option":option_global_state,
-            "data": data_global_state,
-            "oracle": oracle_global_state
-        }
+        if state_cache is None:
+            state_cache = StateCache(self.indexer, max_staleness)
+        self.state_cache = state_cache
+        if params_provider is None:
+            params_provider = SuggestedParamsProvider(self.algod)
+        self.params_provider = params_provider
+        self.dependent_app_ids = self._stored_dependent_app_ids()
+        self.block = None
         self.local_state = {}
 
+    def _stored_dependent_app_ids(self):
+        # App ids recorded by a previous process let the first refresh read all three states at once
+        stored_option = self.state_cache.get_stored_global_state(self.appId)
+        if stored_option is None:
+            return None
+        stored_data = self.state_cache.get_stored_global_state(stored_option[0]["data"])
+        if stored_data is None:
+            return None
+        return {"data": stored_option[0]["data"], "oracle": stored_data[0]["oracle"]}
+
     def __repr__(self):
         return f"Option('{self.symbol}')"
 
     def __str__(self):
         return f"Option('{self.symbol}')"
 
-    def update_global_state(self):
-        option_global_state = read_global_state(self.indexer, self.appId)
-        data_global_state = read_global_state(self.indexer, option_global_state['data'])
-        oracle_global_state = read_global_state(self.indexer, data_global_state['oracle'])
-
-        self.global_states = {
-            "option": option_global_state,
-            "data": data_global_state,
-            "oracle": oracle_global_state
+    @timed("Option.update_global_state")
+    def update_global_state(self, force=False):
+        """Refreshes the option, data and oracle global state snapshot, all three states being of one round. States
+        of the latest round read less than max_staleness seconds ago are reused from the state cache. The first
+        refresh walks option -> data -> oracle, later refreshes read all three concurrently using the app ids found
+        by the previous one. An option returned by :meth:`at` reads the states of its past round.
+        :param force: re-read every state regardless of its age
+        :type force: bool
+        """
+        max_staleness = 0 if force else None
+        if self.dependent_app_ids is not None:
+            snapshot = self.state_cache.snapshot({"option": self.appId, **self.dependent_app_ids}, self.block,
+                                                 max_staleness)
+            if (snapshot["option"]["data"] == self.dependent_app_ids["data"]
+                    and snapshot["data"]["oracle"] == self.dependent_app_ids["oracle"]):
+                self.global_states = snapshot
+                return
+
+        # First read, or the option was pointed at new apps
+        snapshot = self.state_cache.snapshot({"option": self.appId}, self.block, max_staleness)
+        snapshot = self.state_cache.snapshot({"data": snapshot["option"]["data"]}, self.block, max_staleness,
+                                             base=snapshot)
+        self.global_states = self.state_cache.snapshot({"oracle": snapshot["data"]["oracle"]}, self.block,
+                                                       max_staleness, base=snapshot)
+        self.dependent_app_ids = {
+            "data": self.global_states["option"]["data"],
+            "oracle": self.global_states["data"]["oracle"],
         }
 
+    def at(self, block):
+        """Returns a copy of the option pinned to a past round. Its quotes are computed from the states of that
+        round, which are read once and then served from the state cache. Call update_global_state to load them.
+        :param block: the round to pin the copy to
+        :type block: int
+        :return: the pinned option
+        :rtype: class:`Option`
+        """
+        option = copy.copy(self)
+        option.block = block
+        return option
+
+    @timed("Option.update_local_state")
     def update_local_state(self, address):
-        self.local_state = read_local_state(self.indexer, address, self.appId)
+        self.local_state = self.state_cache.get_local_state(address, self.appId, self.block)
 
+    @timed("Option.get_open_contracts")
     def get_open_contracts(self):
-        results = {}
         accounts = self.indexer.accounts(application_id=self.appId)["accounts"]
+        return self._open_contracts(accounts)
+
+    def _open_contracts(self, accounts):
+        results = {}
         for account in accounts:
             address = account["address"]
             for app in account["apps-local-state"]:
@@ -90,27 +152,31 @@ class Option:
     def get_default_params(self):
         """Initializes the transactions parameters for the client.
         """
-        params = self.algod.suggested_params()
-        params.flat_fee = True
-        params.fee = 1000
-        return params
+        return self.params_provider.get(1000)
 
+    @timed("Option.opt_in")
     def opt_in(self, address):
         local_state = self.indexer.lookup_account_application_local_state(address, application_id=self.appId)["apps-local-states"]
         if local_state is None:
-            return ApplicationOptInTxn(
-                sender=address,
-                sp=self.get_default_params(),
-                index=self.appId,
-            )
+            return self._build_opt_in(address)
         else:
             return None
 
+    def _build_opt_in(self, address):
+        return ApplicationOptInTxn(
+            sender=address,
+            sp=self.get_default_params(),
+            index=self.appId,
+        )
+
     # User Functions
+    @timed("Option.quote")
     def quote(self, size, length):
         # Update global state
         self.update_global_state()
+        return self._quote(size, length)
 
+    def _quote(self, size, length):
         # Calculate contract cost
         price = self.global_states["oracle"]["latest_price"] / 1_000_000
         adjusted_size = size / self.global_states["option"]["contract_scale"]
@@ -123,8 +189,12 @@ class Option:
         protocol_fee = adjusted_size * price * (self.global_states["option"]["protocol_fee"] / 1_000_000)
         return int((premium + executor_reserve + protocol_fee) * 1_000_000)
 
+    @timed("Option.available_collateral")
     def available_collateral(self):
         assets = self.indexer.account_info(self.appAddr)["account"]["assets"]
+        return self._available_collateral(assets)
+
+    def _available_collateral(self, assets):
         for asset in assets:
             if asset["asset-id"] == self.global_states["option"]["cid"]:
                 total = asset["amount"]
@@ -132,6 +202,7 @@ class Option:
         locked = self.global_states["option"]["locked"]
         return total - locked
 
+    @timed("Option.create")
     def create(self, address, size, length, payment, atomic_group=None):
         """Create new option contract
         :param address: user address
@@ -148,7 +219,10 @@ class Option:
         """
         # Update global state
         self.update_global_state()
+        optin_tx = self.opt_in(address)
+        return self._build_create(address, size, length, payment, optin_tx, atomic_group)
 
+    def _build_create(self, address, size, length, payment, optin_tx, atomic_group=None):
         # Get network params
         suggested_params = self.get_default_params()
         suggested_params.flat_fee = True
@@ -201,7 +275,6 @@ class Option:
             amt=payment,
             index=int(self.global_states["option"]["cid"]),
         )
-        optin_tx = self.opt_in(address)
         if atomic_group:
             # If opted in
             if optin_tx is None:
@@ -214,10 +287,13 @@ class Option:
             else:
                 return [optin_tx, txn0, txn1]
 
+    @timed("Option.execute")
     def execute(self, address, target, atomic_group=None):
         # Update global state
         self.update_global_state()
+        return self._build_execute(address, target, atomic_group)
 
+    def _build_execute(self, address, target, atomic_group=None):
         # Get network params
         suggested_params_no_op = self.get_default_params()
         suggested_params_no_op.flat_fee = True
@@ -249,10 +325,13 @@ class Option:
         else:
             return [txn0]
 
+    @timed("Option.mint")
     def mint(self, address, collateral_to, atomic_group=None):
         # Update global state
         self.update_global_state()
+        return self._build_mint(address, collateral_to, atomic_group)
 
+    def _build_mint(self, address, collateral_to, atomic_group=None):
         # Get network params
         suggested_params = self.get_default_params()
         suggested_params.flat_fee = True
@@ -296,10 +375,13 @@ class Option:
         else:
             return [txn0, txn1]
 
+    @timed("Option.burn")
     def burn(self, address, pool_to, atomic_group=None):
         # Update global state
         self.update_global_state()
+        return self._build_burn(address, pool_to, atomic_group)
 
+    def _build_burn(self, address, pool_to, atomic_group=None):
         # Get network params
         suggested_params = self.get_default_params()
         suggested_params.flat_fee = True
@@ -0,0 +1,69 @@
+import copy
+import threading
+import time
+
+
+class SuggestedParamsProvider:
+    """
+    Caches algod suggested params and hands out copies with a flat fee. Params are re-fetched once they are older than
+    ttl seconds, they stay valid for 1000 rounds after the round they were fetched at.
+    """
+
+    def __init__(self, algod_client, ttl=30):
+        """Constructor method for :class:`SuggestedParamsProvider` class
+        :param algod_client: algod client
+        :type algod_client: :class:`AlgodClient`
+        :param ttl: seconds fetched params are reused for, 0 fetches on every call
+        :type ttl: float, optional
+        """
+        self.algod_client = algod_client
+        self.ttl = ttl
+        self._params = None
+        self._fetched_at = None
+        self._lock = threading.Lock()
+
+    def is_stale(self):
+        """Returns whether the cached params need to be re-fetched
+        :rtype: bool
+        """
+        return self._current() is None
+
+    def _current(self):
+        with self._lock:
+            if self._params is None or time.monotonic() - self._fetched_at >= self.ttl:
+                return None
+            return self._params
+
+    def _set(self, params):
+        with self._lock:
+            self._params = params
+            self._fetched_at = time.monotonic()
+
+    def refresh(self):
+        """Fetches new suggested params from algod"""
+        self._set(self.algod_client.suggested_params())
+
+    def get(self, fee=1000):
+        """Returns a copy of the suggested params with a flat fee, fetching them only if the cache is stale
+        :param fee: flat fee in microalgos
+        :type fee: int, optional
+        :return: suggested params
+        :rtype: :class:`SuggestedParams`
+        """
+        params = self._current()
+        if params is None:
+            params = self.algod_client.suggested_params()
+            self._set(params)
+        return self._with_fee(params, fee)
+
+    @staticmethod
+    def _with_fee(params, fee):
+        params = copy.copy(params)
+        params.flat_fee = True
+        params.fee = fee
+        return params
+
+    def invalidate(self):
+        """Drops the cached params so the next call fetches new ones"""
+        with self._lock:
+            self._params = None
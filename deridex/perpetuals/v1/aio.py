@@ -0,0 +1,179 @@
+import asyncio
+from base64 import b64decode
+from algosdk import encoding
+from algosdk.atomic_transaction_composer import AtomicTransactionComposer
+from .config import SIDE
+from .account import Account
+from .perpetual import Perpetual, Quote
+from ...aio import AsyncStateCache, AsyncSuggestedParamsProvider
+from ...metrics import timed
+from ...cache import GlobalStateSnapshot, ROUND_TIME
+
+
+class AsyncPerpetual(Perpetual):
+    """
+    Asyncio counterpart of :class:`Perpetual`. Every method reading from the network is a coroutine, instances are
+    created with :meth:`AsyncPerpetual.load`.
+    :param algod_client: an async algod client
+    :type algod_client: class:`AsyncAlgodClient`
+    :param indexer_client: an async indexer client
+    :type indexer_client: class:`AsyncIndexerClient`
+    :param network: the network to use
+    :type network: str
+    :param app_id: the app id of the perpetual
+    :type app_id: int
+    :param max_staleness: seconds a global state read is reused for within its round, 0 always re-reads
+    :type max_staleness: float
+    :param state_cache: global state cache to share with other objects, one is created if not specified
+    :type state_cache: class:`AsyncStateCache`
+    :param params_provider: suggested params cache to share with other objects, one is created if not specified
+    :type params_provider: class:`AsyncSuggestedParamsProvider`
+    """
+    def __init__(self, algod_client, indexer_client, network, appId, symbol, max_staleness=ROUND_TIME, state_cache=None,
+                 params_provider=None):
+        self.algod_client = algod_client
+        self.indexer_client = indexer_client
+        self.network = network
+        self.appId = appId
+        self.symbol = symbol
+        if state_cache is None:
+            state_cache = AsyncStateCache(indexer_client, max_staleness)
+        self.state_cache = state_cache
+        if params_provider is None:
+            params_provider = AsyncSuggestedParamsProvider(algod_client)
+        self.params_provider = params_provider
+        self.dependent_app_ids = self._stored_dependent_app_ids()
+        self.block = None
+        self.local_state = {}
+        self.vault_addr = None
+
+    @classmethod
+    async def load(cls, algod_client, indexer_client, network, appId, symbol, max_staleness=ROUND_TIME, state_cache=None,
+                   params_provider=None):
+        """
+        Create an :class:`AsyncPerpetual` and load its global state
+        :return: the loaded perpetual
+        :rtype: AsyncPerpetual
+        """
+        perpetual = cls(algod_client, indexer_client, network, appId, symbol, max_staleness, state_cache,
+                        params_provider)
+        await perpetual.update_global_state()
+        perpetual._load_contract_info()
+        return perpetual
+
+    def __repr__(self):
+        return f"AsyncPerpetual('{self.symbol}')"
+
+    def __str__(self):
+        return f"AsyncPerpetual('{self.symbol}')"
+
+    @timed("AsyncPerpetual.update_global_state")
+    async def update_global_state(self, force: bool = False):
+        max_staleness = 0 if force else None
+        if self.dependent_app_ids is None:
+            snapshot = await self.state_cache.snapshot({"self": self.appId}, self.block, max_staleness)
+        else:
+            snapshot = await self.state_cache.snapshot({"self": self.appId, **self.dependent_app_ids}, self.block,
+                                                       max_staleness)
+        dependent_app_ids = {name: snapshot["self"][name] for name in ("a1mk", "a2mk", "amm", "oracle")}
+        if dependent_app_ids != self.dependent_app_ids:
+            base = GlobalStateSnapshot({"self": snapshot["self"]}, snapshot.round)
+            snapshot = await self.state_cache.snapshot(dependent_app_ids, self.block, max_staleness, base=base)
+            self.dependent_app_ids = dependent_app_ids
+        self.global_state = snapshot
+
+    @timed("AsyncPerpetual.update_local_state")
+    async def update_local_state(self, account_obj):
+        manager_local_state = await self.state_cache.get_local_state(account_obj.address,
+                                                                     self.global_state["self"]["manager"], self.block)
+        self.vault_addr = encoding.encode_address(b64decode(manager_local_state["v"]))
+        self.local_state = await self.state_cache.get_local_state(self.vault_addr, self.appId, self.block)
+
+    async def update_suggested_params(self):
+        """
+        Fetch the suggested params used by the transactions built next if the cached ones are stale
+        """
+        await self.params_provider.update()
+
+    @timed("AsyncPerpetual.get_vault_accounts")
+    async def get_vault_accounts(self):
+        return {address: state async for address, state in self.iter_vault_accounts()}
+
+    async def iter_vault_accounts(self, page_size: int = None):
+        task = asyncio.ensure_future(self.indexer_client.accounts(application_id=self.appId, limit=page_size))
+        try:
+            while task is not None:
+                resp = await task
+                if resp.get("next-token") and resp["accounts"]:
+                    task = asyncio.ensure_future(self.indexer_client.accounts(
+                        application_id=self.appId, limit=page_size, next_page=resp["next-token"]
+                    ))
+                else:
+                    task = None
+                for address, state in self._vault_local_states(resp["accounts"]).items():
+                    yield address, state
+        finally:
+            if task is not None:
+                task.cancel()
+
+    @timed("AsyncPerpetual.get_position")
+    async def get_position(self, address: str, local_state: dict = None):
+        if local_state is None:
+            _, local_state = await asyncio.gather(
+                self.update_global_state(), self.state_cache.get_local_state(address, self.appId, self.block)
+            )
+        else:
+            await self.update_global_state()
+        return self._position(local_state)
+
+    @timed("AsyncPerpetual.get_positions_bulk")
+    async def get_positions_bulk(self, local_states: dict):
+        await self.update_global_state()
+        return self._positions_bulk(local_states)
+
+    @timed("AsyncPerpetual.opt_in")
+    async def opt_in(self, account_obj: Account):
+        local_state, _ = await asyncio.gather(
+            self.indexer_client.lookup_account_application_local_state(account_obj.address,
+                                                                       application_id=self.appId),
+            self.update_suggested_params(),
+        )
+        if local_state["apps-local-states"] is None:
+            return self._build_opt_in(account_obj)
+
+    @timed("AsyncPerpetual.quote")
+    async def quote(self, side: SIDE, amount: float, leverage: float):
+        await self.update_global_state()
+        return self._quote(side, amount, leverage)
+
+    @timed("AsyncPerpetual.quote_grid")
+    async def quote_grid(self, side: SIDE, amounts, leverages):
+        await self.update_global_state()
+        return self._quote_grid(side, amounts, leverages)
+
+    @timed("AsyncPerpetual.buy")
+    async def buy(self, quote: Quote, account_obj: Account, gtx: AtomicTransactionComposer = None):
+        await self.update_suggested_params()
+        return self._build_buy(quote, account_obj, gtx)
+
+    @timed("AsyncPerpetual.close")
+    async def close(self, account_obj: Account, gtx: AtomicTransactionComposer = None):
+        position, _ = await asyncio.gather(self.get_position(account_obj.address), self.update_suggested_params())
+        return self._build_close(position, account_obj, gtx)
+
+    @timed("AsyncPerpetual.liquidate")
+    async def liquidate(self, account_obj: Account, target: str, slippage: float = 0.01,
+                        gtx: AtomicTransactionComposer = None):
+        position, _ = await asyncio.gather(self.get_position(target), self.update_suggested_params())
+        return self._build_liquidate(position, account_obj, target, slippage, gtx)
+
+    @timed("AsyncPerpetual.add")
+    async def add(self, uAsset: int, uAsset_amount: int, account_obj: Account, gtx: AtomicTransactionComposer = None):
+        await asyncio.gather(self.update_local_state(account_obj), self.update_suggested_params())
+        return self._build_add(uAsset, uAsset_amount, account_obj, gtx)
+
+    @timed("AsyncPerpetual.remove")
+    async def remove(self, uAsset: int, uAsset_amount: int, account_obj: Account,
+                     gtx: AtomicTransactionComposer = None):
+        await asyncio.gather(self.update_local_state(account_obj), self.update_suggested_params())
+        return self._build_remove(uAsset, uAsset_amount, account_obj, gtx)
@@ -1,14 +1,15 @@
-import os
-import json
-from algosdk.v2client.algod import AlgodClient
-from algosdk.v2client.indexer import IndexerClient
 from algosdk.atomic_transaction_composer import AccountTransactionSigner
 from .perpetual import Perpetual
 from .account import Account
+from ...cache import StateCache, GlobalStateSnapshot, ROUND_TIME
+from ...params import SuggestedParamsProvider
+from ...registry import get_perpetual_contracts
+from ...transport import AlgodClient, IndexerClient, PooledTransport
 
 
 class Client:
-    def __init__(self, algod_client: AlgodClient, indexer_client: IndexerClient, account: Account, network: str):
+    def __init__(self, algod_client: AlgodClient, indexer_client: IndexerClient, account: Account, network: str,
+                 store=None):
         """Constructor method for generic client
 
         :param algod_client: a class:`AlgodClient` for interacting with the network
@@ -19,44 +20,84 @@ class Client:
         :type address: str
         :param network: what network to connect to
         :type network: str
+        :param store: persistent store global states are recorded to and warm-started from
+        :type store: class:`SnapshotStore`
         """
         self.account = account
         self.algod = algod_client
         self.indexer = indexer_client
         self.network = network
+        self.store = store
+        self.params_provider = SuggestedParamsProvider(algod_client)
 
-    def get_perpetual(self, symbol):
+    def get_perpetual(self, symbol, max_staleness=ROUND_TIME):
         """ Returns Perpetual object for the symbol
         :param symbol: a string for the symbol of the perpetual
         :type symbol: str
+        :param max_staleness: seconds a global state read is reused for within its round, 0 always re-reads
+        :type max_staleness: float
         :return: a class:`Perpetual` object for the symbol
         :rtype: class:`Perpetual`
         """
-        # Get info from json file
-        path = os.path.dirname(os.path.abspath(__file__))
-        with open(os.path.join(path, "contracts.json"), 'r') as contracts_file:
-            json_file = json.load(contracts_file)[self.network]
-            contract_info = json_file[symbol]
+        # Get info from contract registry
+        contract_info = get_perpetual_contracts(self.network)[symbol]
 
         appID = contract_info["appID"]
-        return Perpetual(self.algod, self.indexer, self.network, appID, symbol)
+        return Perpetual(self.algod, self.indexer, self.network, appID, symbol, max_staleness=max_staleness,
+                         state_cache=StateCache(self.indexer, max_staleness, store=self.store),
+                         params_provider=self.params_provider)
+
+    def get_all_perpetuals(self, max_staleness=ROUND_TIME, max_workers=8):
+        """ Returns a Perpetual object for every symbol of the network, sharing one state cache. The perpetual states
+        are read concurrently, then the markets, AMMs and oracles they depend on, each app being read once however
+        many perpetuals share it.
+        :param max_staleness: seconds a global state read is reused for within its round, 0 always re-reads
+        :type max_staleness: float
+        :param max_workers: number of global state reads issued concurrently
+        :type max_workers: int
+        :return: dict of symbol to class:`Perpetual` object
+        :rtype: dict
+        """
+        app_ids = {symbol: info["appID"] for symbol, info in get_perpetual_contracts(self.network).items()}
+        state_cache = StateCache(self.indexer, max_staleness, max_workers=max_workers, store=self.store)
+
+        perpetual_states = state_cache.snapshot(app_ids)
+        dependent_app_ids = {
+            symbol: {name: perpetual_states[symbol][name] for name in ("a1mk", "a2mk", "amm", "oracle")}
+            for symbol in app_ids
+        }
+        unique_app_ids = {app_id for ids in dependent_app_ids.values() for app_id in ids.values()}
+        # Read at the round of the perpetual states, every perpetual is assembled from states of that one round
+        states = state_cache.snapshot({app_id: app_id for app_id in unique_app_ids}, base=perpetual_states)
+
+        perpetuals = {}
+        for symbol, appID in app_ids.items():
+            dependent_states = {name: states[app_id] for name, app_id in dependent_app_ids[symbol].items()}
+            global_state = GlobalStateSnapshot({"self": states[symbol], **dependent_states}, states.round)
+            perpetuals[symbol] = Perpetual(self.algod, self.indexer, self.network, appID, symbol,
+                                           max_staleness=max_staleness, state_cache=state_cache,
+                                           params_provider=self.params_provider, global_state=global_state)
+        return perpetuals
 
 
 class TestnetClient(Client):
-    def __init__(self, algod_client=None, indexer_client=None, account=None, ):
+    def __init__(self, algod_client=None, indexer_client=None, account=None, store=None, pool_size=10):
+        transport = PooledTransport(pool_size)
         if algod_client is None:
-            algod_client = AlgodClient("", "https://node.testnet.algoexplorerapi.io", headers={"User-Agent": "algosdk"})
+            algod_client = AlgodClient("", "https://node.testnet.algoexplorerapi.io", headers={"User-Agent": "algosdk"},
+                                       transport=transport)
         if indexer_client is None:
             indexer_client = IndexerClient("", "https://algoindexer.testnet.algoexplorerapi.io",
-                                           headers={"User-Agent": "algosdk"})
-        super().__init__(algod_client, indexer_client, account, network="testnet")
+                                           headers={"User-Agent": "algosdk"}, transport=transport)
+        super().__init__(algod_client, indexer_client, account, network="testnet", store=store)
 
 
 class MainnetClient(Client):
-    def __init__(self, algod_client=None, indexer_client=None, account=None):
+    def __init__(self, algod_client=None, indexer_client=None, account=None, store=None, pool_size=10):
+        transport = PooledTransport(pool_size)
         if algod_client is None:
-            algod_client = AlgodClient("", "https://mainnet-api.algonode.cloud")
+            algod_client = AlgodClient("", "https://mainnet-api.algonode.cloud", transport=transport)
         if indexer_client is None:
             indexer_client = IndexerClient("", "https://mainnet-idx.algonode.cloud",
-                                           headers={"User-Agent": "algosdk"})
-        super().__init__(algod_client, indexer_client, account, network="mainnet")
\ No newline at end of file
+                                           headers={"User-Agent": "algosdk"}, transport=transport)
+        super().__init__(algod_client, indexer_client, account, network="mainnet", store=store)
\ No newline at end of file
@@ -4,3 +4,7 @@ from enum import Enum
 class SIDE(Enum):
     LONG = 0
     SHORT = 1
+
+
+# Keys of a vault local state in the perpetual app
+LOCAL_STATE_KEYS = ("pa", "ps", "a1bs", "a2bs")
@@ -0,0 +1,381 @@
+import bisect
+import numpy as np
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait as wait_futures
+from algosdk.atomic_transaction_composer import AtomicTransactionComposer
+from .templates import PerpetualTemplates
+from ...utils import read_local_state
+from ...metrics import timed
+from ...signing import GroupSigner
+from ...submitter import Submitter
+
+
+class LiquidationIndex:
+    """
+    Open positions of a perpetual sorted by liquidation price, separately for longs (including gov positions) and
+    shorts. Longs are liquidatable once the oracle price falls to their liquidation price, shorts once it rises to it.
+    Liquidation prices are computed against the perpetual global state snapshot current at insertion, call
+    :meth:`refresh` when market exchange rates or borrow totals have moved.
+    :param perpetual: the perpetual to index positions of
+    :type perpetual: class:`Perpetual`
+    """
+    def __init__(self, perpetual):
+        self.perpetual = perpetual
+        self.local_states = {}
+        self._entries = {}
+        self._prices = {"long": [], "short": []}
+        self._addresses = {"long": [], "short": []}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, address):
+        return address in self._entries
+
+    def rebuild(self, local_states: dict):
+        """
+        Re-index every position from local states, using the current perpetual global state snapshot
+        :param local_states: dict of address to local state, as returned by get_vault_accounts
+        :type local_states: dict
+        """
+        self.local_states = dict(local_states)
+        positions = self.perpetual._positions_bulk(self.local_states)
+        is_short = positions["side"] == "short"
+        is_indexed = ~np.isnan(positions["liq_price"])
+
+        self._entries = {}
+        for side, mask in (("long", ~is_short & is_indexed), ("short", is_short & is_indexed)):
+            prices = positions["liq_price"][mask]
+            addresses = positions["address"][mask]
+            order = np.argsort(prices, kind="stable")
+            self._prices[side] = prices[order].tolist()
+            self._addresses[side] = addresses[order].tolist()
+            self._entries.update(zip(self._addresses[side], ((side, price) for price in self._prices[side])))
+
+    def refresh(self):
+        """
+        Refresh the perpetual global state and recompute every liquidation price
+        """
+        self.perpetual.update_global_state()
+        self.rebuild(self.local_states)
+
+    def update(self, address: str, local_state: dict):
+        """
+        Re-index a single vault after its local state changed
+        :param address: the vault address
+        :type address: str
+        :param local_state: the new local state, None or empty if the vault closed out
+        :type local_state: dict
+        """
+        self.remove(address)
+        if not local_state:
+            return
+        self.local_states[address] = local_state
+        positions = self.perpetual._positions_bulk({address: local_state})
+        if len(positions["address"]) == 0 or np.isnan(positions["liq_price"][0]):
+            return
+        side = "short" if positions["side"][0] == "short" else "long"
+        price = float(positions["liq_price"][0])
+        i = bisect.bisect_right(self._prices[side], price)
+        self._prices[side].insert(i, price)
+        self._addresses[side].insert(i, address)
+        self._entries[address] = (side, price)
+
+    def update_many(self, local_states: dict, addresses):
+        """
+        Re-index the given vaults from a table of local states, vaults missing from it are removed
+        :param local_states: mapping of address to local state, e.g. a class:`VaultStateTable`
+        :type local_states: dict
+        :param addresses: the vault addresses to re-index
+        :type addresses: iterable
+        """
+        for address in addresses:
+            self.update(address, local_states[address] if address in local_states else None)
+
+    def remove(self, address: str):
+        """
+        Remove a vault from the index
+        :param address: the vault address
+        :type address: str
+        """
+        self.local_states.pop(address, None)
+        entry = self._entries.pop(address, None)
+        if entry is None:
+            return
+        side, price = entry
+        prices = self._prices[side]
+        addresses = self._addresses[side]
+        i = bisect.bisect_left(prices, price)
+        while addresses[i] != address:
+            i += 1
+        del prices[i]
+        del addresses[i]
+
+    def liquidation_price(self, address: str):
+        """
+        Get the oracle price (latest_price / 1e6) a vault becomes liquidatable at
+        :param address: the vault address
+        :type address: str
+        :return: the liquidation price, None if the vault has no indexed position
+        :rtype: float
+        """
+        entry = self._entries.get(address)
+        return entry[1] if entry is not None else None
+
+    def liquidatable(self, price: float = None):
+        """
+        Get the vaults liquidatable at an oracle price
+        :param price: the oracle price (latest_price / 1e6), the perpetual snapshot oracle price if not specified
+        :type price: float
+        :return: addresses of the liquidatable vaults, longs first
+        :rtype: list
+        """
+        if price is None:
+            price = self.perpetual.global_state["oracle"]["latest_price"] / 1e6
+        longs = self._addresses["long"][bisect.bisect_left(self._prices["long"], price):]
+        shorts = self._addresses["short"][:bisect.bisect_right(self._prices["short"], price)]
+        return longs + shorts
+
+    def nearest(self, price: float = None, n: int = 16):
+        """
+        Get the vaults whose liquidation price is closest to an oracle price, on either side of it
+        :param price: the oracle price (latest_price / 1e6), the perpetual snapshot oracle price if not specified
+        :type price: float
+        :param n: number of vaults
+        :type n: int
+        :return: addresses of the vaults, closest first
+        :rtype: list
+        """
+        if price is None:
+            price = self.perpetual.global_state["oracle"]["latest_price"] / 1e6
+        candidates = []
+        for side in ("long", "short"):
+            prices = self._prices[side]
+            i = bisect.bisect_left(prices, price)
+            for j in range(max(0, i - n), min(len(prices), i + n)):
+                candidates.append((abs(prices[j] - price), self._addresses[side][j]))
+        candidates.sort()
+        return [address for _, address in candidates[:n]]
+
+
+class LiquidationExecutor:
+    """
+    Liquidates many vaults at once by packing liquidate pairs (borrow payment + app call) into shared atomic groups,
+    signing each group once and submitting the groups concurrently. The targets of a failed group are sent again in
+    halves until the failing ones are isolated, so a target that is stale (already liquidated, or no longer
+    liquidatable) only fails itself.
+    :param perpetual: the perpetual to liquidate vaults of
+    :type perpetual: class:`Perpetual`
+    :param account_obj: the liquidator account
+    :type account_obj: class:`Account`
+    :param slippage: extra share of the borrow paid to cover interest accrued before execution
+    :type slippage: float
+    :param pairs_per_group: liquidations packed per group, at most 8 to fit the 16 transaction group limit
+    :type pairs_per_group: int
+    :param max_workers: number of groups submitted concurrently
+    :type max_workers: int
+    """
+    def __init__(self, perpetual, account_obj, slippage: float = 0.01, pairs_per_group: int = None,
+                 max_workers: int = 8):
+        max_pairs = AtomicTransactionComposer.MAX_GROUP_SIZE // 2
+        if pairs_per_group is None:
+            pairs_per_group = max_pairs
+        if not 1 <= pairs_per_group <= max_pairs:
+            raise Exception(f"pairs_per_group must be between 1 and {max_pairs}")
+        self.perpetual = perpetual
+        self.account_obj = account_obj
+        self.slippage = slippage
+        self.pairs_per_group = pairs_per_group
+        self.max_workers = max_workers
+
+    def build_groups(self, targets, local_states: dict = None):
+        """
+        Build the liquidation groups for targets against a single global state snapshot
+        :param targets: vault addresses to liquidate
+        :type targets: list
+        :param local_states: local states of the targets, read from the indexer for targets missing from it
+        :type local_states: dict
+        :return: list of (targets, group) pairs and dict of outcomes of the targets left out
+        :rtype: tuple
+        """
+        local_states = self._read_local_states(targets, local_states)
+        self.perpetual.update_global_state()
+        return self._pack(targets, local_states)
+
+    def _read_local_states(self, targets, local_states):
+        local_states = dict(local_states or {})
+        missing = [target for target in targets if target not in local_states]
+        if missing:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                local_states.update(zip(missing, executor.map(
+                    lambda target: read_local_state(self.perpetual.indexer_client, target, self.perpetual.appId),
+                    missing
+                )))
+        return local_states
+
+    def _pack(self, targets, local_states):
+        groups = []
+        outcomes = {}
+        group_targets = []
+        gtx = AtomicTransactionComposer()
+        for target in targets:
+            position = self.perpetual._position(local_states[target]) if local_states[target] else None
+            if position is None:
+                outcomes[target] = {"status": "skipped", "error": "Target has no position"}
+                continue
+            try:
+                self.perpetual._build_liquidate(position, self.account_obj, target, self.slippage, gtx)
+            except Exception as e:
+                outcomes[target] = {"status": "skipped", "error": str(e)}
+                continue
+            group_targets.append(target)
+            if len(group_targets) == self.pairs_per_group:
+                groups.append((group_targets, gtx))
+                group_targets = []
+                gtx = AtomicTransactionComposer()
+        if group_targets:
+            groups.append((group_targets, gtx))
+        return groups, outcomes
+
+    @timed("LiquidationExecutor.execute")
+    def execute(self, targets, local_states: dict = None, wait: bool = True, wait_rounds: int = 4):
+        """
+        Liquidate targets
+        :param targets: vault addresses to liquidate
+        :type targets: list
+        :param local_states: local states of the targets, read from the indexer for targets missing from it
+        :type local_states: dict
+        :param wait: wait for the groups to be confirmed
+        :type wait: bool
+        :param wait_rounds: rounds to wait for confirmation
+        :type wait_rounds: int
+        :return: dict of target to outcome, with a "status" of "confirmed", "submitted", "failed" or "skipped" and
+            the index of the group the target was first packed in
+        :rtype: dict
+        """
+        local_states = self._read_local_states(targets, local_states)
+        self.perpetual.update_global_state()
+        groups, outcomes = self._pack(targets, local_states)
+
+        def submit(gtx):
+            if wait:
+                response = gtx.execute(self.perpetual.algod_client, wait_rounds)
+                return {"status": "confirmed", "txids": response.tx_ids, "confirmed_round": response.confirmed_round}
+            return {"status": "submitted", "txids": gtx.submit(self.perpetual.algod_client)}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Future to (targets, index of the group they were first packed in)
+            pending = {executor.submit(submit, gtx): (group_targets, i)
+                       for i, (group_targets, gtx) in enumerate(groups)}
+            while pending:
+                done, _ = wait_futures(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    group_targets, i = pending.pop(future)
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        if len(group_targets) > 1:
+                            # One stale target fails the whole group, the others are sent again in halves
+                            half = len(group_targets) // 2
+                            for part in (group_targets[:half], group_targets[half:]):
+                                retry_groups, retry_outcomes = self._pack(part, local_states)
+                                outcomes.update(retry_outcomes)
+                                for retry_targets, gtx in retry_groups:
+                                    pending[executor.submit(submit, gtx)] = (retry_targets, i)
+                            continue
+                        outcome = {"status": "failed", "error": str(e)}
+                    for target in group_targets:
+                        outcomes[target] = dict(outcome, group=i)
+        return outcomes
+
+
+class LiquidationStandby:
+    """
+    Keeps signed liquidation groups ready for the vaults closest to their liquidation price, so that an oracle move
+    only requires submitting them. Call :meth:`refresh` every round: groups are signed for vaults entering the
+    standby set, signed again when the vault position changed or when their validity window runs out, and dropped
+    for vaults leaving the set. Every group liquidates a single vault.
+    :param index: index of the perpetual positions, kept up to date by the caller
+    :type index: class:`LiquidationIndex`
+    :param account_obj: the liquidator account
+    :type account_obj: class:`Account`
+    :param size: number of vaults kept on standby
+    :type size: int
+    :param slippage: extra share of the borrow paid to cover interest accrued before execution
+    :type slippage: float
+    :param min_valid_rounds: groups valid for fewer rounds than this are signed again with new params
+    :type min_valid_rounds: int
+    :param submitter: submitter the groups are sent with, one waiting for confirmations is created if not specified
+    :type submitter: class:`Submitter`
+    """
+    def __init__(self, index: LiquidationIndex, account_obj, size: int = 16, slippage: float = 0.01,
+                 min_valid_rounds: int = 10, submitter: Submitter = None):
+        self.index = index
+        self.perpetual = index.perpetual
+        self.size = size
+        self.slippage = slippage
+        self.min_valid_rounds = min_valid_rounds
+        self.templates = PerpetualTemplates(self.perpetual, account_obj)
+        self.signer = GroupSigner([account_obj.signer.private_key], max_workers=1)
+        if submitter is None:
+            submitter = Submitter(self.perpetual.algod_client)
+        self.submitter = submitter
+        # Vault address to (signed group, local state it was built from)
+        self.groups = {}
+
+    def __len__(self):
+        return len(self.groups)
+
+    def __contains__(self, address):
+        return address in self.groups
+
+    @timed("LiquidationStandby.refresh")
+    def refresh(self, round: int = None, price: float = None):
+        """
+        Bring the standby groups up to date with the index
+        :param round: the last confirmed round, read from algod if not specified
+        :type round: int
+        :param price: the oracle price (latest_price / 1e6), the perpetual snapshot oracle price if not specified
+        :type price: float
+        :return: number of groups signed
+        :rtype: int
+        """
+        if round is None:
+            round = self.perpetual.algod_client.status()["last-round"]
+        if self.perpetual.get_suggested_params().last - round <= self.min_valid_rounds:
+            self.perpetual.params_provider.refresh()
+
+        groups = {}
+        to_sign = []
+        for address in self.index.nearest(price, self.size):
+            local_state = self.index.local_states[address]
+            entry = self.groups.get(address)
+            if (entry is not None and entry[1] == local_state
+                    and entry[0].transactions[0].last_valid_round - round > self.min_valid_rounds):
+                groups[address] = entry
+                continue
+            position = self.perpetual._position(local_state)
+            if position is None:
+                continue
+            group = self.templates.liquidate(position, address, self.slippage, force=True)
+            groups[address] = (group, local_state)
+            to_sign.append(group)
+        self.signer.sign(to_sign)
+        self.groups = groups
+        return len(to_sign)
+
+    @timed("LiquidationStandby.trigger")
+    def trigger(self, price: float = None):
+        """
+        Submit the standby groups of the vaults liquidatable at an oracle price. A group is submitted once, the vault
+        gets a new one on the next refresh if it is still open.
+        :param price: the oracle price (latest_price / 1e6), the perpetual snapshot oracle price if not specified
+        :type price: float
+        :return: dict of vault address to the future of its group
+        :rtype: dict
+        """
+        futures = {}
+        for address in self.index.liquidatable(price):
+            entry = self.groups.pop(address, None)
+            if entry is not None:
+                futures[address] = self.submitter.submit(entry[0])
+        return futures
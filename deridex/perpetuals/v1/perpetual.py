@@ -1,16 +1,24 @@
+import copy
 import math
-import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from base64 import b64decode, b64encode
 from algosdk import account, encoding, mnemonic
 from algosdk.logic import get_application_address
 from algosdk.atomic_transaction_composer import AtomicTransactionComposer, TransactionWithSigner, AccountTransactionSigner
-from algosdk.abi import Contract
 from algosdk.error import AlgodHTTPError
 from algosdk.future.transaction import (StateSchema, ApplicationOptInTxn, ApplicationCallTxn, ApplicationCreateTxn, PaymentTxn,
                                         AssetCreateTxn, AssetTransferTxn, OnComplete)
-from .config import SIDE
+from .config import SIDE, LOCAL_STATE_KEYS
 from .account import Account
-from ...utils import read_global_state, read_local_state, get_option_app_id, format_state
+from ...utils import get_option_app_id
+from ...cache import StateCache, GlobalStateSnapshot, ROUND_TIME
+from ...params import SuggestedParamsProvider
+from ...registry import get_abi_contract, PERPETUAL_ABI_FPATH, MANAGER_ABI_FPATH
+from ...decoder import StateDecoder
+from ...metrics import timed
+
+LOCAL_STATE_DECODER = StateDecoder(LOCAL_STATE_KEYS)
 
 
 class Quote:
@@ -41,31 +49,49 @@ class Perpetual:
     :type network: str
     :param app_id: the app id of the perpetual
     :type app_id: int
+    :param max_staleness: seconds a global state read is reused for within its round, 0 always re-reads
+    :type max_staleness: float
+    :param state_cache: global state cache to share with other objects, one is created if not specified
+    :type state_cache: class:`StateCache`
+    :param params_provider: suggested params cache to share with other objects, one is created if not specified
+    :type params_provider: class:`SuggestedParamsProvider`
+    :param global_state: snapshot of the perpetual and its markets, AMM and oracle already read, read if not specified
+    :type global_state: class:`GlobalStateSnapshot`
     """
-    def __init__(self, algod_client, indexer_client, network, appId, symbol):
+    def __init__(self, algod_client, indexer_client, network, appId, symbol, max_staleness=ROUND_TIME, state_cache=None,
+                 params_provider=None, global_state=None):
         self.algod_client = algod_client
         self.indexer_client = indexer_client
         self.network = network
         self.appId = appId
         self.symbol = symbol
+        if state_cache is None:
+            state_cache = StateCache(indexer_client, max_staleness)
+        self.state_cache = state_cache
+        if params_provider is None:
+            params_provider = SuggestedParamsProvider(algod_client)
+        self.params_provider = params_provider
+        self.dependent_app_ids = self._stored_dependent_app_ids()
+        self.block = None
 
-        # Get state
-        self.global_state = {
-            "self": read_global_state(indexer_client, self.appId),
-        }
-        self.global_state["a1mk"] = read_global_state(indexer_client, self.global_state["self"]["a1mk"])
-        self.global_state["a2mk"] = read_global_state(indexer_client, self.global_state["self"]["a2mk"])
-        self.global_state["amm"] = read_global_state(indexer_client, self.global_state["self"]["amm"])
-        self.global_state["oracle"] = read_global_state(indexer_client, self.global_state["self"]["oracle"])
         self.local_state = {}
         self.vault_addr = None
 
+        # Get state
+        if global_state is None:
+            self.update_global_state()
+        else:
+            self.global_state = global_state
+            self.dependent_app_ids = {name: global_state["self"][name] for name in ("a1mk", "a2mk", "amm", "oracle")}
+        self._load_contract_info()
+
+    def _load_contract_info(self):
+        """
+        Load the ABI and the static contract info held in the perpetual global state
+        """
         # Get ABI
-        path = os.path.dirname(os.path.abspath(__file__))
-        with open(os.path.join(path, "abi/perpetual.json"), "r") as f:
-            self.perpetual_contract = Contract.from_json(f.read())
-        with open(os.path.join(path, "abi/manager.json"), "r") as f:
-            self.manager_contract = Contract.from_json(f.read())
+        self.perpetual_contract = get_abi_contract(PERPETUAL_ABI_FPATH)
+        self.manager_contract = get_abi_contract(MANAGER_ABI_FPATH)
 
         # Get info from contract
         self.a1 = self.global_state["self"]["a1"]
@@ -83,49 +109,113 @@ class Perpetual:
     def __str__(self):
         return f"Perpetual('{self.symbol}')"
 
-    def update_global_state(self):
-        self.global_state["self"] = read_global_state(self.indexer_client, self.appId)
-        self.global_state["a1mk"] = read_global_state(self.indexer_client, self.global_state["self"]["a1mk"])
-        self.global_state["a2mk"] = read_global_state(self.indexer_client, self.global_state["self"]["a2mk"])
-        self.global_state["amm"] = read_global_state(self.indexer_client, self.global_state["self"]["amm"])
-        self.global_state["oracle"] = read_global_state(self.indexer_client, self.global_state["self"]["oracle"])
-
+    @timed("Perpetual.update_global_state")
+    def update_global_state(self, force: bool = False):
+        """
+        Refresh the global state snapshot of the perpetual and its markets, AMM and oracle, all five states being of
+        one round. States of the latest round read less than max_staleness seconds ago are reused from the state
+        cache. Once the dependent app ids are known all five states are read concurrently. A perpetual returned by :meth:`at` reads the states of its past round.
+        :param force: re-read every state regardless of its age
+        :type force: bool
+        """
+        max_staleness = 0 if force else None
+        if self.dependent_app_ids is None:
+            snapshot = self.state_cache.snapshot({"self": self.appId}, self.block, max_staleness)
+        else:
+            snapshot = self.state_cache.snapshot({"self": self.appId, **self.dependent_app_ids}, self.block,
+                                                 max_staleness)
+        dependent_app_ids = {name: snapshot["self"][name] for name in ("a1mk", "a2mk", "amm", "oracle")}
+        if dependent_app_ids != self.dependent_app_ids:
+            # First read, or the perpetual was pointed at new apps
+            base = GlobalStateSnapshot({"self": snapshot["self"]}, snapshot.round)
+            snapshot = self.state_cache.snapshot(dependent_app_ids, self.block, max_staleness, base=base)
+            self.dependent_app_ids = dependent_app_ids
+        self.global_state = snapshot
+
+    def at(self, block: int):
+        """
+        Get a copy of the perpetual pinned to a past round. Its quotes and positions are computed from the states of
+        that round, which are read once and then served from the state cache. Call update_global_state to load them.
+        :param block: the round to pin the copy to
+        :type block: int
+        :return: the pinned perpetual
+        :rtype: Perpetual
+        """
+        perpetual = copy.copy(self)
+        perpetual.block = block
+        return perpetual
+
+    def _stored_dependent_app_ids(self):
+        # App ids recorded by a previous process let the first refresh read all five states at once
+        stored = self.state_cache.get_stored_global_state(self.appId)
+        if stored is None:
+            return None
+        return {name: stored[0][name] for name in ("a1mk", "a2mk", "amm", "oracle")}
+
+    @timed("Perpetual.update_local_state")
     def update_local_state(self, account_obj):
-        manager_local_state = read_local_state(self.indexer_client, account_obj.address, self.global_state["self"]["manager"])
+        manager_local_state = self.state_cache.get_local_state(account_obj.address, self.global_state["self"]["manager"],
+                                                                self.block)
         self.vault_addr = encoding.encode_address(b64decode(manager_local_state["v"]))
-        self.local_state = read_local_state(self.indexer_client, self.vault_addr, self.appId)
+        self.local_state = self.state_cache.get_local_state(self.vault_addr, self.appId, self.block)
 
     def get_suggested_params(self, fee=1):
         """Initializes the transactions parameters for the client.
         """
-        params = self.algod_client.suggested_params()
-        params.flat_fee = True
-        params.fee = 1000 * fee
-        return params
+        return self.params_provider.get(1000 * fee)
 
+    @timed("Perpetual.get_vault_accounts")
     def get_vault_accounts(self):
         """
         Get vault accounts with their state
         """
-        results = {}
-        token = None
-        while True:
-            resp = self.indexer_client.accounts(application_id=self.appId, next_page=token)
-            accounts = resp["accounts"]
-            for account in accounts:
-                address = account["address"]
-                for app in account["apps-local-state"]:
-                    if app["id"] == self.appId:
-                        state = format_state(app["key-value"])
-                        results[address] = state
-                        break
-            if "next-token" in resp:
-                token = resp["next-token"]
-            else:
-                break
+        return dict(self.iter_vault_accounts())
 
+    def iter_vault_accounts(self, page_size: int = None):
+        """
+        Iterate over vault accounts with their state as indexer pages arrive. The next page is fetched in the
+        background while the current one is processed, closing the generator stops fetching.
+        :param page_size: number of accounts per indexer page, the indexer default if not specified
+        :type page_size: int
+        :return: generator of (address, local state) pairs
+        :rtype: generator
+        """
+        pages = self._iter_vault_pages(page_size)
+        try:
+            for resp in pages:
+                yield from self._vault_local_states(resp["accounts"]).items()
+        finally:
+            pages.close()
+
+    def _iter_vault_pages(self, page_size: int = None):
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="deridex-vaults")
+        future = executor.submit(self.indexer_client.accounts, application_id=self.appId, limit=page_size)
+        try:
+            while future is not None:
+                resp = future.result()
+                if resp.get("next-token") and resp["accounts"]:
+                    future = executor.submit(self.indexer_client.accounts, application_id=self.appId,
+                                             limit=page_size, next_page=resp["next-token"])
+                else:
+                    future = None
+                yield resp
+        finally:
+            if future is not None:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _vault_local_states(self, accounts):
+        decode = LOCAL_STATE_DECODER.decode
+        results = {}
+        for account in accounts:
+            address = account["address"]
+            for app in account["apps-local-state"]:
+                if app["id"] == self.appId:
+                    results[address] = decode(app["key-value"])
+                    break
         return results
 
+    @timed("Perpetual.get_position")
     def get_position(self, address: str, local_state: dict = None):
         """
         Get the position of a user
@@ -138,7 +228,10 @@ class Perpetual:
         """
         self.update_global_state()
         if local_state is None:
-            local_state = read_local_state(self.indexer_client, address, self.appId)
+            local_state = self.state_cache.get_local_state(address, self.appId, self.block)
+        return self._position(local_state)
+
+    def _position(self, local_state: dict):
         # Check if in any position
         if local_state["pa"] != 0:
             # If long
@@ -203,61 +296,128 @@ class Perpetual:
                     "leverage": int(current_leverage)
                 }
 
+    @timed("Perpetual.get_positions_bulk")
+    def get_positions_bulk(self, local_states: dict):
+        """
+        Get the positions of many vaults from a single global state snapshot
+        :param local_states: dict of address to local state, as returned by get_vault_accounts
+        :type local_states: dict
+        :return: dict of columnar numpy arrays, one row per vault with an open position. Keys are "address",
+            "side", "position_amt_bAsset", "position_amt_uAsset", "borrow_amt_bAsset", "borrow_amt_uAsset",
+            "leverage" (x100, truncated like get_position) and "liq_price" (oracle price the leverage reaches ml at)
+        :rtype: dict
+        """
+        self.update_global_state()
+        return self._positions_bulk(local_states)
+
+    def _positions_bulk(self, local_states: dict):
+        global_state_self = self.global_state["self"]
+
+        addresses = np.array(list(local_states.keys()), dtype=object)
+        states = list(local_states.values())
+        pa = np.fromiter((state.get("pa", 0) for state in states), dtype=np.int64, count=len(states))
+        ps = np.fromiter((state.get("ps", 0) for state in states), dtype=np.float64, count=len(states))
+        a1bs = np.fromiter((state.get("a1bs", 0) for state in states), dtype=np.float64, count=len(states))
+        a2bs = np.fromiter((state.get("a2bs", 0) for state in states), dtype=np.float64, count=len(states))
+
+        # Long and gov positions borrow a2 against a1, shorts borrow a1 against a2
+        is_long = pa == global_state_self["a1"]
+        is_short = pa == global_state_self["a2"]
+        is_gov = pa == 1
+        is_open = is_long | is_short | is_gov
+
+        a1_baer = self.global_state["a1mk"]["baer"] / 1e9
+        a2_baer = self.global_state["a2mk"]["baer"] / 1e9
+        price = self.global_state["oracle"]["latest_price"] / 1e6
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            borrow_amt_bAsset = np.trunc(np.where(
+                is_short,
+                a1bs / global_state_self["ta1bs"] * global_state_self["ta1b"],
+                a2bs / global_state_self["ta2bs"] * global_state_self["ta2b"],
+            ))
+            borrow_amt_uAsset = np.trunc(borrow_amt_bAsset * np.where(is_short, a1_baer, a2_baer))
+            position_amt_uAsset = np.trunc(ps * np.where(is_short, a2_baer, a1_baer))
+            oracle_price = np.where(is_short, 1 / price, price)
+            position_value = position_amt_uAsset * oracle_price
+            leverage = np.trunc(np.round(position_value / (position_value - borrow_amt_uAsset), 2) * 1e2)
+            # Oracle price (latest_price / 1e6) at which the leverage reaches ml
+            ml = global_state_self["ml"]
+            liq_price = borrow_amt_uAsset * ml / (position_amt_uAsset * (ml - 100))
+            liq_price = np.where(is_short, 1 / liq_price, liq_price)
+
+        side = np.where(is_long, "long", np.where(is_short, "short", "gov"))
+        return {
+            "address": addresses[is_open],
+            "side": side[is_open],
+            "position_amt_bAsset": ps[is_open].astype(np.int64),
+            "position_amt_uAsset": position_amt_uAsset[is_open],
+            "borrow_amt_bAsset": borrow_amt_bAsset[is_open],
+            "borrow_amt_uAsset": borrow_amt_uAsset[is_open],
+            "leverage": leverage[is_open],
+            "liq_price": liq_price[is_open],
+        }
+
+    @timed("Perpetual.opt_in")
     def opt_in(self, account_obj: Account):
         local_state = self.indexer_client.lookup_account_application_local_state(account_obj.address, application_id=self.appId)["apps-local-states"]
         if local_state is None:
-            # Generate vault account
-            vault_pk, vault_addr = account.generate_account()
-            vault_signer = AccountTransactionSigner(vault_pk)
+            return self._build_opt_in(account_obj)
 
-            gtx = AtomicTransactionComposer()
-            gtx.add_transaction(
-                TransactionWithSigner(
-                    PaymentTxn(
-                        sender=account_obj.address,
-                        sp=self.get_suggested_params(),
-                        receiver=vault_addr,
-                        amt=787_000
-                    ),
-                    account_obj.signer
-                )
-            )
-            gtx.add_method_call(
-                app_id=self.global_state["self"]["manager"],
-                on_complete=OnComplete.OptInOC,
-                method=self.manager_contract.get_method_by_name("vault"),
-                sender=vault_addr,
-                sp=self.get_suggested_params(),
-                signer=vault_signer,
-                method_args=[
-                    account_obj.address
-                ],
-            )
-            gtx.add_transaction(
-                TransactionWithSigner(
-                    PaymentTxn(
-                        sender=vault_addr,
-                        sp=self.get_suggested_params(),
-                        receiver=vault_addr,
-                        amt=0,
-                        rekey_to=self.manager_addr
-                    ),
-                    vault_signer
-                )
+    def _build_opt_in(self, account_obj: Account):
+        # Generate vault account
+        vault_pk, vault_addr = account.generate_account()
+        vault_signer = AccountTransactionSigner(vault_pk)
+
+        gtx = AtomicTransactionComposer()
+        gtx.add_transaction(
+            TransactionWithSigner(
+                PaymentTxn(
+                    sender=account_obj.address,
+                    sp=self.get_suggested_params(),
+                    receiver=vault_addr,
+                    amt=787_000
+                ),
+                account_obj.signer
             )
-            gtx.add_method_call(
-                app_id=self.global_state["self"]["manager"],
-                on_complete=OnComplete.OptInOC,
-                method=self.manager_contract.get_method_by_name("user"),
-                sender=account_obj.address,
-                sp=self.get_suggested_params(),
-                signer=account_obj.signer,
-                method_args=[
-                    vault_addr
-                ],
+        )
+        gtx.add_method_call(
+            app_id=self.global_state["self"]["manager"],
+            on_complete=OnComplete.OptInOC,
+            method=self.manager_contract.get_method_by_name("vault"),
+            sender=vault_addr,
+            sp=self.get_suggested_params(),
+            signer=vault_signer,
+            method_args=[
+                account_obj.address
+            ],
+        )
+        gtx.add_transaction(
+            TransactionWithSigner(
+                PaymentTxn(
+                    sender=vault_addr,
+                    sp=self.get_suggested_params(),
+                    receiver=vault_addr,
+                    amt=0,
+                    rekey_to=self.manager_addr
+                ),
+                vault_signer
             )
-            return gtx
+        )
+        gtx.add_method_call(
+            app_id=self.global_state["self"]["manager"],
+            on_complete=OnComplete.OptInOC,
+            method=self.manager_contract.get_method_by_name("user"),
+            sender=account_obj.address,
+            sp=self.get_suggested_params(),
+            signer=account_obj.signer,
+            method_args=[
+                vault_addr
+            ],
+        )
+        return gtx
 
+    @timed("Perpetual.quote")
     def quote(self, side: SIDE, amount: float, leverage: float):
         """
         Get the quote for a trade.
@@ -272,7 +432,9 @@ class Perpetual:
         """
         # Update state
         self.update_global_state()
+        return self._quote(side, amount, leverage)
 
+    def _quote(self, side: SIDE, amount: float, leverage: float):
         # Get quote
         if side == SIDE.LONG:
             in_bAsset = amount / (self.global_state["a2mk"]["baer"] / 1e9) * leverage
@@ -304,6 +466,61 @@ class Perpetual:
                 self.global_state["self"]["a1mk"], self.global_state["self"]["a2mk"]
             )
 
+    @timed("Perpetual.quote_grid")
+    def quote_grid(self, side: SIDE, amounts, leverages):
+        """
+        Get quotes for many trade amounts and leverages from a single global state snapshot
+        :param side: the side of the trades
+        :type side: SIDE
+        :param amounts: the amounts of the trades, broadcast against leverages (e.g. amounts[:, None] and
+            leverages[None, :] for a full grid)
+        :type amounts: array_like
+        :param leverages: the leverages of the trades
+        :type leverages: array_like
+        :return: dict of numpy arrays of the broadcast shape, with the same values as the matching :class:`Quote`
+            attributes. Keys are "amount", "leverage", "swap_out", "borrow_amt", "liq_price" and "price_impact"
+        :rtype: dict
+        """
+        self.update_global_state()
+        return self._quote_grid(side, amounts, leverages)
+
+    def _quote_grid(self, side: SIDE, amounts, leverages):
+        amounts, leverages = np.broadcast_arrays(np.asarray(amounts, dtype=np.float64),
+                                                 np.asarray(leverages, dtype=np.float64))
+        if side == SIDE.LONG:
+            in_baer = self.global_state["a2mk"]["baer"] / 1e9
+            out_baer = self.global_state["a1mk"]["baer"] / 1e9
+            in_balance = self.global_state["amm"]["b2"]
+            out_balance = self.global_state["amm"]["b1"]
+        elif side == SIDE.SHORT:
+            in_baer = self.global_state["a1mk"]["baer"] / 1e9
+            out_baer = self.global_state["a2mk"]["baer"] / 1e9
+            in_balance = self.global_state["amm"]["b1"]
+            out_balance = self.global_state["amm"]["b2"]
+        else:
+            raise Exception("Invalid side")
+        ml = self.global_state["self"]["ml"]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            swap_in_lf = amounts / in_baer * leverages * (1 - self.global_state["amm"]["sfp"] / 1e6)
+            swap_out_bamt = out_balance * swap_in_lf / (in_balance + swap_in_lf)
+            swap_out_amt = swap_out_bamt * out_baer
+            borrow_amt = amounts * (leverages - 1)
+            liq_price = borrow_amt * ml / (swap_out_amt * (ml - 100))
+            if side == SIDE.SHORT:
+                liq_price = 1 / liq_price
+            price_impact = 1.0 - (swap_in_lf / swap_out_bamt) / (in_balance / out_balance)
+
+        return {
+            "amount": amounts,
+            "leverage": leverages,
+            "swap_out": swap_out_amt,
+            "borrow_amt": borrow_amt,
+            "liq_price": liq_price,
+            "price_impact": price_impact,
+        }
+
+    @timed("Perpetual.buy")
     def buy(self, quote: Quote, account_obj: Account, gtx: AtomicTransactionComposer = None):
         """
         Buy a perpetual contract.
@@ -316,6 +533,9 @@ class Perpetual:
         :return:
         :rtype: AtomicTransactionComposer
         """
+        return self._build_buy(quote, account_obj, gtx)
+
+    def _build_buy(self, quote: Quote, account_obj: Account, gtx: AtomicTransactionComposer = None):
         # If not currently building a ATC, create one
         if gtx is None:
             gtx = AtomicTransactionComposer()
@@ -392,6 +612,7 @@ class Perpetual:
 
         return gtx
 
+    @timed("Perpetual.close")
     def close(self, account_obj: Account, gtx: AtomicTransactionComposer = None):
         """
         Close a position
@@ -403,7 +624,9 @@ class Perpetual:
         :rtype: AtomicTransactionComposer
         """
         position = self.get_position(account_obj.address)
+        return self._build_close(position, account_obj, gtx)
 
+    def _build_close(self, position: dict, account_obj: Account, gtx: AtomicTransactionComposer = None):
         # If not currently building a ATC, create one
         if gtx is None:
             gtx = AtomicTransactionComposer()
@@ -464,10 +687,15 @@ class Perpetual:
 
         return gtx
 
+    @timed("Perpetual.liquidate")
     def liquidate(self, account_obj: Account, target: str, slippage: float = 0.01, gtx: AtomicTransactionComposer = None):
 
         # Get the target's position
         position = self.get_position(target)
+        return self._build_liquidate(position, account_obj, target, slippage, gtx)
+
+    def _build_liquidate(self, position: dict, account_obj: Account, target: str, slippage: float = 0.01,
+                         gtx: AtomicTransactionComposer = None):
         if position["leverage"] < self.global_state["self"]["ml"]:
             raise Exception("Target position is not liquidatable")
 
@@ -512,6 +740,7 @@ class Perpetual:
 
         return gtx
 
+    @timed("Perpetual.add")
     def add(self, uAsset: int, uAsset_amount: int, account_obj: Account, gtx: AtomicTransactionComposer = None):
         """
         Add liquidity.
@@ -527,7 +756,9 @@ class Perpetual:
         :rtype: AtomicTransactionComposer
         """
         self.update_local_state(account_obj)
+        return self._build_add(uAsset, uAsset_amount, account_obj, gtx)
 
+    def _build_add(self, uAsset: int, uAsset_amount: int, account_obj: Account, gtx: AtomicTransactionComposer = None):
         # If not currently building a ATC, create one
         if gtx is None:
             gtx = AtomicTransactionComposer()
@@ -582,6 +813,7 @@ class Perpetual:
 
         return gtx
 
+    @timed("Perpetual.remove")
     def remove(self, uAsset: int, uAsset_amount: int, account_obj: Account, gtx: AtomicTransactionComposer = None):
         """
         Remove liquidity.
@@ -597,7 +829,21 @@ class Perpetual:
         :rtype: AtomicTransactionComposer
         """
         self.update_local_state(account_obj)
+        return self._build_remove(uAsset, uAsset_amount, account_obj, gtx)
+
+    def _supply_share(self, uAsset: int, uAsset_amount: int):
+        """
+        Get the supply share redeemed by removing uAsset_amount of uAsset liquidity
+        """
+        global_state_self = self.global_state["self"]
+        if uAsset == self.a1u:
+            bAsset_amount = uAsset_amount / (self.global_state["a1mk"]["baer"] / 1e9)
+            return bAsset_amount * global_state_self['ta1ss'] / global_state_self['ta1s']
+        bAsset_amount = uAsset_amount / (self.global_state["a2mk"]["baer"] / 1e9)
+        return bAsset_amount * global_state_self['ta2ss'] / global_state_self['ta2s']
 
+    def _build_remove(self, uAsset: int, uAsset_amount: int, account_obj: Account,
+                      gtx: AtomicTransactionComposer = None, supply_share: int = None):
         # If not currently building a ATC, create one
         if gtx is None:
             gtx = AtomicTransactionComposer()
@@ -606,13 +852,11 @@ class Perpetual:
         if uAsset == self.a1u:
             bAsset = self.a1
             market_app_id = global_state_self["a1mk"]
-            bAsset_amount = uAsset_amount / (self.global_state["a1mk"]["baer"] / 1e9)
-            supply_share = bAsset_amount * global_state_self['ta1ss'] / global_state_self['ta1s']
         else:
             bAsset = self.a2
             market_app_id = global_state_self["a2mk"]
-            bAsset_amount = uAsset_amount / (self.global_state["a2mk"]["baer"] / 1e9)
-            supply_share = bAsset_amount * global_state_self['ta2ss'] / global_state_self['ta2s']
+        if supply_share is None:
+            supply_share = self._supply_share(uAsset, uAsset_amount)
 
         gtx.add_method_call(
             app_id=self.appId,
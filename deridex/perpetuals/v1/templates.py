@@ -0,0 +1,156 @@
+import copy
+import math
+from algosdk.atomic_transaction_composer import AtomicTransactionComposer
+from .account import Account
+from ...templates import GroupTemplate, placeholder_address, placeholder_uint
+
+VAULT = placeholder_address(0)
+TARGET = placeholder_address(1)
+AMOUNT = placeholder_uint(0)
+LEVERAGE = placeholder_uint(1)
+SUPPLY_SHARE = placeholder_uint(2)
+
+# Global state entries embedded in the templates, templates are rebuilt when one of them changes
+STATIC_KEYS = ("a1mk", "a2mk", "amm", "oracle", "manager", "af_manager", "interface", "lp_manager")
+
+
+class PerpetualTemplates:
+    """
+    Transaction templates of the operations of one account on a perpetual. The group of an operation is encoded once
+    per combination of assets and markets, later uses copy it and only patch amounts, vault, liquidation target and
+    validity rounds. Groups are returned unsigned, as :class:`TransactionGroup`, to be signed with
+    sign_with_private_key or a :class:`GroupSigner`.
+    """
+
+    def __init__(self, perpetual, account_obj: Account):
+        """Constructor method for :class:`PerpetualTemplates` class
+        :param perpetual: the perpetual, with its global state loaded
+        :type perpetual: :class:`Perpetual`
+        :param account_obj: account sending the transactions
+        :type account_obj: :class:`Account`
+        """
+        self.perpetual = perpetual
+        self.account_obj = account_obj
+        self._templates = {}
+        self._static = None
+
+    def _template(self, key, build, placeholders):
+        static = tuple(self.perpetual.global_state["self"][name] for name in STATIC_KEYS)
+        if static != self._static:
+            self._templates = {}
+            self._static = static
+        template = self._templates.get(key)
+        if template is None:
+            # Encoded by the Perpetual methods themselves, on a copy holding the placeholder vault
+            prototype = copy.copy(self.perpetual)
+            prototype.vault_addr = VAULT
+            gtx = AtomicTransactionComposer()
+            build(prototype, gtx)
+            template = self._templates[key] = GroupTemplate.from_composer(gtx, placeholders)
+        return template
+
+    def _vault(self):
+        if self.perpetual.vault_addr is None:
+            raise Exception("Vault address unknown, call update_local_state first")
+        return self.perpetual.vault_addr
+
+    def buy(self, quote):
+        """
+        Build the group of Perpetual.buy for a quote
+        :param quote: quote of the position to open
+        :type quote: Quote
+        :return: unsigned group
+        :rtype: TransactionGroup
+        """
+        def build(prototype, gtx):
+            stub = copy.copy(quote)
+            stub.swap_in = AMOUNT
+            stub.leverage = LEVERAGE
+            prototype._build_buy(stub, self.account_obj, gtx)
+
+        key = ("buy", quote.in_asset, quote.in_basset, quote.out_basset, quote.in_mkt, quote.out_mkt)
+        template = self._template(key, build, {"vault": VAULT, "amount": AMOUNT, "leverage": LEVERAGE})
+        return template.build(self.perpetual.get_suggested_params(), vault=self._vault(), amount=quote.swap_in,
+                              leverage=quote.leverage)
+
+    def close(self, position: dict):
+        """
+        Build the group of Perpetual.close for the account position
+        :param position: position of the account vault, as returned by Perpetual.get_position
+        :type position: dict
+        :return: unsigned group
+        :rtype: TransactionGroup
+        """
+        key = ("close", position["position_asset"], position["borrow_asset"], position["borrow_uAsset"],
+               position["position_mkt"], position["borrow_mkt"])
+        template = self._template(key, lambda prototype, gtx: prototype._build_close(position, self.account_obj, gtx),
+                                  {"vault": VAULT})
+        return template.build(self.perpetual.get_suggested_params(), vault=self._vault())
+
+    def liquidate(self, position: dict, target: str, slippage: float = 0.01, force: bool = False):
+        """
+        Build the group of Perpetual.liquidate for a target
+        :param position: position of the target, as returned by Perpetual.get_position
+        :type position: dict
+        :param target: vault address of the position
+        :type target: str
+        :param slippage: share of the borrow paid on top of it
+        :type slippage: float
+        :param force: build the group even if the position is not liquidatable at the current oracle price, to
+            submit it once it is
+        :type force: bool
+        :return: unsigned group
+        :rtype: TransactionGroup
+        """
+        if not force and position["leverage"] < self.perpetual.global_state["self"]["ml"]:
+            raise Exception("Target position is not liquidatable")
+
+        def build(prototype, gtx):
+            stub = dict(position, leverage=math.inf, borrow_amt_bAsset=AMOUNT)
+            prototype._build_liquidate(stub, self.account_obj, TARGET, 0, gtx)
+
+        key = ("liquidate", position["position_asset"], position["borrow_asset"], position["position_mkt"],
+               position["borrow_mkt"])
+        template = self._template(key, build, {"target": TARGET, "amount": AMOUNT})
+        return template.build(self.perpetual.get_suggested_params(), target=target,
+                              amount=int(position["borrow_amt_bAsset"] * (1 + slippage)))
+
+    def add(self, uAsset: int, uAsset_amount: int):
+        """
+        Build the group of Perpetual.add
+        :param uAsset: asset to add
+        :type uAsset: int
+        :param uAsset_amount: amount to add
+        :type uAsset_amount: int
+        :return: unsigned group
+        :rtype: TransactionGroup
+        """
+        template = self._template(
+            ("add", uAsset),
+            lambda prototype, gtx: prototype._build_add(uAsset, AMOUNT, self.account_obj, gtx),
+            {"vault": VAULT, "amount": AMOUNT}
+        )
+        return template.build(self.perpetual.get_suggested_params(), vault=self._vault(), amount=uAsset_amount)
+
+    def remove(self, uAsset: int, uAsset_amount: int):
+        """
+        Build the group of Perpetual.remove
+        :param uAsset: asset to remove
+        :type uAsset: int
+        :param uAsset_amount: amount to remove
+        :type uAsset_amount: int
+        :return: unsigned group
+        :rtype: TransactionGroup
+        """
+        template = self._template(
+            ("remove", uAsset),
+            lambda prototype, gtx: prototype._build_remove(uAsset, 0, self.account_obj, gtx,
+                                                           supply_share=SUPPLY_SHARE),
+            {"vault": VAULT, "supply_share": SUPPLY_SHARE}
+        )
+        return template.build(self.perpetual.get_suggested_params(), vault=self._vault(),
+                              supply_share=int(self.perpetual._supply_share(uAsset, uAsset_amount)))
+
+    def clear(self):
+        """Drops every template"""
+        self._templates = {}
@@ -0,0 +1,132 @@
+from concurrent.futures import ThreadPoolExecutor
+from algosdk.error import IndexerHTTPError
+from ...utils import format_state
+
+# Message of the indexer error for an account it does not know, e.g. one closed before the round it is read at
+ACCOUNT_NOT_FOUND_ERROR = "no accounts found"
+
+
+class VaultStateTable:
+    """
+    Local table of the vault local states of a perpetual kept current incrementally. The first sync loads every vault,
+    later syncs only re-read the vaults touched by perpetual app calls confirmed since the last synced round. With a
+    store the table starts from the vaults recorded by a previous process instead of loading every vault.
+    :param perpetual: the perpetual to track vaults of
+    :type perpetual: class:`Perpetual`
+    :param max_workers: number of local state reads issued concurrently
+    :type max_workers: int
+    :param store: persistent store the table is loaded from and recorded to after every sync
+    :type store: class:`SnapshotStore`
+    """
+    def __init__(self, perpetual, max_workers: int = 8, store=None):
+        self.perpetual = perpetual
+        self.max_workers = max_workers
+        self.store = store
+        self.local_states = {}
+        self.round = None
+        if store is not None:
+            stored = store.load_local_states(perpetual.appId)
+            if stored is not None:
+                self.local_states, self.round = stored
+
+    def __len__(self):
+        return len(self.local_states)
+
+    def __contains__(self, address):
+        return address in self.local_states
+
+    def __getitem__(self, address):
+        return self.local_states[address]
+
+    def sync(self):
+        """
+        Bring the table up to date, with a full load on the first call. The table and its round are left unchanged
+        when an indexer read fails, the next sync covers the same rounds again.
+        :return: addresses that were (re)loaded, a superset of the vaults that changed
+        :rtype: set
+        """
+        if self.round is None:
+            return self.full_sync()
+
+        changed, current_round = self.get_changed_accounts(self.round + 1)
+        local_states = {}
+        if changed:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                local_states = dict(zip(changed, executor.map(self._read_local_state, changed)))
+            for address, local_state in local_states.items():
+                if local_state:
+                    self.local_states[address] = local_state
+                else:
+                    # Closed out of the perpetual
+                    self.local_states.pop(address, None)
+        self.round = current_round
+        if self.store is not None:
+            self.store.update_local_states(self.perpetual.appId, local_states, self.round)
+        return set(changed)
+
+    def _read_local_state(self, address):
+        # Only an account unknown to the indexer or not opted in is closed out, other errors abort the sync
+        try:
+            account = self.perpetual.indexer_client.account_info(address)["account"]
+        except IndexerHTTPError as e:
+            if ACCOUNT_NOT_FOUND_ERROR in str(e):
+                return {}
+            raise
+        for local_state in account.get("apps-local-state", []):
+            if local_state["id"] == self.perpetual.appId:
+                return format_state(local_state.get("key-value", []))
+        return {}
+
+    def full_sync(self):
+        """
+        Reload every vault from the indexer
+        :return: every address in the table
+        :rtype: set
+        """
+        local_states = {}
+        rounds = []
+        for resp in self.perpetual._iter_vault_pages():
+            local_states.update(self.perpetual._vault_local_states(resp["accounts"]))
+            rounds.append(resp["current-round"])
+        self.local_states = local_states
+        self.round = min(rounds)
+        if self.store is not None:
+            self.store.save_local_states(self.perpetual.appId, self.local_states, self.round)
+        return set(local_states)
+
+    def get_changed_accounts(self, min_round: int):
+        """
+        Get the accounts whose perpetual local state may have changed since min_round
+        :param min_round: first round to look at
+        :type min_round: int
+        :return: list of addresses and the indexer round they were searched up to
+        :rtype: tuple
+        """
+        changed = set()
+        touched = set()
+        current_round = None
+        token = None
+        while True:
+            resp = self.perpetual.indexer_client.search_transactions(
+                application_id=self.perpetual.appId, min_round=min_round, next_page=token
+            )
+            current_round = resp["current-round"] if current_round is None else min(current_round,
+                                                                                    resp["current-round"])
+            for txn in resp["transactions"]:
+                self._collect_accounts(txn, changed, touched)
+            if resp.get("next-token") and resp["transactions"]:
+                token = resp["next-token"]
+            else:
+                break
+        # Indexers not serving state deltas give none, every account the calls could touch is re-read instead
+        return list(changed or touched), current_round
+
+    def _collect_accounts(self, txn, changed, touched):
+        app_call = txn.get("application-transaction")
+        if app_call is not None and app_call["application-id"] == self.perpetual.appId:
+            for local_state_delta in txn.get("local-state-delta", []):
+                changed.add(local_state_delta["address"])
+            touched.add(txn["sender"])
+            touched.update(app_call.get("accounts", []))
+        for inner_txn in txn.get("inner-txns", []):
+            self._collect_accounts(inner_txn, changed, touched)
@@ -0,0 +1,92 @@
+import json
+import os
+from functools import lru_cache
+from algosdk.abi import Contract, Method
+
+# contracts abspath
+my_path = os.path.abspath(os.path.dirname(__file__))
+OPTIONS_CONTRACTS_FPATH = os.path.join(my_path, "options/v1/contracts.json")
+PERPETUALS_CONTRACTS_FPATH = os.path.join(my_path, "perpetuals/v1/contracts.json")
+PERPETUAL_ABI_FPATH = os.path.join(my_path, "perpetuals/v1/abi/perpetual.json")
+MANAGER_ABI_FPATH = os.path.join(my_path, "perpetuals/v1/abi/manager.json")
+
+
+class CachedSelectorMethod(Method):
+    """ABI method whose selector is computed once instead of on every call"""
+
+    def __init__(self, name, args, returns, desc=None):
+        super().__init__(name, args, returns, desc)
+        self.selector = super().get_selector()
+
+    def get_selector(self):
+        return self.selector
+
+
+class ContractABI:
+    """Parsed ABI contract with its methods indexed by name"""
+
+    def __init__(self, contract):
+        """Constructor method for :class:`ContractABI` class
+        :param contract: parsed ABI contract
+        :type contract: :class:`Contract`
+        """
+        methods = [CachedSelectorMethod(m.name, m.args, m.returns, m.desc) for m in contract.methods]
+        self.contract = Contract(contract.name, methods, contract.desc, contract.networks)
+        self.methods = {method.name: method for method in methods}
+        self.selectors = {method.name: method.selector for method in methods}
+
+    def get_method_by_name(self, name):
+        """Returns the method called name
+        :param name: name of the method
+        :type name: str
+        :return: ABI method
+        :rtype: :class:`Method`
+        """
+        try:
+            return self.methods[name]
+        except KeyError:
+            raise KeyError(f"found 0 methods for {name}")
+
+
+@lru_cache(maxsize=None)
+def load_json(fpath):
+    """Returns the parsed contents of a json file, reading it only once per process
+    :param fpath: path of the json file
+    :type fpath: str
+    :return: parsed json
+    :rtype: dict
+    """
+    with open(fpath, "r") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def get_abi_contract(fpath):
+    """Returns the ABI contract described by a json file, parsing it only once per process
+    :param fpath: path of the ABI json file
+    :type fpath: str
+    :return: parsed ABI contract
+    :rtype: :class:`ContractABI`
+    """
+    with open(fpath, "r") as f:
+        return ContractABI(Contract.from_json(f.read()))
+
+
+def get_perpetual_contracts(network):
+    """Returns the perpetual contract info of a network, keyed by symbol
+    :param network: network to get contracts for
+    :type network: str e.g. 'mainnet'
+    :return: dict of symbol to contract info
+    :rtype: dict
+    """
+    return load_json(PERPETUALS_CONTRACTS_FPATH)[network]
+
+
+def get_option_contracts(network):
+    """Returns the option contract info of a network, keyed by symbol
+    :param network: network to get contracts for
+    :type network: str e.g. 'testnet'
+    :return: dict of symbol to contract info
+    :rtype: dict
+    """
+    return load_json(OPTIONS_CONTRACTS_FPATH)[network]['contracts']
@@ -0,0 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Replay:
+    """
+    Replays a perpetual or option over past rounds. The states of every round are read concurrently once and kept in
+    the market state cache keyed by (app id, round), after which strategies run against each round without network
+    access.
+    """
+
+    def __init__(self, market, max_workers=16):
+        """Constructor method for :class:`Replay` class
+        :param market: the market to replay
+        :type market: :class:`Perpetual` or :class:`Option`
+        :param max_workers: number of rounds loaded concurrently
+        :type max_workers: int, optional
+        """
+        self.market = market
+        self.max_workers = max_workers
+        self.markets = {}
+
+    def _load_round(self, block):
+        market = self.market.at(block)
+        market.update_global_state()
+        return market
+
+    def load(self, rounds):
+        """Reads the states of rounds that are not loaded yet
+        :param rounds: rounds to load, e.g. range(start, stop, step)
+        :type rounds: iterable
+        :return: dict of round to the market pinned to that round
+        :rtype: dict
+        """
+        rounds = list(rounds)
+        missing = [block for block in dict.fromkeys(rounds) if block not in self.markets]
+        if missing:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                self.markets.update(zip(missing, executor.map(self._load_round, missing)))
+        return {block: self.markets[block] for block in rounds}
+
+    def run(self, rounds, strategy):
+        """Runs a strategy against the market of each round, e.g.
+        ``replay.run(rounds, lambda perpetual: perpetual.quote(SIDE.LONG, 100, 5).liq_price)``
+        :param rounds: rounds to replay
+        :type rounds: iterable
+        :param strategy: callable taking the market pinned to a round
+        :type strategy: callable
+        :return: list of (round, strategy result) pairs in round order
+        :rtype: list
+        """
+        return [(block, strategy(market)) for block, market in self.load(rounds).items()]
+
+    def local_states(self, addresses, rounds):
+        """Reads the local states of addresses at each round concurrently into the market state cache, so that
+        get_position and Option.update_local_state run without network access during :meth:`run`.
+        Perpetual.update_local_state also reads the manager local state of the account, once per round.
+        :param addresses: addresses of accounts
+        :type addresses: list
+        :param rounds: rounds to read local states at
+        :type rounds: iterable
+        :return: dict of (address, round) to local state
+        :rtype: dict
+        """
+        keys = [(address, block) for block in rounds for address in addresses]
+        state_cache = self.market.state_cache
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            states = executor.map(lambda key: state_cache.get_local_state(key[0], self.market.appId, key[1]), keys)
+            return dict(zip(keys, states))
+
+    def clear(self):
+        """Drops the loaded rounds and the historical states cached for them"""
+        self.markets.clear()
+        self.market.state_cache.clear()
@@ -0,0 +1,125 @@
+import base64
+import os
+from concurrent.futures import ProcessPoolExecutor
+from nacl.signing import SigningKey
+from algosdk import account, constants, encoding
+from algosdk.future.transaction import SignedTransaction
+
+# Keys of a signing worker process, set once by its initializer
+_WORKER_KEYS = None
+
+
+def signing_keys(private_keys):
+    """Returns the signing key of every sender, derived once instead of on every signature
+    :param private_keys: private keys, or dict of sender address to private key for rekeyed accounts
+    :type private_keys: list or dict
+    :return: dict of sender address to tuple of signing key and authorizing address, None unless rekeyed
+    :rtype: dict
+    """
+    if not isinstance(private_keys, dict):
+        private_keys = {account.address_from_private_key(private_key): private_key for private_key in private_keys}
+    keys = {}
+    for sender, private_key in private_keys.items():
+        signer = account.address_from_private_key(private_key)
+        signing_key = SigningKey(base64.b64decode(private_key)[:constants.key_len_bytes])
+        keys[sender] = (signing_key, signer if signer != sender else None)
+    return keys
+
+
+def sign_transactions(keys, groups):
+    """Returns the signatures of the transactions of several groups
+    :param keys: signing keys as returned by :func:`signing_keys`
+    :type keys: dict
+    :param groups: list of lists of unsigned transactions
+    :type groups: list
+    :return: list per group of lists of tuples of base64 signature and authorizing address
+    :rtype: list
+    """
+    signatures = []
+    for transactions in groups:
+        group_signatures = []
+        for txn in transactions:
+            try:
+                signing_key, authorizing_address = keys[txn.sender]
+            except KeyError:
+                raise Exception(f"No private key for sender {txn.sender}.")
+            to_sign = constants.txid_prefix + base64.b64decode(encoding.msgpack_encode(txn))
+            signature = base64.b64encode(signing_key.sign(to_sign).signature).decode()
+            group_signatures.append((signature, authorizing_address))
+        signatures.append(group_signatures)
+    return signatures
+
+
+def _init_worker(private_keys):
+    global _WORKER_KEYS
+    _WORKER_KEYS = signing_keys(private_keys)
+
+
+def _sign_in_worker(groups):
+    return sign_transactions(_WORKER_KEYS, groups)
+
+
+class GroupSigner:
+    """
+    Signs many :class:`TransactionGroup` objects across a pool of processes. Every worker receives the private keys
+    once when it starts, then only the transactions to sign. Groups keep their order and group ids, each transaction
+    is signed with the key of its sender.
+    """
+
+    def __init__(self, private_keys, max_workers=None, chunk_size=8):
+        """Constructor method for :class:`GroupSigner` class
+        :param private_keys: private keys, or dict of sender address to private key for rekeyed accounts
+        :type private_keys: list or dict
+        :param max_workers: number of worker processes, one per CPU if not specified, 1 signs in this process
+        :type max_workers: int, optional
+        :param chunk_size: number of groups sent to a worker at once
+        :type chunk_size: int, optional
+        """
+        self.private_keys = private_keys
+        self.keys = signing_keys(private_keys)
+        self.max_workers = max_workers if max_workers is not None else os.cpu_count()
+        self.chunk_size = chunk_size
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                                 initargs=(self.private_keys,))
+        return self._executor
+
+    def sign(self, groups):
+        """Signs the transactions of every group and saves them to the groups state
+        :param groups: transaction groups to sign
+        :type groups: list of :class:`TransactionGroup`
+        :return: the signed groups, in the same order
+        :rtype: list
+        """
+        chunks = [[group.transactions for group in groups[i:i + self.chunk_size]]
+                  for i in range(0, len(groups), self.chunk_size)]
+        if self.max_workers <= 1:
+            results = (sign_transactions(self.keys, chunk) for chunk in chunks)
+        else:
+            results = self._get_executor().map(_sign_in_worker, chunks)
+
+        i = 0
+        for chunk_signatures in results:
+            for group_signatures in chunk_signatures:
+                group = groups[i]
+                group.signed_transactions = [
+                    SignedTransaction(txn, signature, authorizing_address)
+                    for txn, (signature, authorizing_address) in zip(group.transactions, group_signatures)
+                ]
+                i += 1
+        return groups
+
+    def close(self):
+        """Stops the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from .metrics import metrics
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the call, callers arriving while it is in
+    flight wait for it and share its result or exception. Calls made after it completed run again.
+    """
+
+    def __init__(self, name="singleflight"):
+        """Constructor method for :class:`SingleFlight` class
+        :param name: label of the coalesced calls counter in the SDK metrics registry
+        :type name: str, optional
+        """
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        """Returns fn(*args, **kwargs), sharing the result of an identical call in flight
+        :param key: hashable identity of the call
+        :type key: tuple
+        :param fn: the call
+        :type fn: callable
+        :return: result of the call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+        if not leader:
+            metrics.inc("coalesced_calls_total", call=self.name)
+            return call.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._done(key)
+            call.set_exception(e)
+            raise
+        self._done(key)
+        call.set_result(result)
+        return result
+
+    def _done(self, key):
+        # Callers arriving from now on start a new call
+        with self._lock:
+            del self._calls[key]
+
+    def in_flight(self):
+        """Returns the number of calls in flight
+        :rtype: int
+        """
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """:class:`SingleFlight` for coroutines running on one event loop"""
+
+    def __init__(self, name="singleflight"):
+        """Constructor method for :class:`AsyncSingleFlight` class
+        :param name: label of the coalesced calls counter in the SDK metrics registry
+        :type name: str, optional
+        """
+        self.name = name
+        self._calls = {}
+
+    async def do(self, key, fn, *args, **kwargs):
+        """Returns await fn(*args, **kwargs), sharing the result of an identical call in flight
+        :param key: hashable identity of the call
+        :type key: tuple
+        :param fn: coroutine function of the call
+        :type fn: callable
+        :return: result of the call
+        """
+        task = self._calls.get(key)
+        if task is not None:
+            metrics.inc("coalesced_calls_total", call=self.name)
+            # A waiter being cancelled must not cancel the shared call
+            return await asyncio.shield(task)
+
+        task = self._calls[key] = asyncio.ensure_future(fn(*args, **kwargs))
+        task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task)
@@ -0,0 +1,170 @@
+import json
+import sqlite3
+import threading
+from base64 import b64decode, b64encode
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS global_states (
+    app_id INTEGER PRIMARY KEY,
+    round INTEGER NOT NULL,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS local_states (
+    app_id INTEGER NOT NULL,
+    address TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (app_id, address)
+);
+CREATE TABLE IF NOT EXISTS local_state_rounds (
+    app_id INTEGER PRIMARY KEY,
+    round INTEGER NOT NULL
+);
+"""
+
+
+def encode_state(state):
+    """Returns a formatted state dict serialized to json. Keys that are not valid utf-8 are kept as bytes.
+    :param state: dict of state returned by format_state
+    :type state: dict
+    :return: json string
+    :rtype: str
+    """
+    return json.dumps([
+        [key if isinstance(key, str) else {"b64": b64encode(key).decode()}, value] for key, value in state.items()
+    ])
+
+
+def decode_state(data):
+    """Returns a state dict serialized by :func:`encode_state`
+    :param data: json string
+    :type data: str
+    :return: dict of state
+    :rtype: dict
+    """
+    return {
+        key if isinstance(key, str) else b64decode(key["b64"]): value for key, value in json.loads(data)
+    }
+
+
+class SnapshotStore:
+    """
+    SQLite file recording the latest known global states of applications and the local states of their accounts,
+    along with the round they are current to, so that a new process can start from them instead of re-reading
+    everything from the indexer.
+    """
+
+    def __init__(self, path):
+        """Constructor method for :class:`SnapshotStore` class
+        :param path: path of the database file, created if it does not exist
+        :type path: str
+        """
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Closes the database"""
+        with self._lock:
+            self._conn.close()
+
+    def save_global_state(self, app_id, state, round):
+        """Records the global state of an application, unless a state of a later round is already recorded
+        :param app_id: id of the application
+        :type app_id: int
+        :param state: global state dict
+        :type state: dict
+        :param round: round the state is current to
+        :type round: int
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO global_states (app_id, round, state) VALUES (?, ?, ?) "
+                "ON CONFLICT (app_id) DO UPDATE SET round = excluded.round, state = excluded.state "
+                "WHERE excluded.round >= global_states.round",
+                (app_id, round, encode_state(state))
+            )
+
+    def load_global_state(self, app_id):
+        """Returns the recorded global state of an application
+        :param app_id: id of the application
+        :type app_id: int
+        :return: tuple of global state dict and the round it is current to, None if not recorded
+        :rtype: tuple
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, round FROM global_states WHERE app_id = ?", (app_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return decode_state(row[0]), row[1]
+
+    def save_local_states(self, app_id, local_states, round):
+        """Replaces the recorded local states of every account of an application
+        :param app_id: id of the application
+        :type app_id: int
+        :param local_states: dict of address to local state
+        :type local_states: dict
+        :param round: round the local states are current to
+        :type round: int
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM local_states WHERE app_id = ?", (app_id,))
+            self._conn.executemany(
+                "INSERT INTO local_states (app_id, address, state) VALUES (?, ?, ?)",
+                ((app_id, address, encode_state(state)) for address, state in local_states.items())
+            )
+            self._set_local_state_round(app_id, round)
+
+    def update_local_states(self, app_id, local_states, round):
+        """Records changed local states of accounts of an application
+        :param app_id: id of the application
+        :type app_id: int
+        :param local_states: dict of address to new local state, None or empty for accounts that closed out
+        :type local_states: dict
+        :param round: round the local states of every account are now current to
+        :type round: int
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM local_states WHERE app_id = ? AND address = ?",
+                ((app_id, address) for address, state in local_states.items() if not state)
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO local_states (app_id, address, state) VALUES (?, ?, ?)",
+                ((app_id, address, encode_state(state)) for address, state in local_states.items() if state)
+            )
+            self._set_local_state_round(app_id, round)
+
+    def _set_local_state_round(self, app_id, round):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO local_state_rounds (app_id, round) VALUES (?, ?)", (app_id, round)
+        )
+
+    def load_local_states(self, app_id):
+        """Returns the recorded local states of the accounts of an application
+        :param app_id: id of the application
+        :type app_id: int
+        :return: tuple of dict of address to local state and the round they are current to, None if not recorded
+        :rtype: tuple
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT round FROM local_state_rounds WHERE app_id = ?", (app_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT address, state FROM local_states WHERE app_id = ?", (app_id,)
+            ).fetchall()
+        return {address: decode_state(state) for address, state in rows}, row[0]
@@ -0,0 +1,156 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_futures
+from algosdk.error import AlgodHTTPError
+from .confirmations import get_confirmation_tracker
+from .metrics import metrics
+
+# Status codes of algod errors worth sending the same group again for
+TRANSIENT_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+# Errors meaning the group was accepted by an earlier attempt, or sent by someone else
+ALREADY_SENT_ERRORS = ("already in pool", "already in ledger")
+
+
+class Submitter:
+    """
+    Sends a stream of signed transaction groups concurrently and returns a future per group, resolved with its
+    transaction information once confirmed. At most max_in_flight groups are sent and not yet confirmed, submit
+    blocks beyond that. Transient algod errors are retried with the same signed transactions, which is idempotent
+    as a group already accepted is recognized by its txid. Groups fail once their last valid round has passed.
+    """
+
+    def __init__(self, algod_client, max_in_flight=64, max_workers=8, retries=3, backoff=0.25, wait=True,
+                 tracker=None):
+        """Constructor method for :class:`Submitter` class
+        :param algod_client: algod client, best with a pooled transport
+        :type algod_client: :class:`AlgodClient`
+        :param max_in_flight: maximum number of groups sent and not yet confirmed
+        :type max_in_flight: int, optional
+        :param max_workers: number of groups sent concurrently
+        :type max_workers: int, optional
+        :param retries: number of times a group is sent again after a transient error
+        :type retries: int, optional
+        :param backoff: seconds before the first retry, doubled on every retry
+        :type backoff: float, optional
+        :param wait: resolve futures once groups are confirmed, otherwise once they are accepted by algod
+        :type wait: bool, optional
+        :param tracker: confirmation tracker, the one shared by the algod client if not specified
+        :type tracker: :class:`ConfirmationTracker`, optional
+        """
+        self.algod_client = algod_client
+        self.max_in_flight = max_in_flight
+        self.retries = retries
+        self.backoff = backoff
+        self.wait = wait
+        self.tracker = tracker if tracker is not None else get_confirmation_tracker(algod_client)
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="deridex-submit")
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def submit(self, group):
+        """Sends a signed group, blocking while max_in_flight groups are in flight
+        :param group: signed transaction group, or list of signed transactions of one group
+        :type group: :class:`TransactionGroup` or list
+        :return: future resolved with dict of transaction information, or dict of transaction id if not waiting
+        :rtype: :class:`concurrent.futures.Future`
+        """
+        signed_transactions = getattr(group, "signed_transactions", group)
+        if not signed_transactions or any(stxn is None for stxn in signed_transactions):
+            raise Exception("Transaction group is not signed.")
+        txid = signed_transactions[0].get_txid()
+        last_valid = min(stxn.transaction.last_valid_round for stxn in signed_transactions)
+
+        self._slots.acquire()
+        future = Future()
+        with self._lock:
+            self._in_flight.add(future)
+        future.add_done_callback(self._release)
+        self._executor.submit(self._send, signed_transactions, txid, last_valid, future)
+        return future
+
+    def submit_all(self, groups):
+        """Sends signed groups in order
+        :param groups: signed transaction groups
+        :type groups: list
+        :return: list of futures, one per group
+        :rtype: list
+        """
+        return [self.submit(group) for group in groups]
+
+    def _release(self, future):
+        with self._lock:
+            self._in_flight.discard(future)
+        self._slots.release()
+
+    def _send(self, signed_transactions, txid, last_valid, future):
+        if not future.set_running_or_notify_cancel():
+            return
+        # Tracked before sending, the block confirming the group may be checked as soon as it is sent
+        confirmation = self.tracker.track(txid, last_valid) if self.wait else None
+        try:
+            self._send_with_retries(signed_transactions, txid, last_valid)
+        except Exception as e:
+            if confirmation is not None:
+                self.tracker.discard(txid)
+            future.set_exception(e)
+            return
+        if confirmation is None:
+            future.set_result({"txid": txid})
+            return
+        confirmation.add_done_callback(lambda confirmation: _copy_result(confirmation, future, txid))
+
+    def _send_with_retries(self, signed_transactions, txid, last_valid):
+        attempt = 0
+        while True:
+            try:
+                self.algod_client.send_transactions(signed_transactions)
+                return
+            except AlgodHTTPError as e:
+                if any(message in str(e) for message in ALREADY_SENT_ERRORS):
+                    return
+                if e.code not in TRANSIENT_STATUS_CODES or attempt == self.retries:
+                    raise Exception(str(e))
+            except OSError:
+                # Connection failures, the group may or may not have reached algod
+                if attempt == self.retries:
+                    raise
+            metrics.inc("submit_retries_total")
+            time.sleep(self.backoff * 2 ** attempt)
+            attempt += 1
+            if self.algod_client.status()["last-round"] >= last_valid:
+                raise Exception(f"Transaction {txid} expired at round {last_valid}.")
+
+    def in_flight(self):
+        """Returns the number of groups sent and not yet confirmed
+        :rtype: int
+        """
+        with self._lock:
+            return len(self._in_flight)
+
+    def close(self, wait=True):
+        """Stops accepting groups
+        :param wait: wait for the groups in flight to complete
+        :type wait: bool, optional
+        """
+        if wait:
+            with self._lock:
+                in_flight = list(self._in_flight)
+            wait_futures(in_flight)
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _copy_result(source, target, txid):
+    if source.cancelled():
+        # Tracking was discarded, e.g. after another send of the same group failed
+        target.set_exception(Exception(f"Confirmation of transaction {txid} was discarded."))
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
@@ -0,0 +1,105 @@
+import copy
+from algosdk import encoding
+from .utils import TransactionGroup
+
+
+def placeholder_address(slot):
+    """Returns a valid address standing for an account that varies between uses of a template
+    :param slot: index of the placeholder, below 255
+    :type slot: int
+    :rtype: str
+    """
+    return encoding.encode_address(bytes([slot + 1]) * 32)
+
+
+def placeholder_uint(slot):
+    """Returns an integer standing for an amount that varies between uses of a template. It is exact as a float and
+    out of the range of app and asset ids.
+    :param slot: index of the placeholder
+    :type slot: int
+    :rtype: int
+    """
+    return 2 ** 52 + slot
+
+
+class GroupTemplate:
+    """
+    Unsigned transactions of a group built once, with placeholder values where the group varies between uses:
+    receivers, amounts, foreign accounts and uint64 method arguments. Building a group copies the transactions and
+    patches the placeholders and the validity rounds, instead of encoding every ABI method call again.
+    """
+
+    def __init__(self, transactions, placeholders):
+        """Constructor method for :class:`GroupTemplate` class
+        :param transactions: unsigned transactions of the group, without group id, holding the placeholders
+        :type transactions: list
+        :param placeholders: dict of name to placeholder value, from :func:`placeholder_address` or
+            :func:`placeholder_uint`
+        :type placeholders: dict
+        """
+        self.transactions = transactions
+        self.slots = []
+        found = set()
+        for i, txn in enumerate(transactions):
+            for name, placeholder in placeholders.items():
+                for field in ("receiver", "amt", "amount"):
+                    if getattr(txn, field, None) == placeholder:
+                        self.slots.append((i, field, None, name))
+                        found.add(name)
+                for j, account in enumerate(getattr(txn, "accounts", None) or []):
+                    if account == placeholder:
+                        self.slots.append((i, "accounts", j, name))
+                        found.add(name)
+                if isinstance(placeholder, int):
+                    for j, arg in enumerate(getattr(txn, "app_args", None) or []):
+                        if arg == placeholder.to_bytes(8, "big"):
+                            self.slots.append((i, "app_args", j, name))
+                            found.add(name)
+        missing = set(placeholders) - found
+        if missing:
+            raise Exception(f"Placeholders not found in the group: {', '.join(sorted(missing))}")
+        # Lists holding a placeholder are copied on every build, the others are shared by every group built
+        self._list_fields = sorted({(i, field) for i, field, j, _ in self.slots if j is not None})
+
+    @classmethod
+    def from_composer(cls, gtx, placeholders):
+        """Returns a template of the transactions added to an atomic transaction composer
+        :param gtx: composer the group was added to, not built yet
+        :type gtx: :class:`AtomicTransactionComposer`
+        :param placeholders: dict of name to placeholder value
+        :type placeholders: dict
+        :rtype: :class:`GroupTemplate`
+        """
+        return cls([txn_with_signer.txn for txn_with_signer in gtx.txn_list], placeholders)
+
+    def build(self, sp, **values):
+        """Returns a new group with the placeholders replaced by values
+        :param sp: suggested params the validity rounds and genesis are taken from, fees are kept from the template
+        :type sp: :class:`SuggestedParams`
+        :param values: value of every placeholder, by name
+        :return: group of unsigned transactions with a group id assigned
+        :rtype: :class:`TransactionGroup`
+        """
+        transactions = []
+        for txn in self.transactions:
+            txn = copy.copy(txn)
+            txn.first_valid_round = sp.first
+            txn.last_valid_round = sp.last
+            txn.genesis_hash = sp.gh
+            txn.genesis_id = sp.gen
+            transactions.append(txn)
+        for i, field in self._list_fields:
+            setattr(transactions[i], field, list(getattr(transactions[i], field)))
+
+        for i, field, j, name in self.slots:
+            try:
+                value = values[name]
+            except KeyError:
+                raise Exception(f"Missing value for placeholder {name}")
+            if field == "app_args":
+                value = int(value).to_bytes(8, "big")
+            if j is None:
+                setattr(transactions[i], field, value)
+            else:
+                getattr(transactions[i], field)[j] = value
+        return TransactionGroup(transactions)
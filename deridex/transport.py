@@ -0,0 +1,286 @@
+import http.client
+import json
+import socket
+import ssl
+import threading
+import time
+import urllib.error
+from urllib import parse
+from urllib.request import Request, urlopen
+from algosdk import constants, error
+from algosdk.v2client import algod, indexer
+from .metrics import metrics as default_metrics, request_app_id
+
+api_version_path_prefix = "/v2"
+
+
+def build_path(requrl, params=None):
+    """Returns the path and query string of an algod or indexer request
+    :param requrl: endpoint path without the api version prefix
+    :type requrl: str
+    :param params: query parameters
+    :type params: dict, optional
+    :return: tuple of path and path with query string
+    :rtype: tuple
+    """
+    if requrl not in constants.unversioned_paths:
+        requrl = api_version_path_prefix + requrl
+    if params:
+        return requrl, requrl + "?" + parse.urlencode(params)
+    return requrl, requrl
+
+
+def error_message(body):
+    """Returns the message of an algod or indexer error response
+    :param body: response body
+    :type body: bytes
+    :rtype: str
+    """
+    message = body.decode("utf-8")
+    try:
+        return json.loads(message)["message"]
+    except (ValueError, KeyError, TypeError):
+        return message
+
+
+class UrllibTransport:
+    """Transport opening a new connection for every request, like the stock algosdk clients"""
+
+    def __init__(self, timeout=30):
+        """Constructor method for :class:`UrllibTransport` class
+        :param timeout: timeout of a request in seconds
+        :type timeout: float, optional
+        """
+        self.timeout = timeout
+
+    def request(self, method, url, headers=None, data=None):
+        """Sends a request
+        :param method: request method
+        :type method: str
+        :param url: full url of the request
+        :type url: str
+        :param headers: request headers
+        :type headers: dict, optional
+        :param data: request body
+        :type data: bytes, optional
+        :return: tuple of status code and response body
+        :rtype: tuple
+        """
+        req = Request(url, headers=headers or {}, method=method, data=data)
+        try:
+            with urlopen(req, timeout=self.timeout) as resp:
+                return resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def close(self):
+        pass
+
+
+class PooledTransport:
+    """
+    Transport keeping connections open between requests (HTTP keep-alive), so that consecutive requests to a host
+    skip the TCP and TLS handshakes. Up to pool_size idle connections are kept per host, concurrent requests beyond
+    that open extra connections which are closed once done.
+    """
+
+    # Errors raised when sending over a kept-alive connection the server has closed in the meantime
+    STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionResetError,
+                               BrokenPipeError)
+    # Methods safe to send again when the server may have received them, e.g. not POST /v2/transactions
+    IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, pool_size=10, timeout=30, ssl_context=None):
+        """Constructor method for :class:`PooledTransport` class
+        :param pool_size: maximum number of idle connections kept per host
+        :type pool_size: int, optional
+        :param timeout: timeout of a request in seconds
+        :type timeout: float, optional
+        :param ssl_context: TLS settings of https connections, the system defaults if not specified
+        :type ssl_context: :class:`ssl.SSLContext`, optional
+        """
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.ssl_context = ssl_context if ssl_context is not None else ssl.create_default_context()
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _connect(self, scheme, host, port):
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(host, port, timeout=self.timeout, context=self.ssl_context)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=self.timeout)
+        conn.connect()
+        # Headers and body are written separately, Nagle's algorithm would hold the body back on a reused connection
+        conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return conn
+
+    def _acquire(self, key):
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool:
+                return pool.pop(), True
+        return self._connect(*key), False
+
+    def _release(self, key, conn):
+        with self._lock:
+            pool = self._pools.setdefault(key, [])
+            if len(pool) < self.pool_size:
+                pool.append(conn)
+                return
+        conn.close()
+
+    def request(self, method, url, headers=None, data=None):
+        """Sends a request over a pooled connection
+        :param method: request method
+        :type method: str
+        :param url: full url of the request
+        :type url: str
+        :param headers: request headers
+        :type headers: dict, optional
+        :param data: request body
+        :type data: bytes, optional
+        :return: tuple of status code and response body
+        :rtype: tuple
+        """
+        parts = parse.urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+        while True:
+            conn, reused = self._acquire(key)
+            written = False
+            try:
+                conn.request(method, path, body=data, headers=headers or {})
+                written = True
+                resp = conn.getresponse()
+                body = resp.read()
+            except self.STALE_CONNECTION_ERRORS:
+                conn.close()
+                if reused and (not written or method.upper() in self.IDEMPOTENT_METHODS):
+                    # Retry on another connection, a new one once the idle ones are exhausted
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            if resp.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+            return resp.status, body
+
+    def close(self):
+        """Closes every idle connection"""
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools = {}
+        for pool in pools:
+            for conn in pool:
+                conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def send(transport, service, address, method, requrl, params, data, headers, metrics):
+    """Sends an algod or indexer request over transport and records it in metrics
+    :return: tuple of status code and response body
+    :rtype: tuple
+    """
+    path, path_with_query = build_path(requrl, params)
+    start = time.perf_counter()
+    status = None
+    body = b""
+    try:
+        status, body = transport.request(method, address + path_with_query, headers=headers, data=data)
+    finally:
+        metrics.record_request(service, method, path, request_app_id(path, params), time.perf_counter() - start,
+                               len(data) if data else 0, len(body), status)
+    return status, body
+
+
+class AlgodClient(algod.AlgodClient):
+    """:class:`algosdk.v2client.algod.AlgodClient` sending requests over a pluggable transport and recording them in
+    a metrics registry"""
+
+    def __init__(self, algod_token, algod_address, headers=None, transport=None, metrics=None):
+        """Constructor method for :class:`AlgodClient` class
+        :param algod_token: algod API token
+        :type algod_token: str
+        :param algod_address: algod address
+        :type algod_address: str
+        :param headers: extra header name/value for all requests
+        :type headers: dict, optional
+        :param transport: transport to send requests over, a :class:`PooledTransport` is created if not specified
+        :type transport: :class:`PooledTransport`, optional
+        :param metrics: registry requests are recorded in, the SDK registry if not specified
+        :type metrics: :class:`Metrics`, optional
+        """
+        super().__init__(algod_token, algod_address, headers)
+        self.transport = transport if transport is not None else PooledTransport()
+        self.metrics = metrics if metrics is not None else default_metrics
+
+    def algod_request(self, method, requrl, params=None, data=None, headers=None, response_format="json"):
+        header = {"User-Agent": "py-algorand-sdk"}
+        if self.headers:
+            header.update(self.headers)
+        if headers:
+            header.update(headers)
+        if requrl not in constants.no_auth:
+            header.update({constants.algod_auth_header: self.algod_token})
+
+        status, body = send(self.transport, "algod", self.algod_address, method, requrl, params, data, header,
+                            self.metrics)
+        if status >= 400:
+            raise error.AlgodHTTPError(error_message(body), status)
+        if response_format == "json":
+            try:
+                return json.loads(body)
+            except ValueError as e:
+                raise error.AlgodResponseError("Failed to parse JSON response from algod") from e
+        return body
+
+
+def _sort_dict(dictionary):
+    # Same key order as the stock indexer client
+    return {k: _sort_dict(v) if isinstance(v, dict) else v for k, v in sorted(dictionary.items())}
+
+
+class IndexerClient(indexer.IndexerClient):
+    """:class:`algosdk.v2client.indexer.IndexerClient` sending requests over a pluggable transport and recording them
+    in a metrics registry"""
+
+    def __init__(self, indexer_token, indexer_address, headers=None, transport=None, metrics=None):
+        """Constructor method for :class:`IndexerClient` class
+        :param indexer_token: indexer API token
+        :type indexer_token: str
+        :param indexer_address: indexer address
+        :type indexer_address: str
+        :param headers: extra header name/value for all requests
+        :type headers: dict, optional
+        :param transport: transport to send requests over, a :class:`PooledTransport` is created if not specified
+        :type transport: :class:`PooledTransport`, optional
+        :param metrics: registry requests are recorded in, the SDK registry if not specified
+        :type metrics: :class:`Metrics`, optional
+        """
+        super().__init__(indexer_token, indexer_address, headers)
+        self.transport = transport if transport is not None else PooledTransport()
+        self.metrics = metrics if metrics is not None else default_metrics
+
+    def indexer_request(self, method, requrl, params=None, data=None, headers=None):
+        header = {"User-Agent": "py-algorand-sdk"}
+        if self.headers:
+            header.update(self.headers)
+        if headers:
+            header.update(headers)
+        if requrl not in constants.no_auth and self.indexer_token:
+            header.update({constants.indexer_auth_header: self.indexer_token})
+
+        status, body = send(self.transport, "indexer", self.indexer_address, method, requrl, params, data, header,
+                            self.metrics)
+        if status >= 400:
+            raise error.IndexerHTTPError(error_message(body))
+        return _sort_dict(json.loads(body.decode("utf-8")))
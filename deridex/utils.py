@@ -1,14 +1,17 @@
-import os
-import json
 from algosdk.future.transaction import assign_group_id, ApplicationNoOpTxn
 from algosdk.error import AlgodHTTPError
 from algosdk.encoding import encode_address
-from base64 import b64decode, b64encode
+from base64 import b64encode
+from .registry import get_option_contracts
+from .decoder import StateDecoder
+from .metrics import timed
+from .singleflight import SingleFlight
+from .confirmations import get_confirmation_tracker
 
-
-# contracts abspath
-my_path = os.path.abspath(os.path.dirname(__file__))
-OPTIONS_CONTRACTS_FPATH = os.path.join(my_path, "options/v1/contracts.json")
+# Shared by every format_state call, learns the keys of the apps it decodes
+_STATE_DECODER = StateDecoder()
+# Concurrent identical application and account reads share one indexer request
+_STATE_READS = SingleFlight("state_reads")
 
 
 def get_option_app_id(network, symbol):
@@ -20,9 +23,7 @@ def get_option_app_id(network, symbol):
     :return: option app id
     :rtype: int
     """
-    with open(OPTIONS_CONTRACTS_FPATH, 'r') as contracts_file:
-        json_file = json.load(contracts_file)[network]
-        return json_file['contracts'][symbol]["appId"]
+    return get_option_contracts(network)[symbol]["appId"]
 
 
 def format_state(state):
@@ -32,24 +33,7 @@ def format_state(state):
     :return: dict of state with keys + values formatted from bytes to utf-8 strings
     :rtype: dict
     """
-    formatted_state = {}
-    for item in state:
-        key = item["key"]
-        value = item["value"]
-        try:
-            formatted_key = b64decode(key).decode("utf-8")
-        except:
-            formatted_key = b64decode(key)
-        if value["type"] == 1:
-            # byte string
-            try:
-                formatted_state[formatted_key] = b64decode(value["bytes"]).decode("utf-8")
-            except:
-                formatted_state[formatted_key] = value["bytes"]
-        else:
-            # integer
-            formatted_state[formatted_key] = value["uint"]
-    return formatted_state
+    return _STATE_DECODER.decode(state)
 
 
 def read_global_state(indexer_client, app_id, block=None):
@@ -64,11 +48,29 @@ def read_global_state(indexer_client, app_id, block=None):
     :rtype: dict
     """
 
+    return read_global_state_with_round(indexer_client, app_id, block)[0]
+
+
+def read_global_state_with_round(indexer_client, app_id, block=None):
+    """Returns dict of global state for application with the given app_id along with the round it was read at
+    :param indexer_client: indexer client
+    :type indexer_client: :class:`IndexerClient`
+    :param app_id: id of the application
+    :type app_id: int
+    :param block: block at which to query historical data
+    :type block: int, optional
+    :return: tuple of global state dict and the round the state is current to, block if specified
+    :rtype: tuple
+    """
+
     try:
-        application_info = indexer_client.applications(app_id, round_num=block).get("application", {})
+        response = _STATE_READS.do((indexer_client, "application", app_id, block), indexer_client.applications,
+                                   app_id, round_num=block)
     except:
         raise Exception("Application does not exist.")
-    return format_state(application_info["params"]["global-state"])
+    application_info = response.get("application", {})
+    state_round = block if block is not None else response.get("current-round")
+    return format_state(application_info["params"]["global-state"]), state_round
 
 
 def read_local_state(indexer_client, address, app_id, block=None):
@@ -86,11 +88,12 @@ def read_local_state(indexer_client, address, app_id, block=None):
     """
 
     try:
-        results = indexer_client.account_info(address, round_num=block).get("account", {})
+        results = _STATE_READS.do((indexer_client, "account", address, block), indexer_client.account_info,
+                                  address, round_num=block).get("account", {})
     except:
         raise Exception("Account does not exist.")
 
-    for local_state in results['apps-local-state']:
+    for local_state in results.get('apps-local-state', []):
         if local_state['id'] == app_id:
             if 'key-value' not in local_state:
                 return {}
@@ -148,19 +151,36 @@ class TransactionGroup:
         for i, txn in enumerate(self.transactions):
             self.signed_transactions[i] = txn.sign(private_keys[i])
 
-    def submit(self, algod, wait=False):
+    @timed("TransactionGroup.submit")
+    def submit(self, algod, wait=False, tracker=None):
         """Submits the signed transactions to network using the algod client
         :param algod: algod client
         :type algod: :class:`AlgodClient`
         :param wait: wait for txn to complete, defaults to False
         :type wait: boolean, optional
+        :param tracker: confirmation tracker to wait with, the one shared by the algod client if not specified
+        :type tracker: :class:`ConfirmationTracker`, optional
         :return: dict of transaction id
         :rtype: dict
         """
+        if not wait:
+            try:
+                txid = algod.send_transactions(self.signed_transactions)
+            except AlgodHTTPError as e:
+                raise Exception(str(e))
+            return {'txid': txid}
+
+        if tracker is None:
+            tracker = get_confirmation_tracker(algod)
+        # Tracked before sending, the block confirming the group may be checked as soon as it is sent
+        txid = self.signed_transactions[0].get_txid()
+        confirmation = tracker.track(txid, min(txn.last_valid_round for txn in self.transactions))
         try:
-            txid = algod.send_transactions(self.signed_transactions)
+            algod.send_transactions(self.signed_transactions)
         except AlgodHTTPError as e:
+            tracker.discard(txid)
             raise Exception(str(e))
-        if wait:
-            return wait_for_confirmation(algod, txid)
-        return {'txid': txid}
\ No newline at end of file
+        except Exception:
+            tracker.discard(txid)
+            raise
+        return confirmation.result()
\ No newline at end of file
@@ -1,5 +1,6 @@
 from deridex.perpetuals.v1.client import MainnetClient
 from deridex.perpetuals.v1.account import Account
+from deridex.perpetuals.v1.liquidation import LiquidationExecutor
 from dotenv import dotenv_values
 
 # Create test account
@@ -12,14 +13,9 @@ perpetual = client.get_perpetual("ALGO/STBL2")
 # Get vault accounts opted into perpetual contract
 accounts = perpetual.get_vault_accounts()
 
-# Get all vault accounts with a position
-account_positions = {}
-for account in accounts:
-    if accounts[account]["pa"] > 0:
-        account_positions[account] = perpetual.get_position(account, accounts[account])
+# Get all vault positions from one global state snapshot
+positions = perpetual.get_positions_bulk(accounts)
 
-# Liquidate all vault accounts with a position if possible
-for account in account_positions:
-    if account_positions[account]["leverage"] >= 3000:
-        gtx = perpetual.liquidate(user_account, account)
-        gtx.submit(client.algod)
+# Liquidate all vault accounts with a position if possible, packing several liquidations per group
+targets = positions["address"][positions["leverage"] >= 3000].tolist()
+outcomes = LiquidationExecutor(perpetual, user_account).execute(targets, accounts)
@@ -23,4 +23,7 @@ setuptools.setup(
         'deridex.perpetuals.v1': ['contracts.json', 'abi/*.json'],
     },
     include_package_data=True,
+    extras_require={
+        "async": ["aiohttp>=3.8"],
+    },
 )
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""
+Canned chain for the tests: an algod stand-in serving msgpack blocks built from signed transactions and eval deltas,
+and SDK clients served in process by the benchmarks FakeNetwork, without a network.
+"""
+import base64
+import io
+import json
+import threading
+from urllib.parse import parse_qs, urlparse
+import msgpack
+from algosdk import account, encoding
+from algosdk.error import AlgodHTTPError
+from algosdk.future.transaction import PaymentTxn, SuggestedParams
+from deridex.transport import AlgodClient, IndexerClient
+
+GENESIS_ID = "testnet-v1.0"
+GENESIS_HASH = "SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI="
+FIRST_ROUND = 1000
+
+
+def suggested_params(first=FIRST_ROUND, last=FIRST_ROUND + 1000):
+    return SuggestedParams(1000, first, last, GENESIS_HASH, GENESIS_ID, flat_fee=True)
+
+
+def signed_payment(private_key, amount=1, params=None):
+    sender = account.address_from_private_key(private_key)
+    return PaymentTxn(sender, params or suggested_params(), sender, amount).sign(private_key)
+
+
+def block_entry(stxn=None, txn=None, **fields):
+    """Returns a transaction as stored in a block: without genesis hash, and without genesis id but with the hgi flag
+    when it had one. Either a signed transaction or a raw txn dict, extra fields (e.g. dt) are added as is."""
+    if stxn is not None:
+        # Canonical encoding, as stored by algod: sorted and without empty fields
+        entry = msgpack.unpackb(base64.b64decode(encoding.msgpack_encode(stxn)), raw=False)
+        txn = entry["txn"]
+    else:
+        entry = {}
+    if txn.pop("gen", None):
+        entry["hgi"] = True
+    txn.pop("gh", None)
+    entry["txn"] = txn
+    entry.update(fields)
+    return entry
+
+
+def key_value(state):
+    """Returns a state dict in the algod and indexer key-value list form"""
+    items = []
+    for key, value in state.items():
+        key = base64.b64encode(key.encode()).decode()
+        if isinstance(value, int):
+            items.append({"key": key, "value": {"type": 2, "bytes": "", "uint": value}})
+        else:
+            items.append({"key": key, "value": {"type": 1, "bytes": base64.b64encode(value).decode(), "uint": 0}})
+    return items
+
+
+def pack_block(entries, round=FIRST_ROUND):
+    """Returns a block as served by algod block_info with response_format="msgpack" """
+    header = {"rnd": round, "gen": GENESIS_ID, "gh": base64.b64decode(GENESIS_HASH), "txns": entries}
+    return msgpack.packb({"block": header}, use_bin_type=True)
+
+
+class FakeAlgod:
+    """Algod client returning canned blocks, rounds advance with add_block"""
+
+    def __init__(self, round=FIRST_ROUND):
+        self.round = round
+        self.blocks = {}
+        self.confirmed = {}
+        self.global_states = {}
+        self.local_states = {}
+        self.send_errors = []
+        self.sent = []
+        self.failures = []
+        self._cv = threading.Condition()
+
+    def add_block(self, entries, txids=()):
+        with self._cv:
+            self.round += 1
+            self.blocks[self.round] = pack_block(entries, self.round)
+            for txid in txids:
+                self.confirmed[txid] = self.round
+            self._cv.notify_all()
+        return self.round
+
+    def _fail(self):
+        if self.failures:
+            raise self.failures.pop(0)
+
+    def status(self):
+        self._fail()
+        return {"last-round": self.round}
+
+    def status_after_block(self, round_num):
+        self._fail()
+        with self._cv:
+            self._cv.wait_for(lambda: self.round > round_num, timeout=0.05)
+            return {"last-round": self.round}
+
+    def block_info(self, round_num, response_format="json"):
+        self._fail()
+        return self.blocks.get(round_num, pack_block([], round_num))
+
+    def pending_transaction_info(self, txid):
+        if txid not in self.confirmed:
+            raise AlgodHTTPError("txn not found", 404)
+        return {"confirmed-round": self.confirmed[txid]}
+
+    def send_transactions(self, signed_transactions):
+        if self.send_errors:
+            raise self.send_errors.pop(0)
+        self.sent.append(signed_transactions)
+        return signed_transactions[0].get_txid()
+
+    def application_info(self, app_id):
+        return {"id": app_id, "params": {"global-state": self.global_states.get(app_id, [])}}
+
+    def account_application_info(self, address, application_id):
+        if (address, application_id) not in self.local_states:
+            raise AlgodHTTPError("account application info not found", 404)
+        return {"app-local-state": {"id": application_id,
+                                    "key-value": self.local_states[(address, application_id)]}}
+
+
+class NetworkTransport:
+    """Transport answering algod and indexer requests from a FakeNetwork in process, without HTTP. Request bodies
+    of failing POSTs are passed to reject, which returns an error message to refuse them with."""
+
+    def __init__(self, network, reject=None):
+        self.network = network
+        self.reject = reject
+
+    def request(self, method, url, headers=None, data=None):
+        url = urlparse(url)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if method == "POST" and self.reject is not None:
+            message = self.reject(data)
+            if message:
+                return 400, json.dumps({"message": message}).encode()
+        status, response = self.network.handle(method, url.path, query, data)
+        return status, json.dumps(response).encode()
+
+    def close(self):
+        pass
+
+
+def network_clients(network, reject=None):
+    """Returns algod and indexer clients served by network"""
+    transport = NetworkTransport(network, reject)
+    return AlgodClient("", "http://fake", transport=transport), IndexerClient("", "http://fake", transport=transport)
+
+
+def sent_transactions(data):
+    """Returns the transactions of a POST /v2/transactions body, as dicts"""
+    return [stxn["txn"] for stxn in msgpack.Unpacker(io.BytesIO(data), raw=False)]
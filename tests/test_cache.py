@@ -0,0 +1,122 @@
+import math
+import pytest
+from deridex import cache as cache_module
+from deridex.cache import StateCache, GlobalStateSnapshot
+from fakes import key_value
+
+
+class FakeIndexer:
+    """Indexer serving global states by round, the current round advances with set_state"""
+
+    def __init__(self, current_round=2000):
+        self.current_round = current_round
+        self.states = {}
+        self.reads = []
+
+    def set_state(self, app_id, state, round=None):
+        if round is not None:
+            self.current_round = round
+        self.states.setdefault(app_id, {})[self.current_round] = state
+
+    def applications(self, app_id, round_num=None):
+        self.reads.append((app_id, round_num))
+        history = self.states[app_id]
+        at = self.current_round if round_num is None else round_num
+        state = history[max(r for r in history if r <= at)]
+        return {"application": {"params": {"global-state": key_value(state)}}, "current-round": self.current_round}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def indexer():
+    indexer = FakeIndexer()
+    indexer.set_state(1, {"price": 10})
+    indexer.set_state(2, {"price": 20})
+    return indexer
+
+
+def test_latest_state_is_reused_within_its_round(indexer, clock):
+    cache = StateCache(indexer, max_staleness=3)
+    assert cache.get_global_state(1) == ({"price": 10}, 2000)
+    clock.now += 2
+    assert cache.get_global_state(1) == ({"price": 10}, 2000)
+    assert indexer.reads == [(1, None)]
+
+
+def test_latest_state_is_not_reused_once_a_later_round_is_read(indexer, clock):
+    cache = StateCache(indexer, max_staleness=3)
+    cache.get_global_state(1)
+    indexer.set_state(1, {"price": 11}, round=2001)
+    cache.get_global_state(2)
+    # Still within max_staleness, but app 2 was read at a later round
+    assert cache.get_global_state(1) == ({"price": 11}, 2001)
+    assert indexer.reads == [(1, None), (2, None), (1, None)]
+
+
+def test_latest_state_expires_after_max_staleness(indexer, clock):
+    cache = StateCache(indexer, max_staleness=3)
+    cache.get_global_state(1)
+    clock.now += 3
+    cache.get_global_state(1)
+    assert indexer.reads == [(1, None), (1, None)]
+
+
+def test_zero_max_staleness_always_reads(indexer, clock):
+    cache = StateCache(indexer, max_staleness=0)
+    cache.get_global_state(1)
+    cache.get_global_state(1)
+    assert indexer.reads == [(1, None), (1, None)]
+
+
+def test_historical_state_is_reused_indefinitely(indexer, clock):
+    cache = StateCache(indexer, max_staleness=0)
+    assert cache.get_global_state(1, block=2000) == ({"price": 10}, 2000)
+    clock.now += 1000
+    assert cache.get_global_state(1, block=2000) == ({"price": 10}, 2000)
+    assert indexer.reads == [(1, 2000)]
+
+
+def test_snapshot_reads_lagging_states_at_the_snapshot_round(indexer, clock):
+    cache = StateCache(indexer, max_staleness=math.inf, max_workers=1)
+    cache.get_global_state(1)
+    indexer.set_state(1, {"price": 11}, round=2001)
+    indexer.set_state(2, {"price": 21})
+    # The state of app 1 cached at round 2000 is not mixed with the state of app 2 read at round 2001
+    snapshot = cache.snapshot({"a": 1, "b": 2})
+    assert snapshot.round == 2001
+    assert snapshot["a"] == {"price": 11}
+    assert snapshot["b"] == {"price": 21}
+
+
+def test_snapshot_extending_a_base_is_read_at_its_round(indexer, clock):
+    cache = StateCache(indexer, max_staleness=0, max_workers=1)
+    base = cache.snapshot({"a": 1})
+    indexer.set_state(2, {"price": 21}, round=2001)
+    snapshot = cache.snapshot({"b": 2}, base=base)
+    assert snapshot.round == 2000
+    assert snapshot["a"] == {"price": 10}
+    assert snapshot["b"] == {"price": 20}
+    assert (2, 2000) in indexer.reads
+
+
+def test_snapshot_of_a_past_block(indexer, clock):
+    indexer.set_state(1, {"price": 11}, round=2001)
+    cache = StateCache(indexer, max_workers=1)
+    snapshot = cache.snapshot({"a": 1, "b": 2}, block=2000)
+    assert isinstance(snapshot, GlobalStateSnapshot)
+    assert snapshot.round == 2000
+    assert dict(snapshot["a"]) == {"price": 10}
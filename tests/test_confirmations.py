@@ -0,0 +1,73 @@
+from algosdk import account
+from algosdk.future.transaction import ApplicationNoOpTxn, SuggestedParams
+from deridex.confirmations import ConfirmationTracker, block_txids
+from fakes import FakeAlgod, GENESIS_HASH, block_entry, pack_block, signed_payment, suggested_params
+
+
+def test_block_txids_match_transaction_ids():
+    private_key, address = account.generate_account()
+    payment = signed_payment(private_key)
+    app_call = ApplicationNoOpTxn(address, suggested_params(), 994412935, [b"liquidate", (5).to_bytes(8, "big")],
+                                  [address]).sign(private_key)
+    # Transactions without genesis id are stored without the hgi flag
+    no_genesis_id = ApplicationNoOpTxn(address, SuggestedParams(1000, 1000, 2000, GENESIS_HASH, flat_fee=True),
+                                       994412935).sign(private_key)
+    block = pack_block([block_entry(payment), block_entry(app_call), block_entry(no_genesis_id)])
+    assert block_txids(block) == [payment.get_txid(), app_call.get_txid(), no_genesis_id.get_txid()]
+
+
+def test_block_txids_of_empty_block():
+    assert block_txids(pack_block([])) == []
+
+
+def test_tracker_resolves_transactions_of_new_blocks():
+    algod = FakeAlgod()
+    tracker = ConfirmationTracker(algod, timeout=5)
+    stxn = signed_payment(account.generate_account()[0])
+    future = tracker.track(stxn.get_txid(), stxn.transaction.last_valid_round)
+    algod.add_block([])
+    confirmed_round = algod.add_block([block_entry(stxn)], [stxn.get_txid()])
+    txinfo = future.result(timeout=5)
+    assert txinfo["confirmed-round"] == confirmed_round
+    assert txinfo["txid"] == stxn.get_txid()
+    assert tracker.pending() == 0
+
+
+def test_tracker_retries_algod_errors():
+    algod = FakeAlgod()
+    tracker = ConfirmationTracker(algod, timeout=5, retry_interval=0.001)
+    stxn = signed_payment(account.generate_account()[0])
+    future = tracker.track(stxn.get_txid(), stxn.transaction.last_valid_round)
+    algod.failures = [OSError("connection reset"), ConnectionResetError(), Exception("undecodable")]
+    algod.add_block([block_entry(stxn)], [stxn.get_txid()])
+    assert future.result(timeout=5)["txid"] == stxn.get_txid()
+
+
+def test_tracker_finds_confirmation_missed_before_tracking():
+    algod = FakeAlgod()
+    stxn = signed_payment(account.generate_account()[0], params=suggested_params(last=algod.round + 2))
+    # Confirmed in a block the tracker never checks
+    algod.confirmed[stxn.get_txid()] = algod.round
+    tracker = ConfirmationTracker(algod, timeout=5)
+    future = tracker.track(stxn.get_txid(), stxn.transaction.last_valid_round)
+    algod.add_block([])
+    algod.add_block([])
+    assert future.result(timeout=5)["confirmed-round"] == algod.round - 2
+
+
+def test_tracker_expires_transactions_past_last_valid():
+    algod = FakeAlgod()
+    tracker = ConfirmationTracker(algod, timeout=5)
+    future = tracker.track("MISSING", algod.round + 1)
+    algod.add_block([])
+    assert "expired at round" in str(future.exception(timeout=5))
+    assert tracker.pending() == 0
+
+
+def test_discard_cancels_the_future():
+    algod = FakeAlgod()
+    tracker = ConfirmationTracker(algod, timeout=5)
+    future = tracker.track("UNSENT")
+    tracker.discard("UNSENT")
+    assert future.cancelled()
+    assert tracker.pending() == 0
@@ -0,0 +1,69 @@
+from base64 import b64decode, b64encode
+import numpy as np
+import pytest
+from deridex.decoder import StateDecoder
+from deridex.perpetuals.v1.config import LOCAL_STATE_KEYS
+from deridex.utils import format_state
+
+
+def reference_format_state(state):
+    # format_state as it was before the decoder, kept as the reference
+    formatted_state = {}
+    for item in state:
+        key = item["key"]
+        value = item["value"]
+        try:
+            formatted_key = b64decode(key).decode("utf-8")
+        except UnicodeDecodeError:
+            formatted_key = b64decode(key)
+        if value["type"] == 1:
+            try:
+                formatted_state[formatted_key] = b64decode(value["bytes"]).decode("utf-8")
+            except UnicodeDecodeError:
+                formatted_state[formatted_key] = value["bytes"]
+        else:
+            formatted_state[formatted_key] = value["uint"]
+    return formatted_state
+
+
+def entry(key, value):
+    key = b64encode(key).decode()
+    if isinstance(value, int):
+        return {"key": key, "value": {"type": 2, "bytes": "", "uint": value}}
+    return {"key": key, "value": {"type": 1, "bytes": b64encode(value).decode(), "uint": 0}}
+
+
+STATES = [
+    [],
+    [entry(b"pa", 900000001), entry(b"ps", 125000), entry(b"a1bs", 0), entry(b"a2bs", 99000)],
+    [entry(b"pa", 1), entry(b"v", b"\x8f" * 32), entry(b"name", b"ALGO/STBL2")],
+    [entry(b"\xff\x00", 7), entry(b"latest_price", 1250000), entry(b"ps", 3)],
+]
+
+
+@pytest.mark.parametrize("state", STATES)
+def test_decode_matches_format_state(state):
+    expected = reference_format_state(state)
+    assert StateDecoder(LOCAL_STATE_KEYS).decode(state) == expected
+    assert StateDecoder().decode(state) == expected
+    assert format_state(state) == expected
+
+
+def test_decode_with_a_full_key_table():
+    decoder = StateDecoder(max_keys=1)
+    for state in STATES:
+        assert decoder.decode(state) == reference_format_state(state)
+    assert len(decoder._key_table) == 1
+
+
+@pytest.mark.parametrize("state", STATES)
+def test_decode_tuple_matches_format_state(state):
+    expected = reference_format_state(state)
+    assert StateDecoder(LOCAL_STATE_KEYS).decode_tuple(state) == tuple(expected.get(key, 0) for key in LOCAL_STATE_KEYS)
+
+
+def test_decode_columns_matches_format_state():
+    columns = StateDecoder(LOCAL_STATE_KEYS).decode_columns(STATES)
+    for key in LOCAL_STATE_KEYS:
+        expected = [reference_format_state(state).get(key, 0) for state in STATES]
+        np.testing.assert_array_equal(columns[key], np.array(expected, dtype=np.float64))
@@ -0,0 +1,238 @@
+import numpy as np
+import pytest
+from algosdk import encoding, mnemonic
+from benchmarks.fake_network import FakeNetwork
+from deridex.perpetuals.v1.account import Account
+from deridex.perpetuals.v1.liquidation import LiquidationExecutor, LiquidationIndex, LiquidationStandby
+from deridex.perpetuals.v1.perpetual import Perpetual
+from fakes import network_clients, sent_transactions
+
+
+@pytest.fixture(scope="module")
+def network():
+    return FakeNetwork(n_vaults=300)
+
+
+def make_perpetual(network, reject=None):
+    algod, indexer = network_clients(network, reject)
+    perpetual = Perpetual(algod, indexer, "mainnet", network.perpetual_app_id, "ALGO/STBL2")
+    perpetual.update_global_state()
+    return perpetual
+
+
+@pytest.fixture
+def perpetual(network):
+    return make_perpetual(network)
+
+
+@pytest.fixture
+def account_obj(network):
+    return Account(mnemonic.from_private_key(network.user_private_key))
+
+
+@pytest.fixture
+def vaults(perpetual):
+    return perpetual.get_vault_accounts()
+
+
+def liquidatable(perpetual, vaults):
+    positions = perpetual.get_positions_bulk(vaults)
+    return positions["address"][positions["leverage"] >= perpetual.global_state["self"]["ml"]].tolist()
+
+
+def group_targets(gtx):
+    # Liquidated vaults are the foreign accounts of the app calls
+    return [account for t in gtx.txn_list for account in (getattr(t.txn, "accounts", None) or [])]
+
+
+def test_build_groups_packs_liquidatable_targets(perpetual, account_obj, vaults):
+    targets = liquidatable(perpetual, vaults)
+    healthy = [address for address in vaults if address not in targets and vaults[address]["pa"] != 0][:2]
+    assert len(targets) >= 5
+    executor = LiquidationExecutor(perpetual, account_obj, pairs_per_group=2)
+    groups, outcomes = executor.build_groups(targets + healthy, vaults)
+
+    assert [packed for packed, _ in groups] == [targets[i:i + 2] for i in range(0, len(targets), 2)]
+    for packed, gtx in groups:
+        assert len(gtx.txn_list) == 2 * len(packed)
+        assert group_targets(gtx) == packed
+    assert set(outcomes) == set(healthy)
+    assert all(outcome["status"] == "skipped" for outcome in outcomes.values())
+
+
+def test_pairs_per_group_fits_a_group(perpetual, account_obj):
+    with pytest.raises(Exception):
+        LiquidationExecutor(perpetual, account_obj, pairs_per_group=9)
+    assert LiquidationExecutor(perpetual, account_obj).pairs_per_group == 8
+
+
+def test_execute_confirms_every_group(perpetual, account_obj, vaults):
+    targets = liquidatable(perpetual, vaults)
+    outcomes = LiquidationExecutor(perpetual, account_obj, pairs_per_group=4).execute(targets, vaults)
+    assert {target: outcome["status"] for target, outcome in outcomes.items()} == dict.fromkeys(targets, "confirmed")
+    assert sorted({outcome["group"] for outcome in outcomes.values()}) == list(range((len(targets) + 3) // 4))
+
+
+def test_execute_isolates_stale_targets(network, account_obj, vaults):
+    targets = liquidatable(make_perpetual(network), vaults)
+    stale = targets[2]
+    sent = []
+
+    def reject(data):
+        # Already liquidated by someone else, every group holding it fails
+        txns = sent_transactions(data)
+        accounts = [encoding.encode_address(account) for txn in txns for account in txn.get("apat", [])]
+        sent.append(accounts)
+        if stale in accounts:
+            return "logic eval error: position is not liquidatable"
+
+    perpetual = make_perpetual(network, reject)
+    outcomes = LiquidationExecutor(perpetual, account_obj).execute(targets, vaults)
+
+    assert outcomes[stale]["status"] == "failed"
+    assert "not liquidatable" in outcomes[stale]["error"]
+    assert {target: outcomes[target]["status"] for target in targets if target != stale} == \
+        dict.fromkeys([target for target in targets if target != stale], "confirmed")
+    assert all(outcome["group"] == 0 for outcome in outcomes.values())
+    # The failed group and the halves holding the stale target
+    assert sent[0] == targets[:8]
+    assert sum(stale in accounts for accounts in sent) == int(np.log2(8)) + 1
+
+
+def liquidatable_at(perpetual, vaults, price):
+    # Vaults whose leverage at the oracle price reaches ml, or that are under water, computed directly
+    ml = perpetual.global_state["self"]["ml"]
+    addresses = set()
+    for address, local_state in vaults.items():
+        position = perpetual._position(local_state)
+        value = position["position_amt_uAsset"] * (1 / price if position["side"] == "short" else price)
+        if value <= position["borrow_amt_uAsset"] or value / (value - position["borrow_amt_uAsset"]) * 100 >= ml:
+            addresses.add(address)
+    return addresses
+
+
+def test_index_range_query_matches_leverage(perpetual, vaults):
+    index = LiquidationIndex(perpetual)
+    index.rebuild(vaults)
+    assert len(index) == len(vaults)
+    oracle_price = perpetual.global_state["oracle"]["latest_price"] / 1e6
+    liq_prices = np.array([index.liquidation_price(address) for address in vaults])
+    checked = 0
+    for price in oracle_price * np.array([0.25, 0.5, 0.8, 0.95, 1.0, 1.05, 1.25, 2.0, 4.0]):
+        # Prices on a liquidation price are left to rounding
+        if np.isclose(liq_prices, price, rtol=1e-9).any():
+            continue
+        liquidatable = index.liquidatable(price)
+        assert len(liquidatable) == len(set(liquidatable))
+        assert set(liquidatable) == liquidatable_at(perpetual, vaults, price)
+        checked += 1
+    assert checked >= 7
+    assert set(index.liquidatable()) == liquidatable_at(perpetual, vaults, oracle_price)
+
+
+def test_index_update_and_remove(perpetual, vaults):
+    index = LiquidationIndex(perpetual)
+    index.rebuild(vaults)
+    oracle_price = perpetual.global_state["oracle"]["latest_price"] / 1e6
+    healthy = next(address for address in vaults if address not in index.liquidatable()
+                   and perpetual._position(vaults[address])["side"] == "long")
+    # Borrowing more moves the liquidation price above the oracle price
+    local_state = dict(vaults[healthy], a2bs=vaults[healthy]["a2bs"] * 10)
+    index.update(healthy, local_state)
+    assert index.local_states[healthy] == local_state
+    assert index.liquidation_price(healthy) > oracle_price
+    assert healthy in index.liquidatable()
+    assert set(index.liquidatable()) == liquidatable_at(perpetual, index.local_states, oracle_price)
+
+    rebuilt = LiquidationIndex(perpetual)
+    rebuilt.rebuild(index.local_states)
+    assert index._prices == rebuilt._prices
+
+    index.remove(healthy)
+    assert healthy not in index and healthy not in index.local_states
+    assert healthy not in index.liquidatable(oracle_price / 100)
+    assert index.liquidation_price(healthy) is None
+    # Removing a vault that is not indexed does nothing
+    index.remove(healthy)
+
+    closed = next(iter(index.local_states))
+    index.update_many({closed: {}}, [closed])
+    assert closed not in index
+    assert len(index) == len(vaults) - 2
+
+
+class FakeSubmitter:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, group):
+        self.submitted.append(group)
+        return group
+
+
+@pytest.fixture
+def standby(perpetual, account_obj, vaults):
+    index = LiquidationIndex(perpetual)
+    index.rebuild(vaults)
+    return LiquidationStandby(index, account_obj, size=6, submitter=FakeSubmitter())
+
+
+def test_standby_signs_groups_for_the_nearest_vaults(standby):
+    last_valid = standby.perpetual.get_suggested_params().last
+    assert standby.refresh(round=last_valid - 500) == 6
+    assert set(standby.groups) == set(standby.index.nearest(n=6))
+    for address, (group, _) in standby.groups.items():
+        # Every group liquidates its own vault only
+        assert [account for txn in group.transactions for account in (getattr(txn, "accounts", None) or [])] == \
+            [address]
+    assert all(stxn is not None for group, _ in standby.groups.values() for stxn in group.signed_transactions)
+
+    # Nothing changed, the signed groups are kept
+    groups = dict(standby.groups)
+    assert standby.refresh(round=last_valid - 499) == 0
+    assert standby.groups == groups
+
+
+def test_standby_signs_again_when_a_vault_changes(standby):
+    last_valid = standby.perpetual.get_suggested_params().last
+    standby.refresh(round=last_valid - 500)
+    groups = dict(standby.groups)
+    changed = next(iter(groups))
+    local_state = dict(standby.index.local_states[changed], ps=standby.index.local_states[changed]["ps"] + 1)
+    standby.index.update(changed, local_state)
+
+    assert standby.refresh(round=last_valid - 500) == 1
+    assert standby.groups[changed][0] is not groups[changed][0]
+    assert standby.groups[changed][1] == local_state
+    assert {address: entry for address, entry in standby.groups.items() if address != changed} == \
+        {address: entry for address, entry in groups.items() if address != changed}
+
+
+def test_standby_signs_again_with_new_params(standby, network):
+    last_valid = standby.perpetual.get_suggested_params().last
+    standby.refresh(round=last_valid - 500)
+    groups = dict(standby.groups)
+    network.round += 900
+    try:
+        # The groups run out of validity, new params are fetched and every group is signed again with them
+        assert standby.refresh(round=last_valid - standby.min_valid_rounds) == 6
+        new_last_valid = standby.perpetual.get_suggested_params().last
+    finally:
+        network.round -= 900
+    assert new_last_valid == last_valid + 900
+    assert set(standby.groups) == set(groups)
+    for address, (group, _) in standby.groups.items():
+        assert group is not groups[address][0]
+        assert all(txn.last_valid_round == new_last_valid for txn in group.transactions)
+        assert all(stxn is not None for stxn in group.signed_transactions)
+
+
+def test_standby_trigger_submits_liquidatable_vaults(standby):
+    last_valid = standby.perpetual.get_suggested_params().last
+    standby.refresh(round=last_valid - 500)
+    liquidatable = [address for address in standby.index.liquidatable() if address in standby.groups]
+    assert liquidatable
+    futures = standby.trigger()
+    assert set(futures) == set(liquidatable)
+    assert standby.submitter.submitted == [futures[address] for address in futures]
+    assert not set(liquidatable) & set(standby.groups)
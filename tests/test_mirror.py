@@ -0,0 +1,142 @@
+import base64
+import time
+import pytest
+from algosdk import account, encoding
+from deridex.mirror import StateMirror
+from fakes import FakeAlgod, block_entry, key_value, pack_block
+
+APP_ID = 1001
+OTHER_APP_ID = 2002
+
+
+@pytest.fixture
+def addresses():
+    return [account.generate_account()[1] for _ in range(3)]
+
+
+@pytest.fixture
+def algod(addresses):
+    algod = FakeAlgod()
+    algod.global_states[APP_ID] = key_value({"latest_price": 100, "name": b"ALGO"})
+    algod.local_states[(addresses[0], APP_ID)] = key_value({"ps": 5, "pa": 1})
+    return algod
+
+
+@pytest.fixture
+def mirror(algod):
+    return StateMirror(algod, None, [APP_ID])
+
+
+def app_call(sender, app_id=APP_ID, on_complete=0, accounts=(), **eval_delta):
+    txn = {"type": "appl", "snd": encoding.decode_address(sender), "apid": app_id}
+    if on_complete:
+        txn["apan"] = on_complete
+    if accounts:
+        txn["apat"] = [encoding.decode_address(address) for address in accounts]
+    return block_entry(txn=txn, dt=eval_delta) if eval_delta else block_entry(txn=txn)
+
+
+def test_seeds_watched_apps(mirror):
+    state, _ = mirror.get_global_state(APP_ID)
+    assert dict(state) == {"latest_price": 100, "name": "ALGO"}
+    assert mirror.watched() == [APP_ID]
+
+
+def test_applies_global_deltas(mirror, addresses):
+    mirror.apply_block(1001, pack_block([app_call(addresses[0], gd={
+        "latest_price": {"at": 2, "ui": 123},
+        "name": {"at": 3},
+        b"\xff\x01": {"at": 1, "bs": b"\xfe"},
+        "note": {"at": 1, "bs": b"hi"},
+    })]))
+    state, round = mirror.get_global_state(APP_ID)
+    assert round == 1001
+    assert dict(state) == {"latest_price": 123, b"\xff\x01": base64.b64encode(b"\xfe").decode(), "note": "hi"}
+
+
+def test_ignores_apps_not_watched(mirror, addresses):
+    mirror.apply_block(1001, pack_block([app_call(addresses[0], OTHER_APP_ID, gd={"x": {"at": 2, "ui": 1}})]))
+    assert dict(mirror.get_global_state(APP_ID)[0]) == {"latest_price": 100, "name": "ALGO"}
+    assert OTHER_APP_ID not in mirror.watched()
+
+
+def test_applies_local_deltas_of_mirrored_accounts(mirror, addresses):
+    assert mirror.get_local_state(addresses[0], APP_ID) == {"ps": 5, "pa": 1}
+    # Index 0 is the sender, 1 the first foreign account, which is not mirrored
+    mirror.apply_block(1001, pack_block([app_call(addresses[0], accounts=[addresses[1]], ld={
+        0: {"ps": {"at": 2, "ui": 7}, "pa": {"at": 3}},
+        1: {"ps": {"at": 2, "ui": 9}},
+    })]))
+    assert mirror.get_local_state(addresses[0], APP_ID) == {"ps": 7}
+    assert (addresses[1], APP_ID) not in mirror._locals
+
+
+def test_local_deltas_of_foreign_accounts(mirror, addresses):
+    mirror.get_local_state(addresses[0], APP_ID)
+    mirror.apply_block(1001, pack_block([app_call(addresses[1], accounts=[addresses[2], addresses[0]], ld={
+        2: {"ps": {"at": 2, "ui": 11}},
+    })]))
+    assert mirror.get_local_state(addresses[0], APP_ID) == {"ps": 11, "pa": 1}
+
+
+def test_opt_in_and_close_out(mirror, addresses):
+    mirror.apply_block(1001, pack_block([app_call(addresses[1], on_complete=1, ld={0: {"v": {"at": 1, "bs": b"v"}}})]))
+    assert mirror.get_local_state(addresses[1], APP_ID) == {"v": "v"}
+    mirror.get_local_state(addresses[0], APP_ID)
+    mirror.apply_block(1002, pack_block([app_call(addresses[0], on_complete=2), app_call(addresses[1], on_complete=3)]))
+    assert mirror.get_local_state(addresses[0], APP_ID) == {}
+    assert mirror.get_local_state(addresses[1], APP_ID) == {}
+
+
+def test_delete_application(mirror, addresses):
+    mirror.apply_block(1001, pack_block([app_call(addresses[0], on_complete=5)]))
+    assert dict(mirror.get_global_state(APP_ID)[0]) == {}
+
+
+def test_inner_transactions(mirror, addresses):
+    inner = app_call(addresses[2], gd={"latest_price": {"at": 2, "ui": 150}})
+    outer = app_call(addresses[0], OTHER_APP_ID, itx=[inner])
+    mirror.apply_block(1001, pack_block([outer]))
+    assert mirror.get_global_state(APP_ID)[0]["latest_price"] == 150
+
+
+def test_subscribers(mirror, addresses):
+    prices = []
+    changes = []
+    locals_changed = []
+    mirror.subscribe(lambda app_id, changed, round: prices.append((changed["latest_price"], round)), APP_ID,
+                     "latest_price")
+    mirror.subscribe(lambda app_id, changed, round: changes.append(changed))
+    mirror.subscribe_local(lambda app_id, address, changed, round: locals_changed.append((address, changed)))
+    mirror.get_local_state(addresses[0], APP_ID)
+    mirror.apply_block(1001, pack_block([app_call(addresses[0], gd={"name": {"at": 1, "bs": b"BTC"}},
+                                                  ld={0: {"ps": {"at": 2, "ui": 6}}})]))
+    mirror.apply_block(1002, pack_block([app_call(addresses[0], gd={"latest_price": {"at": 2, "ui": 101}})]))
+    assert prices == [(101, 1002)]
+    assert changes == [{"name": "BTC"}, {"latest_price": 101}]
+    assert locals_changed == [(addresses[0], {"ps": 6})]
+
+    def failing(app_id, changed, round):
+        raise ZeroDivisionError()
+
+    mirror.subscribe(failing)
+    mirror.apply_block(1003, pack_block([app_call(addresses[0], gd={"latest_price": {"at": 2, "ui": 102}})]))
+    assert isinstance(mirror.error, ZeroDivisionError)
+    assert mirror.get_global_state(APP_ID)[0]["latest_price"] == 102
+    mirror.unsubscribe(failing)
+    mirror.error = None
+    mirror.apply_block(1004, pack_block([app_call(addresses[0], gd={"latest_price": {"at": 2, "ui": 103}})]))
+    assert mirror.error is None
+
+
+def test_follows_blocks(algod, mirror, addresses):
+    mirror.start()
+    try:
+        algod.add_block([app_call(addresses[0], gd={"latest_price": {"at": 2, "ui": 140}})])
+        for _ in range(500):
+            if mirror.round == algod.round:
+                break
+            time.sleep(0.01)
+        assert mirror.get_global_state(APP_ID) == ({"latest_price": 140, "name": "ALGO"}, algod.round)
+    finally:
+        mirror.stop()
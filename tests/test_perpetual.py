@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from benchmarks.fake_network import FakeNetwork
+from deridex.perpetuals.v1.config import SIDE
+from deridex.perpetuals.v1.perpetual import Perpetual
+from fakes import network_clients
+
+
+@pytest.fixture(scope="module")
+def network():
+    return FakeNetwork(n_vaults=300)
+
+
+@pytest.fixture(scope="module")
+def perpetual(network):
+    algod, indexer = network_clients(network)
+    perpetual = Perpetual(algod, indexer, "mainnet", network.perpetual_app_id, "ALGO/STBL2")
+    perpetual.update_global_state()
+    return perpetual
+
+
+@pytest.fixture(scope="module")
+def vaults(perpetual):
+    return perpetual.get_vault_accounts()
+
+
+def test_bulk_positions_match_single_positions(perpetual, vaults):
+    local_states = dict(vaults)
+    local_states["closed"] = {"pa": 0, "ps": 0, "a1bs": 0, "a2bs": 0}
+    positions = perpetual._positions_bulk(local_states)
+
+    assert set(positions["side"]) == {"long", "short", "gov"}
+    assert positions["address"].tolist() == list(vaults)
+    for i, address in enumerate(positions["address"]):
+        position = perpetual._position(local_states[address])
+        assert positions["side"][i] == position["side"]
+        for key in ("position_amt_bAsset", "position_amt_uAsset", "borrow_amt_bAsset", "borrow_amt_uAsset",
+                    "leverage"):
+            assert positions[key][i] == position[key], (address, key)
+
+
+def test_bulk_liquidation_prices_reach_the_maintenance_leverage(perpetual, vaults):
+    positions = perpetual._positions_bulk(vaults)
+    ml = perpetual.global_state["self"]["ml"]
+    # Shorts hold a2, valued at the inverse oracle price
+    price = np.where(positions["side"] == "short", 1 / positions["liq_price"], positions["liq_price"])
+    value = positions["position_amt_uAsset"] * price
+    np.testing.assert_allclose(value / (value - positions["borrow_amt_uAsset"]) * 100, ml)
+
+
+@pytest.mark.parametrize("side", [SIDE.LONG, SIDE.SHORT])
+def test_quote_grid_matches_quotes(perpetual, side):
+    amounts = np.array([10.0, 250.0, 4000.0])
+    leverages = np.array([1.5, 2.0, 3.5])
+    grid = perpetual._quote_grid(side, amounts[:, None], leverages[None, :])
+
+    assert grid["swap_out"].shape == (3, 3)
+    for i, amount in enumerate(amounts):
+        for j, leverage in enumerate(leverages):
+            quote = perpetual._quote(side, amount, leverage)
+            assert grid["swap_out"][i, j] == pytest.approx(quote.swap_out)
+            assert grid["borrow_amt"][i, j] == pytest.approx(quote.borrow_amt)
+            assert grid["liq_price"][i, j] == pytest.approx(quote.liq_price)
+            assert grid["price_impact"][i, j] == pytest.approx(quote.price_impact)
+
+
+def test_quote_grid_refuses_unknown_sides(perpetual):
+    with pytest.raises(Exception, match="Invalid side"):
+        perpetual._quote_grid("sideways", [1.0], [2.0])
@@ -0,0 +1,85 @@
+import pytest
+from deridex.cache import StateCache
+from deridex.store import SnapshotStore
+from fakes import key_value
+
+APP_ID = 1001
+GLOBAL_STATE = {"latest_price": 1250000, "name": "ALGO/STBL2", b"\xff\x00": "AAE=", "v": "jw=="}
+
+
+@pytest.fixture
+def store():
+    with SnapshotStore(":memory:") as store:
+        yield store
+
+
+def test_global_state_round_trip(store):
+    assert store.load_global_state(APP_ID) is None
+    store.save_global_state(APP_ID, GLOBAL_STATE, 2000)
+    assert store.load_global_state(APP_ID) == (GLOBAL_STATE, 2000)
+
+
+def test_global_state_of_an_earlier_round_is_ignored(store):
+    store.save_global_state(APP_ID, {"latest_price": 2}, 2001)
+    store.save_global_state(APP_ID, {"latest_price": 1}, 2000)
+    assert store.load_global_state(APP_ID) == ({"latest_price": 2}, 2001)
+
+
+def test_local_states_round_trip(store):
+    assert store.load_local_states(APP_ID) is None
+    local_states = {"A": {"pa": 1, "ps": 10}, "B": {"pa": 900000001, b"\x01": "x"}}
+    store.save_local_states(APP_ID, local_states, 2000)
+    assert store.load_local_states(APP_ID) == (local_states, 2000)
+    assert store.load_local_states(APP_ID + 1) is None
+
+
+def test_local_state_updates(store):
+    store.save_local_states(APP_ID, {"A": {"pa": 1}, "B": {"pa": 2}}, 2000)
+    store.update_local_states(APP_ID, {"A": None, "B": {"pa": 3}, "C": {"pa": 4}}, 2005)
+    assert store.load_local_states(APP_ID) == ({"B": {"pa": 3}, "C": {"pa": 4}}, 2005)
+    # Saving replaces every recorded account
+    store.save_local_states(APP_ID, {"D": {"pa": 5}}, 2010)
+    assert store.load_local_states(APP_ID) == ({"D": {"pa": 5}}, 2010)
+
+
+def test_states_survive_reopening(tmp_path):
+    path = str(tmp_path / "snapshots.db")
+    with SnapshotStore(path) as store:
+        store.save_global_state(APP_ID, GLOBAL_STATE, 2000)
+        store.save_local_states(APP_ID, {"A": {"pa": 1}}, 2000)
+    with SnapshotStore(path) as store:
+        assert store.load_global_state(APP_ID) == (GLOBAL_STATE, 2000)
+        assert store.load_local_states(APP_ID) == ({"A": {"pa": 1}}, 2000)
+
+
+class CountingStore(SnapshotStore):
+    def __init__(self):
+        super().__init__(":memory:")
+        self.saves = []
+
+    def save_global_state(self, app_id, state, round):
+        self.saves.append((app_id, round))
+        super().save_global_state(app_id, state, round)
+
+
+class FakeIndexer:
+    def __init__(self):
+        self.current_round = 2000
+
+    def applications(self, app_id, round_num=None):
+        return {"application": {"params": {"global-state": key_value({"latest_price": self.current_round})}},
+                "current-round": self.current_round}
+
+
+def test_state_cache_records_latest_states_once_per_round():
+    indexer = FakeIndexer()
+    store = CountingStore()
+    cache = StateCache(indexer, max_staleness=0, store=store)
+    cache.get_global_state(APP_ID)
+    cache.get_global_state(APP_ID)
+    indexer.current_round = 2001
+    cache.get_global_state(APP_ID)
+    cache.get_global_state(APP_ID, block=1990)
+    assert store.saves == [(APP_ID, 2000), (APP_ID, 2001)]
+    assert cache.get_stored_global_state(APP_ID) == ({"latest_price": 2001}, 2001)
+    store.close()
@@ -0,0 +1,90 @@
+import time
+import pytest
+from algosdk import account
+from algosdk.error import AlgodHTTPError
+from deridex.confirmations import ConfirmationTracker
+from deridex.metrics import metrics
+from deridex.submitter import Submitter
+from fakes import FakeAlgod, block_entry, signed_payment
+
+
+@pytest.fixture
+def algod():
+    return FakeAlgod()
+
+
+def submitter(algod, **kwargs):
+    return Submitter(algod, max_workers=2, backoff=0, tracker=ConfirmationTracker(algod, timeout=5), **kwargs)
+
+
+def test_transient_errors_are_retried(algod):
+    stxn = signed_payment(account.generate_account()[0])
+    algod.send_errors = [AlgodHTTPError("service unavailable", 503), ConnectionResetError()]
+    retries = metrics.counters().get(("submit_retries_total", ()), 0)
+    with submitter(algod, wait=False) as sub:
+        assert sub.submit([stxn]).result(timeout=5) == {"txid": stxn.get_txid()}
+    assert algod.sent == [[stxn]]
+    assert metrics.counters()[("submit_retries_total", ())] == retries + 2
+
+
+def test_gives_up_after_retries(algod):
+    stxn = signed_payment(account.generate_account()[0])
+    algod.send_errors = [AlgodHTTPError("service unavailable", 503)] * 3
+    with submitter(algod, wait=False, retries=2) as sub:
+        with pytest.raises(Exception, match="service unavailable"):
+            sub.submit([stxn]).result(timeout=5)
+    assert algod.sent == []
+
+
+def test_rejected_groups_are_not_retried(algod):
+    stxn = signed_payment(account.generate_account()[0])
+    algod.send_errors = [AlgodHTTPError("overspend", 400), AlgodHTTPError("service unavailable", 503)]
+    with submitter(algod, wait=False) as sub:
+        with pytest.raises(Exception, match="overspend"):
+            sub.submit([stxn]).result(timeout=5)
+    assert len(algod.send_errors) == 1
+
+
+def test_already_sent_groups_are_confirmed(algod):
+    stxn = signed_payment(account.generate_account()[0])
+    # Accepted by an earlier attempt whose response was lost
+    algod.send_errors = [AlgodHTTPError("transaction already in ledger: " + stxn.get_txid(), 400)]
+    with submitter(algod) as sub:
+        future = sub.submit([stxn])
+        deadline = time.monotonic() + 5
+        while sub.tracker.pending() == 0 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        confirmed_round = algod.add_block([block_entry(stxn)], [stxn.get_txid()])
+        assert future.result(timeout=5)["confirmed-round"] == confirmed_round
+        assert sub.in_flight() == 0
+
+
+def test_failed_groups_stop_being_tracked(algod):
+    stxn = signed_payment(account.generate_account()[0])
+    algod.send_errors = [AlgodHTTPError("overspend", 400)]
+    with submitter(algod) as sub:
+        with pytest.raises(Exception, match="overspend"):
+            sub.submit([stxn]).result(timeout=5)
+        assert sub.tracker.pending() == 0
+
+
+def test_groups_fail_when_their_tracking_is_discarded(algod):
+    stxn = signed_payment(account.generate_account()[0])
+    with submitter(algod) as sub:
+        sent = sub.submit([stxn])
+        deadline = time.monotonic() + 5
+        while not algod.sent and time.monotonic() < deadline:
+            time.sleep(0.001)
+        # The same group sent again fails, discarding the confirmation both submits wait on
+        algod.send_errors = [AlgodHTTPError("overspend", 400)]
+        with pytest.raises(Exception, match="overspend"):
+            sub.submit([stxn]).result(timeout=5)
+        with pytest.raises(Exception, match="discarded"):
+            sent.result(timeout=5)
+        assert sub.in_flight() == 0
+
+
+def test_unsigned_groups_are_refused(algod):
+    with submitter(algod) as sub:
+        with pytest.raises(Exception, match="not signed"):
+            sub.submit([None])
@@ -0,0 +1,81 @@
+import pytest
+from algosdk import encoding, mnemonic
+from algosdk.future.transaction import assign_group_id
+from benchmarks.fake_network import FakeNetwork
+from deridex.perpetuals.v1.account import Account
+from deridex.perpetuals.v1.config import SIDE
+from deridex.perpetuals.v1.perpetual import Perpetual
+from deridex.perpetuals.v1.templates import PerpetualTemplates
+from fakes import network_clients
+
+
+@pytest.fixture(scope="module")
+def network():
+    return FakeNetwork(n_vaults=300)
+
+
+@pytest.fixture(scope="module")
+def account_obj(network):
+    return Account(mnemonic.from_private_key(network.user_private_key))
+
+
+@pytest.fixture(scope="module")
+def perpetual(network, account_obj):
+    algod, indexer = network_clients(network)
+    perpetual = Perpetual(algod, indexer, "mainnet", network.perpetual_app_id, "ALGO/STBL2")
+    perpetual.update_global_state()
+    perpetual.update_local_state(account_obj)
+    return perpetual
+
+
+@pytest.fixture(scope="module")
+def positions(perpetual):
+    return {address: perpetual._position(state) for address, state in perpetual.get_vault_accounts().items()}
+
+
+@pytest.fixture
+def templates(perpetual, account_obj):
+    return PerpetualTemplates(perpetual, account_obj)
+
+
+def encoded(transactions):
+    return [encoding.msgpack_encode(txn) for txn in transactions]
+
+
+def composed(gtx):
+    # Group the composer would build
+    return encoded(assign_group_id([txn_with_signer.txn for txn_with_signer in gtx.txn_list]))
+
+
+@pytest.mark.parametrize("side", [SIDE.LONG, SIDE.SHORT])
+def test_buy_template_matches_the_composer(perpetual, account_obj, templates, side):
+    for amount, leverage in ((100.0, 2.0), (2500.0, 3.5)):
+        quote = perpetual._quote(side, amount, leverage)
+        assert encoded(templates.buy(quote).transactions) == composed(perpetual._build_buy(quote, account_obj))
+
+
+def test_close_template_matches_the_composer(perpetual, account_obj, templates, positions):
+    # Short positions have no borrow_uAsset and cannot be closed by either
+    for side in ("long", "gov"):
+        position = next(position for position in positions.values() if position["side"] == side)
+        assert encoded(templates.close(position).transactions) == composed(perpetual._build_close(position,
+                                                                                                  account_obj))
+
+
+def test_liquidate_template_matches_the_composer(perpetual, account_obj, templates, positions):
+    ml = perpetual.global_state["self"]["ml"]
+    targets = [address for address, position in positions.items() if position["leverage"] >= ml]
+    assert len(targets) >= 2
+    for target in targets:
+        position = positions[target]
+        assert (encoded(templates.liquidate(position, target, slippage=0.02).transactions) ==
+                composed(perpetual._build_liquidate(position, account_obj, target, slippage=0.02)))
+
+
+def test_liquidate_template_refuses_healthy_positions(perpetual, templates, positions):
+    ml = perpetual.global_state["self"]["ml"]
+    address, position = next((address, position) for address, position in positions.items()
+                             if position["leverage"] < ml)
+    with pytest.raises(Exception, match="not liquidatable"):
+        templates.liquidate(position, address)
+    assert len(templates.liquidate(position, address, force=True).transactions) == 2
@@ -0,0 +1,106 @@
+import pytest
+from algosdk import account
+from algosdk.error import IndexerHTTPError
+from deridex.perpetuals.v1.vaults import VaultStateTable
+from fakes import key_value
+
+APP_ID = 1001
+
+
+class FakeIndexer:
+    """Indexer answering transaction searches with canned pages and account reads from a dict"""
+
+    def __init__(self, transactions, accounts, current_round=1100):
+        self.transactions = transactions
+        self.accounts = accounts
+        self.current_round = current_round
+        self.account_reads = []
+        self.errors = []
+
+    def search_transactions(self, application_id=None, min_round=None, next_page=None):
+        return {"current-round": self.current_round, "transactions": self.transactions}
+
+    def account_info(self, address, round_num=None):
+        self.account_reads.append(address)
+        if self.errors:
+            raise self.errors.pop(0)
+        if address not in self.accounts:
+            raise IndexerHTTPError("no accounts found for address " + address)
+        return {"account": self.accounts[address], "current-round": self.current_round}
+
+
+class FakePerpetual:
+    def __init__(self, indexer_client):
+        self.appId = APP_ID
+        self.indexer_client = indexer_client
+
+
+def opted_in(state):
+    return {"apps-local-state": [{"id": APP_ID, "key-value": key_value(state)}]}
+
+
+def app_call(sender, accounts=(), local_state_delta=None, inner_txns=()):
+    txn = {"sender": sender, "application-transaction": {"application-id": APP_ID, "accounts": list(accounts)},
+           "inner-txns": list(inner_txns)}
+    if local_state_delta is not None:
+        txn["local-state-delta"] = [{"address": address, "delta": []} for address in local_state_delta]
+    return txn
+
+
+@pytest.fixture
+def addresses():
+    return [account.generate_account()[1] for _ in range(4)]
+
+
+def table(indexer, local_states):
+    vaults = VaultStateTable(FakePerpetual(indexer), max_workers=2)
+    vaults.local_states = dict(local_states)
+    vaults.round = 1000
+    return vaults
+
+
+def test_sync_reads_only_accounts_with_local_state_deltas(addresses):
+    sender, vault, other = addresses[:3]
+    indexer = FakeIndexer([app_call(sender, [vault, other], local_state_delta=[vault])],
+                          {vault: opted_in({"ps": 2}), sender: {}, other: {}})
+    vaults = table(indexer, {vault: {"ps": 1}})
+    assert vaults.sync() == {vault}
+    assert indexer.account_reads == [vault]
+    assert vaults[vault] == {"ps": 2}
+    assert vaults.round == 1100
+
+
+def test_sync_without_deltas_tolerates_accounts_not_opted_in(addresses):
+    sender, vault, closed, inner_vault = addresses
+    # Sender opted in to nothing, closed vault unknown to the indexer
+    indexer = FakeIndexer([app_call(sender, [vault, closed], inner_txns=[app_call(inner_vault)])],
+                          {sender: {"address": sender}, vault: opted_in({"ps": 3}),
+                           inner_vault: opted_in({"ps": 4})})
+    vaults = table(indexer, {vault: {"ps": 1}, closed: {"ps": 1}})
+    assert vaults.sync() == {sender, vault, closed, inner_vault}
+    assert dict(vaults.local_states) == {vault: {"ps": 3}, inner_vault: {"ps": 4}}
+    assert sender not in vaults
+    assert vaults.round == 1100
+
+
+def test_sync_without_changes_advances_round():
+    indexer = FakeIndexer([], {})
+    vaults = table(indexer, {})
+    assert vaults.sync() == set()
+    assert indexer.account_reads == []
+    assert vaults.round == 1100
+
+
+def test_sync_keeps_vaults_on_indexer_errors(addresses):
+    sender, vault = addresses[:2]
+    indexer = FakeIndexer([app_call(sender, [vault], local_state_delta=[vault])], {vault: opted_in({"ps": 2})})
+    indexer.errors = [IndexerHTTPError("service unavailable")]
+    vaults = table(indexer, {vault: {"ps": 1}})
+    with pytest.raises(IndexerHTTPError):
+        vaults.sync()
+    assert vaults[vault] == {"ps": 1}
+    assert vaults.round == 1000
+    # The next sync reads the same rounds again
+    assert vaults.sync() == {vault}
+    assert vaults[vault] == {"ps": 2}
+    assert vaults.round == 1100